@@ -0,0 +1,32 @@
+from sx1262 import SX1262
+import busio
+import board
+
+# Two SX1262 modules on one SPI bus, each with its own chip select, DIO1 and busy pins.
+# The driver locks the bus and reconfigures it for every transaction, so the radios can
+# listen on different channels or spreading factors at the same time.
+spi = busio.SPI(board.P1_11, MOSI=board.P1_15, MISO=board.P0_02)
+
+radios = (
+    SX1262(spi_bus=None, clk=None, mosi=None, miso=None, spi=spi,
+           cs=board.P1_13, irq=board.P0_10, rst=board.P0_09, gpio=board.P0_29),
+    SX1262(spi_bus=None, clk=None, mosi=None, miso=None, spi=spi,
+           cs=board.P0_24, irq=board.P0_22, rst=board.P1_00, gpio=board.P0_20),
+)
+
+radios[0].begin(freq=923, bw=125.0, sf=9, cr=8, syncWord=0x12, power=-5, blocking=False)
+radios[1].begin(freq=925, bw=125.0, sf=12, cr=8, syncWord=0x12, power=-5, blocking=False)
+
+print("listening...")
+while True:
+    for i in range(len(radios)):
+        sx = radios[i]
+        # DIO1 goes high on RX done; reading the packet restarts reception
+        if sx.irq.value:
+            msg, err = sx.recv()
+            if len(msg) > 0:
+                print("Radio:", i)
+                print("Message:", msg)
+                print("Error:", SX1262.STATUS[err])
+                print("RSSI:", sx.getRSSI(), "dBm")
+                print("-" * 40)
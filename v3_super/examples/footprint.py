@@ -0,0 +1,61 @@
+# RAM and import time of the driver modules. Run it straight after a reset (Ctrl-D on the
+# REPL) so nothing is imported yet, once with the old lib/ and once with the new one, and
+# compare the lines. Every line is "footprint,<what>,<bytes>,<us>"; bytes is the drop in
+# gc.mem_free() across the step, so it includes the module globals and bytecode.
+import gc
+import time
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    try:
+        from utime import ticks_us, ticks_diff
+    except ImportError:
+        def ticks_us():
+            return time.monotonic_ns() // 1000
+
+        def ticks_diff(end, start):
+            return end - start
+
+try:
+    memFree = gc.mem_free
+except AttributeError:
+    # CPython gateway: traced allocations stand in for the heap
+    import tracemalloc
+    tracemalloc.start()
+
+    def memFree():
+        return -tracemalloc.get_traced_memory()[0]
+
+MODULES = ('_sx126x', 'sx126x', 'sx1262')
+
+
+def step(what, fn):
+    gc.collect()
+    before = memFree()
+    start = ticks_us()
+    result = fn()
+    elapsed = ticks_diff(ticks_us(), start)
+    gc.collect()
+    print('footprint,%s,%d,%d' % (what, before - memFree(), elapsed))
+    return result
+
+
+def radio():
+    # pins as in rx.py; skipped when there is no board module
+    import board
+    from sx1262 import SX1262
+    return SX1262(spi_bus=1, clk=board.P1_11, mosi=board.P1_15, miso=board.P0_02,
+                  cs=board.P1_13, irq=board.P0_10, rst=board.P0_09, gpio=board.P0_29)
+
+
+total = memFree()
+for name in MODULES:
+    step('import ' + name, lambda: __import__(name))
+try:
+    sx = step('SX1262()', radio)
+    step('begin', lambda: sx.begin(freq=923, bw=500.0, sf=12, cr=8, power=-5, tcxoVoltage=1.7))
+except ImportError:
+    pass
+gc.collect()
+print('footprint,total,%d,0' % (total - memFree()))
@@ -0,0 +1,14 @@
+from sx1262 import SX1262
+from bench import Bench
+import board
+
+# Driver timings over USB serial. Capture the output (e.g. screen -L, or copy it from the
+# serial console) and feed it to host/bench_collect.py to compare builds or boards.
+# The radio transmits at -9 dBm; keep an antenna or a load on it.
+sx = SX1262(spi_bus=1, clk=board.P1_11, mosi=board.P1_15, miso=board.P0_02,
+            cs=board.P1_13, irq=board.P0_10, rst=board.P0_09, gpio=board.P0_29)
+
+sx.begin(freq=923, bw=125.0, sf=9, cr=8, syncWord=0x12, power=-9, tcxoVoltage=1.7)
+
+# label the run with whatever tells builds apart, e.g. a git tag
+Bench(sx, iterations=20, label='dev').run()
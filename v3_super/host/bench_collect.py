@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark collector
+Reads the lines printed by the bench module (captured serial logs, or live from a board with
+--port), aggregates repeated runs and compares driver versions or boards
+"""
+
+import argparse
+import csv
+import statistics
+import sys
+from collections import defaultdict
+
+FIELDS = ('board', 'label', 'driver', 'scenario', 'n', 'min', 'median', 'mean', 'max', 'alloc', 'state')
+
+
+def parse(lines):
+    for line in lines:
+        fields = line.strip().split(',')
+        if len(fields) != len(FIELDS) + 1 or fields[0] != 'bench':
+            continue
+        row = dict(zip(FIELDS, fields[1:]))
+        for key in FIELDS[4:]:
+            row[key] = int(row[key])
+        yield row
+
+
+def readPort(port, timeout):
+    # lines until the board prints bench-end
+    try:
+        import serial
+    except ImportError:
+        sys.exit('--port needs pyserial')
+    lines = []
+    with serial.Serial(port, 115200, timeout=timeout) as ser:
+        while True:
+            line = ser.readline().decode(errors='replace')
+            if not line:
+                sys.exit('no bench-end from the board after %ds' % timeout)
+            print(line, end='', file=sys.stderr)
+            lines.append(line)
+            if line.startswith('bench-end'):
+                return lines
+
+
+def aggregate(rows):
+    # (board, version, scenario) -> combined stats; a version is the label, or the driver CRC
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row['board'], row['label'] or row['driver'], row['scenario'])].append(row)
+    results = {}
+    for key, runs in groups.items():
+        results[key] = {
+            'runs': len(runs),
+            'n': sum(r['n'] for r in runs),
+            'min': min(r['min'] for r in runs),
+            'median': int(statistics.median(r['median'] for r in runs)),
+            'max': max(r['max'] for r in runs),
+            'alloc': max(r['alloc'] for r in runs),
+            'state': next((r['state'] for r in runs if r['state']), 0),
+        }
+    return results
+
+
+def table(results, out):
+    columns = sorted({(board, version) for board, version, _ in results})
+    scenarios = []
+    for _, _, scenario in results:
+        if scenario not in scenarios:
+            scenarios.append(scenario)
+    out.write('%-16s' % 'median us' + ''.join(' %22s' % ('%s/%s' % c)[-22:] for c in columns) + '\n')
+    for scenario in scenarios:
+        cells = []
+        for board, version in columns:
+            r = results.get((board, version, scenario))
+            cells.append(' %22s' % ('-' if r is None else
+                                    '%d%s' % (r['median'], ' !%d' % r['state'] if r['state'] else '')))
+        out.write('%-16s' % scenario + ''.join(cells) + '\n')
+
+
+def diff(results, base, new, threshold, out):
+    # returns the number of scenarios more than threshold percent slower in new
+    regressions = 0
+    boards = sorted({board for board, version, _ in results if version == base} &
+                    {board for board, version, _ in results if version == new})
+    if not boards:
+        sys.exit('no board has results for both %s and %s' % (base, new))
+    for board in boards:
+        out.write('%s: %s -> %s\n' % (board, base, new))
+        out.write('  %-16s %10s %10s %8s %8s\n' % ('scenario', base[:10], new[:10], 'change', 'alloc'))
+        for (b, version, scenario), r in results.items():
+            if b != board or version != base:
+                continue
+            n = results.get((board, new, scenario))
+            if n is None:
+                continue
+            change = 100.0 * (n['median'] - r['median']) / r['median'] if r['median'] else 0.0
+            flag = ''
+            if change > threshold:
+                flag = '  slower'
+                regressions += 1
+            out.write('  %-16s %10d %10d %+7.1f%% %+8d%s\n' % (scenario, r['median'], n['median'], change,
+                                                             n['alloc'] - r['alloc'], flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate and compare driver benchmark results')
+    parser.add_argument('logs', nargs='*', help='captured serial output (default: stdin unless --port)')
+    parser.add_argument('--port', help='read a run live from this serial port')
+    parser.add_argument('--timeout', type=int, default=300, help='seconds to wait for the board (--port)')
+    parser.add_argument('--save', help='append the bench lines read from --port to this file')
+    parser.add_argument('--csv', action='store_true', help='write the aggregated results as CSV')
+    parser.add_argument('--diff', nargs=2, metavar=('BASE', 'NEW'), help='compare two labels or driver CRCs')
+    parser.add_argument('--threshold', type=float, default=5.0,
+                        help='percent slowdown --diff reports as a regression (exit status 1)')
+    args = parser.parse_args()
+
+    lines = []
+    for path in args.logs:
+        with open(path) as f:
+            lines.extend(f)
+    if args.port:
+        live = readPort(args.port, args.timeout)
+        lines.extend(live)
+        if args.save:
+            with open(args.save, 'a') as f:
+                f.writelines(l for l in live if l.startswith('bench'))
+    elif not args.logs:
+        lines = sys.stdin.readlines()
+
+    results = aggregate(parse(lines))
+    if not results:
+        sys.exit('no bench lines found')
+
+    if args.diff:
+        sys.exit(1 if diff(results, args.diff[0], args.diff[1], args.threshold, sys.stdout) else 0)
+    if args.csv:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(('board', 'version', 'scenario', 'runs', 'n', 'min', 'median', 'max', 'alloc', 'state'))
+        for (board, version, scenario), r in sorted(results.items()):
+            writer.writerow((board, version, scenario, r['runs'], r['n'], r['min'], r['median'],
+                             r['max'], r['alloc'], r['state']))
+    else:
+        table(results, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
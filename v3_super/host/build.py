@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Driver build
+Compiles the driver modules with mpy-cross into a lib/ bundle per board, reports the size of
+every module and, with --port, the cold import time and heap use measured on a connected board
+"""
+
+import argparse
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+REPO = HERE.parent.parent
+MPY_CROSS = 'mpy-cross-linux-amd64-9.2.8.static'
+
+# modules every bundle gets; feature modules are added with --with
+DRIVER = ('_sx126x', '_sx126x_errors', 'sx126x', 'sx1262')
+
+# target: CircuitPython board id, mpy-cross arch, driver sources, checked in lib/ dirs, -O level.
+# All three are nRF52840 (Cortex-M4F). v1 keeps -O0: its ASSERT() is an assert statement,
+# which -O compiles out. -O3 also drops line numbers, so tracebacks only name the function.
+TARGETS = {
+    'supermini': ('supermini_nrf52840', 'armv7emsp', 'v3_super/source',
+                  ('v3_super/lib', 'v3_super/working/lib'), 3),
+    'itsybitsy': ('itsybitsy_nrf52840_express', 'armv7emsp', 'v3_super/source',
+                  ('v3_itsy/v3.1/lib',), 3),
+    'nice_nano': ('nice_nano', 'armv7emsp', 'v1/source', ('v1/lib',), 0),
+}
+
+# run in the raw REPL straight after a soft reset, so nothing is imported yet
+_IMPORT_PROBE = """import gc, time
+for m in %r:
+    gc.collect()
+    f = gc.mem_free()
+    t = time.monotonic_ns()
+    __import__(m)
+    t = time.monotonic_ns() - t
+    gc.collect()
+    print('import,%%s,%%d,%%d' %% (m, f - gc.mem_free(), t // 1000))
+"""
+
+
+def findMpyCross(path):
+    for candidate in (path, HERE.parent / 'source' / MPY_CROSS, shutil.which('mpy-cross')):
+        if candidate is None:
+            continue
+        try:
+            out = subprocess.run([str(candidate), '--version'], capture_output=True, text=True)
+        except OSError:
+            continue
+        if out.returncode == 0:
+            return str(candidate), out.stdout.strip()
+    sys.exit('no working mpy-cross found, pass --mpy-cross (it must match the CircuitPython version)')
+
+
+def compileTarget(mpyCross, name, modules, out, optimize=None):
+    board, arch, source, _, level = TARGETS[name]
+    if optimize is not None:
+        level = optimize
+    lib = out / name / 'lib'
+    if lib.exists():
+        shutil.rmtree(lib)
+    lib.mkdir(parents=True)
+
+    sizes = []
+    for module in modules:
+        py = REPO / source / (module + '.py')
+        if not py.exists():
+            # v1 predates some of the modules
+            continue
+        mpy = lib / (module + '.mpy')
+        cmd = [mpyCross, '-O%d' % level, '-march=' + arch, '-s', module + '.py', '-o', str(mpy), str(py)]
+        subprocess.run(cmd, check=True)
+        sizes.append((module, py.stat().st_size, mpy.stat().st_size))
+    return board, lib, sizes
+
+
+def install(lib, dirs, modules):
+    # a .py next to the .mpy would be imported instead, so the sources of compiled modules go
+    for d in dirs:
+        d = Path(d)
+        d.mkdir(parents=True, exist_ok=True)
+        for module in modules:
+            mpy = lib / (module + '.mpy')
+            if not mpy.exists():
+                continue
+            shutil.copy(mpy, d / mpy.name)
+            py = d / (module + '.py')
+            if py.exists():
+                py.unlink()
+
+
+def _readUntil(ser, ending, timeout=10):
+    data = b''
+    deadline = time.monotonic() + timeout
+    while not data.endswith(ending):
+        if time.monotonic() > deadline:
+            raise TimeoutError('board did not answer, got %r' % data[-80:])
+        c = ser.read(1)
+        if c:
+            data += c
+    return data
+
+
+def measureImports(port, modules):
+    # imports each module on a freshly reset board: {module: (heap bytes, us)}
+    try:
+        import serial
+    except ImportError:
+        sys.exit('--port needs pyserial')
+
+    results = {}
+    with serial.Serial(port, 115200, timeout=1) as ser:
+        ser.write(b'\r\x03\x03')
+        time.sleep(0.5)
+        ser.reset_input_buffer()
+        ser.write(b'\r\x01')
+        _readUntil(ser, b'raw REPL; CTRL-B to exit\r\n>')
+        ser.write(b'\x04')
+        _readUntil(ser, b'soft reboot\r\n')
+        _readUntil(ser, b'raw REPL; CTRL-B to exit\r\n')
+
+        ser.write((_IMPORT_PROBE % (tuple(modules),)).encode())
+        ser.write(b'\x04')
+        _readUntil(ser, b'OK')
+        output = _readUntil(ser, b'\x04', timeout=30)[:-1].decode()
+        error = _readUntil(ser, b'\x04')[:-1].decode()
+        ser.write(b'\x02')
+    if error.strip():
+        sys.exit('import failed on the board:\n' + error)
+
+    for line in output.splitlines():
+        fields = line.strip().split(',')
+        if len(fields) == 4 and fields[0] == 'import':
+            results[fields[1]] = (int(fields[2]), int(fields[3]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile the driver to .mpy bundles per board')
+    parser.add_argument('targets', nargs='*', help='targets to build (default: all of %s)' % ', '.join(TARGETS))
+    parser.add_argument('--with', dest='extra', default='',
+                        help='comma separated feature modules to add, e.g. hopping,arq')
+    parser.add_argument('--out', type=Path, default=HERE.parent / 'build', help='output directory')
+    parser.add_argument('--mpy-cross', type=Path, help='mpy-cross binary for the boards\' CircuitPython')
+    parser.add_argument('-O', dest='optimize', type=int, help='override the per target optimisation level')
+    parser.add_argument('--install', action='store_true', help='copy the bundle into the checked in lib/ dirs')
+    parser.add_argument('--drive', type=Path, help='also copy it into lib/ on this mounted CIRCUITPY drive')
+    parser.add_argument('--port', help='serial port of the board on --drive, to time cold imports')
+    args = parser.parse_args()
+
+    targets = args.targets or list(TARGETS)
+    for name in targets:
+        if name not in TARGETS:
+            parser.error('unknown target %s' % name)
+    if args.port and len(targets) != 1:
+        parser.error('--port measures one board, name its target')
+    modules = DRIVER + tuple(m for m in args.extra.split(',') if m)
+
+    mpyCross, version = findMpyCross(args.mpy_cross)
+    print(version)
+
+    for name in targets:
+        board, lib, sizes = compileTarget(mpyCross, name, modules, args.out, args.optimize)
+        if args.install:
+            install(lib, [REPO / d for d in TARGETS[name][3]], modules)
+        if args.drive:
+            install(lib, [args.drive / 'lib'], modules)
+        imports = measureImports(args.port, [m for m, _, _ in sizes]) if args.port else {}
+
+        print()
+        print('%s (%s) -> %s' % (name, board, lib))
+        print('  %-16s %8s %8s %8s %8s' % ('module', '.py', '.mpy', 'heap', 'import'))
+        total = [0, 0, 0, 0]
+        for module, pySize, mpySize in sizes:
+            heap, us = imports.get(module, (None, None))
+            print('  %-16s %8d %8d %8s %8s' % (module, pySize, mpySize,
+                                               '-' if heap is None else heap,
+                                               '-' if us is None else '%.1fms' % (us / 1000)))
+            total[0] += pySize
+            total[1] += mpySize
+            total[2] += heap or 0
+            total[3] += us or 0
+        print('  %-16s %8d %8d %8s %8s' % ('total', total[0], total[1],
+                                           total[2] if imports else '-',
+                                           '%.1fms' % (total[3] / 1000) if imports else '-'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Batch decoder
+Streams hex encoded batch packets (one per line, as printed by the receiving node) and writes
+one CSV row per reading
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'source'))
+from batch import BatchDecoder  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decode batched sensor packets to CSV')
+    parser.add_argument('input', nargs='?', help='file with one hex packet per line (default: stdin)')
+    parser.add_argument('--scales', help='comma separated per-channel scales, e.g. 1,100,10')
+    args = parser.parse_args()
+
+    scales = tuple(int(s) for s in args.scales.split(',')) if args.scales else None
+    decoder = BatchDecoder(scales)
+    source = open(args.input) if args.input else sys.stdin
+    with source:
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = bytes.fromhex(line.split()[-1])
+            except ValueError:
+                continue
+            for reading in decoder.decode(data):
+                print(','.join(str(v) for v in reading))
+            sys.stdout.flush()
+
+    print(f'{decoder.batches} batches, {decoder.lost} lost', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Telemetry decoder
+Reads hex encoded packets (one per line, as printed by the receiving node) and writes CSV
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'source'))
+from telemetry import Decoder  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decode compact telemetry packets to CSV')
+    parser.add_argument('input', nargs='?', help='file with one hex packet per line (default: stdin)')
+    parser.add_argument('--schema', type=int, help='only output packets of this schema id')
+    args = parser.parse_args()
+
+    decoder = Decoder()
+    header = None
+    source = open(args.input) if args.input else sys.stdin
+    with source:
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = bytes.fromhex(line.split()[-1])
+            except ValueError:
+                continue
+            result = decoder.decode(data)
+            if result is None:
+                continue
+            node, schemaId, values = result
+            if args.schema is not None and schemaId != args.schema:
+                continue
+            if header != schemaId:
+                print('node,schema,' + ','.join(decoder.fields(schemaId)))
+                header = schemaId
+            print(f'{node},{schemaId},' + ','.join(str(v) for v in values))
+
+    if decoder.malformed:
+        print(f'{decoder.malformed} truncated or unknown packets skipped', file=sys.stderr)
+    if decoder.missingKeyframe:
+        print(f'{decoder.missingKeyframe} packets dropped waiting for a keyframe', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# Names for the ERR_ codes, imported on first use by errorName()/errorCode() in _sx126x so
+# the table only takes up RAM once something has actually gone wrong.
+
+ERROR = {
+    0: 'ERR_NONE',
+    -1: 'ERR_UNKNOWN',
+    -2: 'ERR_CHIP_NOT_FOUND',
+    -3: 'ERR_MEMORY_ALLOCATION_FAILED',
+    -4: 'ERR_PACKET_TOO_LONG',
+    -5: 'ERR_TX_TIMEOUT',
+    -6: 'ERR_RX_TIMEOUT',
+    -7: 'ERR_CRC_MISMATCH',
+    -8: 'ERR_INVALID_BANDWIDTH',
+    -9: 'ERR_INVALID_SPREADING_FACTOR',
+    -10: 'ERR_INVALID_CODING_RATE',
+    -11: 'ERR_INVALID_BIT_RANGE',
+    -12: 'ERR_INVALID_FREQUENCY',
+    -13: 'ERR_INVALID_OUTPUT_POWER',
+    -14: 'PREAMBLE_DETECTED',
+    -15: 'CHANNEL_FREE',
+    -16: 'ERR_SPI_WRITE_FAILED',
+    -17: 'ERR_INVALID_CURRENT_LIMIT',
+    -18: 'ERR_INVALID_PREAMBLE_LENGTH',
+    -19: 'ERR_INVALID_GAIN',
+    -20: 'ERR_WRONG_MODEM',
+    -21: 'ERR_INVALID_NUM_SAMPLES',
+    -22: 'ERR_INVALID_RSSI_OFFSET',
+    -23: 'ERR_INVALID_ENCODING',
+    -24: 'ERR_PACKET_FILTERED',
+    -25: 'ERR_DWELL_EXCEEDED',
+    -26: 'ERR_BUDGET_EXCEEDED',
+    -27: 'ERR_DUTY_CYCLE_EXCEEDED',
+    -28: 'ERR_QUEUE_FULL',
+    -101: 'ERR_INVALID_BIT_RATE',
+    -102: 'ERR_INVALID_FREQUENCY_DEVIATION',
+    -103: 'ERR_INVALID_BIT_RATE_BW_RATIO',
+    -104: 'ERR_INVALID_RX_BANDWIDTH',
+    -105: 'ERR_INVALID_SYNC_WORD',
+    -106: 'ERR_INVALID_DATA_SHAPING',
+    -107: 'ERR_INVALID_MODULATION',
+    -302: 'ERR_FRAME_MALFORMED',
+    -303: 'ERR_FRAME_INCORRECT_CHECKSUM',
+    -304: 'ERR_FRAME_UNEXPECTED_ID',
+    -305: 'ERR_FRAME_NO_RESPONSE',
+    -504: 'ERR_ACK_NOT_RECEIVED',
+    -701: 'ERR_INVALID_CRC_CONFIGURATION',
+    -702: 'LORA_DETECTED',
+    -703: 'ERR_INVALID_TCXO_VOLTAGE',
+    -704: 'ERR_INVALID_MODULATION_PARAMETERS',
+    -705: 'ERR_SPI_CMD_TIMEOUT',
+    -706: 'ERR_SPI_CMD_INVALID',
+    -707: 'ERR_SPI_CMD_FAILED',
+    -708: 'ERR_INVALID_SLEEP_PERIOD',
+    -709: 'ERR_INVALID_RX_PERIOD',
+    -804: 'ERR_INVALID_PACKET_TYPE',
+    -805: 'ERR_INVALID_PACKET_LENGTH'
+    }
@@ -0,0 +1,215 @@
+from _sx126x import *
+from sx126x import ticks_ms, ticks_diff, loraTimeOnAir
+from math import log10, ceil
+
+# required demodulator SNR in dB for SF5 .. SF12
+SNR_FLOOR = (-2.5, -5.0, -7.5, -10.0, -12.5, -15.0, -17.5, -20.0)
+_BANDWIDTHS = (7.8, 10.4, 15.6, 20.8, 31.25, 41.7, 62.5, 125.0, 250.0, 500.0)
+
+_ADR_MAGIC = const(0xAD)
+_ADR_REQ = const(0x01)
+_ADR_ACK = const(0x02)
+# magic, src, dst, type, sf, bandwidth index, cr, power
+ADR_FRAME_LENGTH = const(8)
+
+
+class ADR:
+
+    def __init__(self, radio, address, power, margin=5.0, history=8, bandwidths=(125.0, 250.0, 500.0),
+                 codingRates=(5,), minPower=-9, maxPower=22, refLength=32, fallback_ms=120000):
+        self.radio = radio
+        self.address = address
+        self.margin = margin
+        self.historyLength = history
+        self.bandwidths = bandwidths
+        self.codingRates = codingRates
+        self.minPower = minPower
+        self.maxPower = maxPower
+        self.refLength = refLength
+        self.fallback_ms = fallback_ms
+
+        self.sf = radio._sf
+        self.bw = radio._bwKhz
+        self.cr = radio._cr + 4
+        self.power = power
+        self._default = (self.sf, self.bw, self.cr, self.power)
+
+        self._snr = {}
+        self._rssi = {}
+        self._count = {}
+        # transmit power each peer uses, the SNR history was measured at it
+        self._peerPower = {}
+        self._lastHeard = ticks_ms()
+        self._frame = bytearray(ADR_FRAME_LENGTH)
+
+        self.switches = 0
+        self.fallbacks = 0
+
+    def observe(self, src, snr, rssi, power=None):
+        # power: the peer's transmit power, when the application carries it in its packets
+        if power is not None:
+            self._peerPower[src] = power
+        snrHist = self._snr.get(src)
+        if snrHist is None:
+            snrHist = bytearray(self.historyLength)
+            self._snr[src] = snrHist
+            self._rssi[src] = bytearray(self.historyLength)
+            self._count[src] = 0
+        i = self._count[src] % self.historyLength
+        # quarter dB resolution, the same as the chip reports
+        snrHist[i] = int(snr * 4) & 0xFF
+        self._rssi[src][i] = min(max(int(-rssi * 2), 0), 0xFF)
+        self._count[src] += 1
+        self._lastHeard = ticks_ms()
+
+    def observeLast(self, src):
+        self.observe(src, self.radio.getSNR(), self.radio.getRSSI())
+
+    def snrMax(self, src):
+        n = min(self._count.get(src, 0), self.historyLength)
+        if n == 0:
+            return None
+        best = -128
+        for v in self._snr[src][:n]:
+            if v >= 128:
+                v -= 256
+            if v > best:
+                best = v
+        return best / 4.0
+
+    def peerPower(self, src):
+        # peers that never switched still run the default setting
+        return self._peerPower.get(src, self._default[3])
+
+    def rssiMean(self, src):
+        n = min(self._count.get(src, 0), self.historyLength)
+        if n == 0:
+            return None
+        return -sum(self._rssi[src][:n]) / (2.0 * n)
+
+    def recommend(self, src):
+        # lowest airtime setting whose expected SNR keeps the margin, then the lowest power that still does
+        if self._count.get(src, 0) < self.historyLength:
+            return None
+        snr = self.snrMax(src)
+        peerPower = self.peerPower(src)
+
+        best = None
+        bestToa = 0
+        for bw in self.bandwidths:
+            expected = snr + 10.0 * log10(self.bw / bw)
+            for sf in range(5, 13):
+                surplus = expected - SNR_FLOOR[sf - 5] - self.margin
+                if surplus + (self.maxPower - peerPower) < 0:
+                    continue
+                for cr in self.codingRates:
+                    toa = loraTimeOnAir(self.refLength, sf, bw, cr, self.radio._preambleLength)
+                    if best is None or toa < bestToa:
+                        best = (sf, bw, cr, surplus)
+                        bestToa = toa
+
+        if best is None:
+            return None
+        sf, bw, cr, surplus = best
+        power = min(max(ceil(peerPower - surplus), self.minPower), self.maxPower)
+        return sf, bw, cr, power
+
+    def requestSwitch(self, dst, config=None, timeout_ms=0):
+        if config is None:
+            config = self.recommend(dst)
+        if config is None or config == (self.sf, self.bw, self.cr, self.power):
+            return ERR_NONE
+
+        state = self._sendControl(dst, _ADR_REQ, config)
+        if state != ERR_NONE:
+            return state
+
+        if timeout_ms == 0:
+            timeout_ms = (self.radio.getTimeOnAir(ADR_FRAME_LENGTH) * 3) // 1000 + 500
+        start = ticks_ms()
+        while True:
+            # frames for someone else must not restart the wait
+            remaining = timeout_ms - abs(ticks_diff(ticks_ms(), start))
+            if remaining <= 0:
+                break
+            frame, state = self.radio.recv(timeout_en=True, timeout_ms=remaining)
+            if state != ERR_NONE:
+                continue
+            if self._parse(frame, dst, _ADR_ACK) == config:
+                self._peerPower[dst] = config[3]
+                return self.apply(config)
+        return ERR_ACK_NOT_RECEIVED
+
+    def handle(self, frame):
+        # returns True if the frame was an ADR control frame addressed to this node
+        if len(frame) != ADR_FRAME_LENGTH or frame[0] != _ADR_MAGIC or frame[2] != self.address:
+            return False
+        config = self._parse(frame, frame[1], _ADR_REQ)
+        if config is not None:
+            self._sendControl(frame[1], _ADR_ACK, config)
+            self._peerPower[frame[1]] = config[3]
+            self.apply(config)
+        return True
+
+    def check(self):
+        # reverts to the default setting when nothing was heard for fallback_ms after a switch
+        if (self.sf, self.bw, self.cr, self.power) == self._default:
+            return ERR_NONE
+        if abs(ticks_diff(ticks_ms(), self._lastHeard)) < self.fallback_ms:
+            return ERR_NONE
+        self.fallbacks += 1
+        # the peers fall back too once they stop hearing this node
+        self._peerPower = {}
+        return self.apply(self._default)
+
+    def apply(self, config):
+        sf, bw, cr, power = config
+
+        state = self.radio.setSpreadingFactor(sf)
+        if state != ERR_NONE:
+            return state
+        state = self.radio.setBandwidth(bw)
+        if state != ERR_NONE:
+            return state
+        state = self.radio.setCodingRate(cr)
+        if state != ERR_NONE:
+            return state
+        state = self.radio.setOutputPower(power)
+        if state != ERR_NONE:
+            return state
+        if not self.radio.blocking:
+            state = self.radio.startReceive()
+
+        self.sf, self.bw, self.cr, self.power = sf, bw, cr, power
+        self._lastHeard = ticks_ms()
+        # history measured with the old setting no longer predicts the new one
+        for src in self._count:
+            self._count[src] = 0
+        self.switches += 1
+        return state
+
+    def _sendControl(self, dst, kind, config):
+        sf, bw, cr, power = config
+        frame = self._frame
+        frame[0] = _ADR_MAGIC
+        frame[1] = self.address
+        frame[2] = dst
+        frame[3] = kind
+        frame[4] = sf
+        frame[5] = _BANDWIDTHS.index(bw)
+        frame[6] = cr
+        frame[7] = power & 0xFF
+        _, state = self.radio.send(frame)
+        return state
+
+    def _parse(self, frame, src, kind):
+        if len(frame) != ADR_FRAME_LENGTH or frame[0] != _ADR_MAGIC:
+            return None
+        if frame[1] != src or frame[2] != self.address or frame[3] != kind:
+            return None
+        if frame[5] >= len(_BANDWIDTHS):
+            return None
+        power = frame[7]
+        if power >= 128:
+            power -= 256
+        return frame[4], _BANDWIDTHS[frame[5]], frame[6], power
@@ -0,0 +1,301 @@
+from _sx126x import *
+from sx126x import ticks_us, ticks_diff
+from random import randint
+
+_TYPE_DATA = const(0x01)
+_TYPE_ACK = const(0x02)
+_TYPE_MASK = const(0x0F)
+_FLAG_ACK_REQ = const(0x80)
+_FLAG_SYN = const(0x40)
+
+# DATA: type|flags, src, dst, seq
+# ACK:  type, src, dst, next expected seq, 32 bit selective bitmap for the seqs after it,
+#       session
+#
+# A session starts at a random seq, sent with the SYN flag on the first frame until an ACK
+# for it comes back. The receiver restarts its window there and echoes the start seq as the
+# session in every ACK, so a sender that rebooted is never acknowledged from a receiver's
+# state of an earlier session. Frames from a sender without a session are dropped; the
+# sender then runs out of retries and opens a new one on its next send().
+ARQ_HEADER_LENGTH = const(4)
+_ACK_LENGTH = const(9)
+_MAX_WINDOW = const(32)
+_SEQ_MASK = const(0xFF)
+_SEQ_HALF = const(0x80)
+
+# initial guess for receiver turnaround before the first RTT sample
+_INITIAL_TURNAROUND_US = const(200000)
+_MAX_RTO_US = const(60000000)
+
+
+class _RxPeer:
+
+    def __init__(self, window, mtu, session):
+        self.session = session
+        self.expected = session
+        self.frames = [bytearray(mtu) for _ in range(window)]
+        self.lengths = [0] * window
+        self.present = bytearray(window)
+
+
+class ARQ:
+
+    def __init__(self, radio, address, window=8, maxRetries=8, mtu=SX126X_MAX_PACKET_LENGTH):
+        # the window must divide the sequence space so receivers can index slots by seq
+        size = 1
+        while size * 2 <= min(window, _MAX_WINDOW):
+            size *= 2
+        window = size
+        self.radio = radio
+        self.address = address
+        self.window = window
+        self.maxRetries = maxRetries
+        self.mtu = mtu
+        self.payloadSize = mtu - ARQ_HEADER_LENGTH
+
+        # frames stay in these buffers until acknowledged, so retransmissions never rebuild them
+        self._frames = [bytearray(mtu) for _ in range(window)]
+        self._frames_mv = [memoryview(f) for f in self._frames]
+        self._lengths = [0] * window
+        self._ack = bytearray(_ACK_LENGTH)
+
+        self._txSeq = {}
+        self._session = {}
+        self._synced = {}
+        self._rxPeers = {}
+        self._delivered = []
+
+        self.srtt_us = 0
+        self.rttvar_us = 0
+        self.framesSent = 0
+        self.retransmissions = 0
+        self.bytesAcked = 0
+        self.goodput = 0.0
+
+    def send(self, dst, data):
+        # reliably delivers data to dst in order, split into frames of up to payloadSize bytes
+        data = memoryview(data)
+        total = len(data)
+        nFrames = max(1, (total + self.payloadSize - 1) // self.payloadSize)
+
+        if not self._synced.get(dst):
+            self._txSeq[dst] = randint(0, _SEQ_MASK)
+            self._session[dst] = self._txSeq[dst]
+        base = self._txSeq[dst]
+        session = self._session[dst]
+        acked = bytearray(self.window)
+        # frames already sent once; an ACK after their retransmission is no RTT sample (Karn)
+        sentBefore = bytearray(self.window)
+        retries = 0
+        nextFrame = 0
+        firstUnacked = 0
+        start = ticks_us()
+
+        while firstUnacked < nFrames:
+            # fill the window with new frames
+            while nextFrame < nFrames and nextFrame - firstUnacked < self.window:
+                slot = nextFrame % self.window
+                offset = nextFrame * self.payloadSize
+                n = min(self.payloadSize, total - offset)
+                frame = self._frames[slot]
+                frame[0] = _TYPE_DATA
+                frame[1] = self.address
+                frame[2] = dst
+                frame[3] = (base + nextFrame) & _SEQ_MASK
+                self._frames_mv[slot][ARQ_HEADER_LENGTH:ARQ_HEADER_LENGTH + n] = data[offset:offset + n]
+                self._lengths[slot] = ARQ_HEADER_LENGTH + n
+                acked[slot] = 0
+                sentBefore[slot] = 0
+                nextFrame += 1
+
+            # send every frame in the window that has not been selectively acknowledged,
+            # asking for an ACK on the last one
+            last = -1
+            for i in range(firstUnacked, nextFrame):
+                if not acked[i % self.window]:
+                    last = i
+            retransmitted = False
+            for i in range(firstUnacked, nextFrame):
+                slot = i % self.window
+                if acked[slot]:
+                    continue
+                frame = self._frames[slot]
+                frame[0] = _TYPE_DATA
+                if i == last:
+                    frame[0] |= _FLAG_ACK_REQ
+                if (base + i) & _SEQ_MASK == session and not self._synced.get(dst):
+                    frame[0] |= _FLAG_SYN
+                # frames go out back to back, each one has to be off the air before the next
+                _, state = self.radio.sendWait(self._frames_mv[slot][:self._lengths[slot]])
+                if state != ERR_NONE:
+                    return state
+                self.framesSent += 1
+                if sentBefore[slot]:
+                    self.retransmissions += 1
+                    retransmitted = True
+                sentBefore[slot] = 1
+
+            sent = ticks_us()
+            ack = self._waitAck(dst, session, sent, not retransmitted)
+            if ack is None:
+                retries += 1
+                if retries > self.maxRetries:
+                    return self._giveUp(dst, base + firstUnacked)
+                continue
+            self._synced[dst] = True
+
+            # only an ACK for frames that have been sent moves the window
+            expected, bitmap = ack
+            cumulative = firstUnacked + ((expected - base - firstUnacked) & _SEQ_MASK)
+            if cumulative > nextFrame:
+                cumulative = firstUnacked
+            progress = False
+            while firstUnacked < cumulative:
+                slot = firstUnacked % self.window
+                self.bytesAcked += self._lengths[slot] - ARQ_HEADER_LENGTH
+                acked[slot] = 0
+                firstUnacked += 1
+                progress = True
+            for bit in range(_MAX_WINDOW):
+                i = cumulative + 1 + bit
+                if i >= nextFrame:
+                    break
+                if bitmap & (1 << bit):
+                    acked[i % self.window] = 1
+            if progress:
+                retries = 0
+            else:
+                retries += 1
+                if retries > self.maxRetries:
+                    return self._giveUp(dst, base + firstUnacked)
+
+        self._txSeq[dst] = (base + nFrames) & _SEQ_MASK
+        elapsed = abs(ticks_diff(ticks_us(), start))
+        if elapsed > 0:
+            self.goodput = (total * 8.0) / (elapsed / 1000000.0)
+        return ERR_NONE
+
+    def recv(self, timeout_en=False, timeout_ms=0):
+        # returns (src, payload) for the next in-order frame addressed to this node, or
+        # (None, ERR_NONE) when a non-blocking radio has nothing new
+        while True:
+            if self._delivered:
+                return self._delivered.pop(0), ERR_NONE
+            if not self._rxReady():
+                return None, ERR_NONE
+            frame, state = self.radio.recv(timeout_en=timeout_en, timeout_ms=timeout_ms)
+            if state != ERR_NONE:
+                return None, state
+            self._handleData(frame)
+
+    def accepts(self, header, length):
+        # RX filter for frames addressed to someone else: radio.setRxFilter(arq.accepts, 3)
+        return length >= 3 and header[2] == self.address
+
+    def timeout_us(self):
+        turnaround = _INITIAL_TURNAROUND_US
+        if self.srtt_us:
+            turnaround = self.srtt_us + 4 * self.rttvar_us
+        return min(self.radio.getTimeOnAir(_ACK_LENGTH) + turnaround, _MAX_RTO_US)
+
+    def _giveUp(self, dst, seq):
+        # the receiver may have lost its state, the next send() opens a new session
+        self._txSeq[dst] = seq & _SEQ_MASK
+        self._synced[dst] = False
+        return ERR_ACK_NOT_RECEIVED
+
+    def _waitAck(self, dst, session, sent, sample):
+        timeout = self.timeout_us()
+        while True:
+            remaining = timeout - abs(ticks_diff(ticks_us(), sent))
+            if remaining <= 0:
+                return None
+            if not self._rxReady():
+                yield_()
+                continue
+            frame, state = self.radio.recv(timeout_en=True, timeout_ms=max(1, remaining // 1000))
+            if state != ERR_NONE or len(frame) < ARQ_HEADER_LENGTH:
+                continue
+            if (frame[0] & _TYPE_MASK) == _TYPE_DATA:
+                self._handleData(frame)
+                continue
+            if (frame[0] & _TYPE_MASK) != _TYPE_ACK or len(frame) < _ACK_LENGTH:
+                continue
+            if frame[1] != dst or frame[2] != self.address or frame[8] != session:
+                continue
+
+            if sample:
+                self._updateRtt(abs(ticks_diff(ticks_us(), sent)) - self.radio.getTimeOnAir(_ACK_LENGTH))
+            bitmap = (frame[4] << 24) | (frame[5] << 16) | (frame[6] << 8) | frame[7]
+            return frame[3], bitmap
+
+    def _rxReady(self):
+        # a non-blocking radio's recv() hands back the last packet again, so it is only read
+        # once RX_DONE says a new one arrived
+        return self.radio.blocking or self.radio.getIrqStatus() & SX126X_IRQ_RX_DONE
+
+    def _updateRtt(self, sample):
+        if sample < 0:
+            sample = 0
+        if not self.srtt_us:
+            self.srtt_us = sample
+            self.rttvar_us = sample // 2
+        else:
+            self.rttvar_us += (abs(self.srtt_us - sample) - self.rttvar_us) // 4
+            self.srtt_us += (sample - self.srtt_us) // 8
+
+    def _handleData(self, frame):
+        if len(frame) < ARQ_HEADER_LENGTH or (frame[0] & _TYPE_MASK) != _TYPE_DATA:
+            return
+        if frame[2] != self.address:
+            return
+
+        src = frame[1]
+        peer = self._rxPeers.get(src)
+        if frame[0] & _FLAG_SYN:
+            # a new session starts at this seq; a retransmitted SYN of the current one does not
+            # restart it
+            if peer is None or peer.session != frame[3]:
+                peer = _RxPeer(self.window, self.mtu, frame[3])
+                self._rxPeers[src] = peer
+        elif peer is None:
+            return
+
+        offset = (frame[3] - peer.expected) & _SEQ_MASK
+        if offset < self.window:
+            slot = frame[3] % self.window
+            if not peer.present[slot]:
+                n = len(frame) - ARQ_HEADER_LENGTH
+                peer.frames[slot][:n] = memoryview(frame)[ARQ_HEADER_LENGTH:]
+                peer.lengths[slot] = n
+                peer.present[slot] = 1
+            while True:
+                slot = peer.expected % self.window
+                if not peer.present[slot]:
+                    break
+                self._delivered.append((src, bytes(peer.frames[slot][:peer.lengths[slot]])))
+                peer.present[slot] = 0
+                peer.expected = (peer.expected + 1) & _SEQ_MASK
+        elif offset < _SEQ_HALF:
+            # beyond the window, the sender cannot have sent it yet
+            return
+
+        if frame[0] & _FLAG_ACK_REQ:
+            self._sendAck(src, peer)
+
+    def _sendAck(self, dst, peer):
+        bitmap = 0
+        for bit in range(min(self.window - 1, _MAX_WINDOW)):
+            if peer.present[(peer.expected + 1 + bit) % self.window]:
+                bitmap |= 1 << bit
+        ack = self._ack
+        ack[0] = _TYPE_ACK
+        ack[1] = self.address
+        ack[2] = dst
+        ack[3] = peer.expected
+        ack[4] = (bitmap >> 24) & 0xFF
+        ack[5] = (bitmap >> 16) & 0xFF
+        ack[6] = (bitmap >> 8) & 0xFF
+        ack[7] = bitmap & 0xFF
+        ack[8] = peer.session
+        self.radio.sendWait(ack)
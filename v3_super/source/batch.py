@@ -0,0 +1,173 @@
+# Batched time-series payloads: many readings per packet instead of one.
+#
+# A batch is seq (2), channels, count, the first reading as zigzag varints, one bit width
+# per channel, then every later reading as zigzag deltas against the one before it,
+# bit-packed LSB first at that channel's width.
+
+from telemetry import zigzag, unzigzag, putVarint, getVarint
+
+BATCH_HEADER_LENGTH = 4
+_MAX_READINGS = 255
+
+
+def _bits(n):
+    b = 0
+    while n:
+        n >>= 1
+        b += 1
+    return b
+
+
+def _varintLength(n):
+    return max(1, (_bits(n) + 6) // 7)
+
+
+class BatchEncoder:
+
+    def __init__(self, channels, scales=None, maxLength=255):
+        self.channels = channels
+        self.scales = scales or (1,) * channels
+        self.maxLength = maxLength
+        self.seq = 0
+        self._buf = bytearray(maxLength)
+        self._reset()
+
+    def _reset(self):
+        self._first = None
+        self._prev = None
+        self._deltas = []
+        self._widths = [0] * self.channels
+        self._firstLength = 0
+
+    def __len__(self):
+        return 0 if self._first is None else len(self._deltas) // self.channels + 1
+
+    def _size(self, widths, n):
+        bits = 0
+        for w in widths:
+            bits += w
+        return BATCH_HEADER_LENGTH + self._firstLength + self.channels + (bits * n + 7) // 8
+
+    def _firstSize(self, v):
+        n = 0
+        for x in v:
+            n += _varintLength(zigzag(x))
+        return n
+
+    def add(self, values):
+        # returns the finished batch when this reading no longer fits, otherwise None;
+        # the reading that did not fit starts the next batch. Raises ValueError for a
+        # reading that does not fit maxLength even on its own.
+        v = [int(round(values[i] * self.scales[i])) for i in range(self.channels)]
+        if self._first is None:
+            n = self._firstSize(v)
+            if BATCH_HEADER_LENGTH + n + self.channels > self.maxLength:
+                raise ValueError('reading does not fit maxLength')
+            self._first = v
+            self._prev = v
+            self._firstLength = n
+            return None
+
+        z = [zigzag(v[i] - self._prev[i]) for i in range(self.channels)]
+        widths = [max(self._widths[i], _bits(z[i])) for i in range(self.channels)]
+        count = len(self)
+        if count >= _MAX_READINGS or self._size(widths, count) > self.maxLength:
+            # checked before the flush so the pending batch is not lost to the ValueError
+            if BATCH_HEADER_LENGTH + self._firstSize(v) + self.channels > self.maxLength:
+                raise ValueError('reading does not fit maxLength')
+            payload = self.flush()
+            self.add(values)
+            return payload
+
+        self._deltas.extend(z)
+        self._widths = widths
+        self._prev = v
+        return None
+
+    def flush(self):
+        # returns the pending readings as one payload (a memoryview, valid until the next
+        # flush) and starts a new batch, or None when nothing is pending
+        if self._first is None:
+            return None
+        buf = self._buf
+        buf[0] = (self.seq >> 8) & 0xFF
+        buf[1] = self.seq & 0xFF
+        buf[2] = self.channels
+        buf[3] = len(self)
+        pos = BATCH_HEADER_LENGTH
+        for x in self._first:
+            pos = putVarint(buf, pos, zigzag(x))
+        for w in self._widths:
+            buf[pos] = w
+            pos += 1
+
+        acc = 0
+        nbits = 0
+        widths = self._widths
+        ch = self.channels
+        for j in range(len(self._deltas)):
+            acc |= self._deltas[j] << nbits
+            nbits += widths[j % ch]
+            while nbits >= 8:
+                buf[pos] = acc & 0xFF
+                acc >>= 8
+                nbits -= 8
+                pos += 1
+        if nbits:
+            buf[pos] = acc & 0xFF
+            pos += 1
+
+        self.seq = (self.seq + 1) & 0xFFFF
+        self._reset()
+        return memoryview(buf)[:pos]
+
+
+class BatchDecoder:
+
+    def __init__(self, scales=None):
+        self.scales = scales
+        self._seq = -1
+        self.batches = 0
+        self.lost = 0
+
+    def decode(self, data):
+        # generator over the readings in one batch, as tuples
+        if len(data) < BATCH_HEADER_LENGTH:
+            return
+        seq = (data[0] << 8) | data[1]
+        ch = data[2]
+        count = data[3]
+        if self._seq >= 0:
+            self.lost += (seq - self._seq - 1) & 0xFFFF
+        self._seq = seq
+        self.batches += 1
+
+        pos = BATCH_HEADER_LENGTH
+        prev = []
+        for _ in range(ch):
+            z, pos = getVarint(data, pos)
+            prev.append(unzigzag(z))
+        widths = data[pos:pos + ch]
+        pos += ch
+        yield self._scaled(prev)
+
+        acc = 0
+        nbits = 0
+        for _ in range(count - 1):
+            cur = []
+            for i in range(ch):
+                w = widths[i]
+                while nbits < w:
+                    acc |= data[pos] << nbits
+                    pos += 1
+                    nbits += 8
+                cur.append(prev[i] + unzigzag(acc & ((1 << w) - 1)))
+                acc >>= w
+                nbits -= w
+            prev = cur
+            yield self._scaled(cur)
+
+    def _scaled(self, v):
+        if self.scales is None:
+            return tuple(v)
+        return tuple(v[i] / self.scales[i] if self.scales[i] != 1 else v[i] for i in range(len(v)))
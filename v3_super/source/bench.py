@@ -0,0 +1,141 @@
+from _sx126x import *
+from sx126x import ticks_us, ticks_diff
+import gc
+
+try:
+    from binascii import crc32
+except ImportError:
+    crc32 = None
+
+# Timings of the common driver operations on a real board. Each scenario prints one line
+#   bench,<board>,<label>,<driver>,<scenario>,<n>,<min>,<median>,<mean>,<max>,<alloc>,<state>
+# in microseconds, alloc being heap bytes per iteration; host/bench_collect.py reads them
+# back. driver is a CRC of the driver files, so results from different builds stay apart.
+SCENARIOS = ('begin_cold', 'begin_warm', 'spi_roundtrip', 'tx16', 'tx64', 'tx255',
+             'rx_turnaround', 'config_change', 'hop')
+
+DEFAULT_BEGIN = {'freq': 923.0, 'bw': 125.0, 'sf': 9, 'cr': 7, 'power': -9}
+_DRIVER_MODULES = ('_sx126x', 'sx126x', 'sx1262')
+
+
+def boardId():
+    try:
+        import board
+        return board.board_id
+    except (ImportError, AttributeError):
+        return implementation.name
+
+
+def driverId():
+    if crc32 is None:
+        return '-'
+    import sys
+    crc = 0
+    for name in _DRIVER_MODULES:
+        path = getattr(sys.modules.get(name), '__file__', None)
+        if path is None:
+            continue
+        with open(path, 'rb') as f:
+            crc = crc32(f.read(), crc)
+    return '%08x' % (crc & 0xFFFFFFFF)
+
+
+class Bench:
+
+    def __init__(self, radio, iterations=20, label='', beginArgs=None):
+        # beginArgs defaults to the radio's own begin() arguments, or DEFAULT_BEGIN at
+        # the lowest power when begin() has not been called yet
+        self.radio = radio
+        self.iterations = iterations
+        self.label = label
+        if beginArgs is None:
+            if radio._beginArgs is not None and radio._beginArgs[0] == 'begin':
+                beginArgs = radio._beginArgs[1]
+            else:
+                beginArgs = DEFAULT_BEGIN
+        self.beginArgs = dict(beginArgs)
+        self.beginArgs['blocking'] = True
+        self.board = boardId()
+        self.driver = driverId()
+        self.results = {}
+
+    def measure(self, scenario, fn, setup=None, iterations=0):
+        # times fn() only; setup() runs untimed before every iteration
+        n = iterations or self.iterations
+        times = []
+        state = ERR_NONE
+        alloc = 0
+        for _ in range(n):
+            if setup is not None:
+                setup()
+            gc.collect()
+            before = gc.mem_free() if hasattr(gc, 'mem_free') else 0
+            start = ticks_us()
+            result = fn()
+            elapsed = ticks_diff(ticks_us(), start)
+            if hasattr(gc, 'mem_free'):
+                alloc += before - gc.mem_free()
+            if isinstance(result, tuple):
+                result = result[-1]
+            if result is not None and result != ERR_NONE:
+                state = result
+            times.append(elapsed)
+        times.sort()
+        stats = (n, times[0], times[n // 2], sum(times) // n, times[-1], alloc // n, state)
+        self.results[scenario] = stats
+        print('bench,%s,%s,%s,%s,%d,%d,%d,%d,%d,%d,%d' % ((self.board, self.label, self.driver, scenario) + stats))
+        return stats
+
+    def _begin(self):
+        return self.radio.begin(**self.beginArgs)
+
+    def _cold(self):
+        state = self.radio.reset()
+        if state != ERR_NONE:
+            return state
+        return self._begin()
+
+    def run(self, scenarios=SCENARIOS):
+        radio = self.radio
+        print('bench-start,%s,%s,%s,%s' % (self.board, self.label, self.driver, implementation.name))
+        self._begin()
+        for scenario in scenarios:
+            if scenario == 'begin_cold':
+                self.measure(scenario, self._cold, iterations=max(1, self.iterations // 4))
+            elif scenario == 'begin_warm':
+                self.measure(scenario, self._begin, iterations=max(1, self.iterations // 4))
+            elif scenario == 'spi_roundtrip':
+                # one read command: chip select, opcode, status, a byte back and the BUSY wait
+                buf = memoryview(bytearray(1))
+                cmd = [SX126X_CMD_GET_PACKET_TYPE]
+                self.measure(scenario, lambda: radio.SPIreadCommand(cmd, 1, buf, 1))
+            elif scenario.startswith('tx'):
+                payload = bytes(int(scenario[2:]))
+                self.measure(scenario, lambda: radio.send(payload))
+            elif scenario == 'rx_turnaround':
+                # from TX done to listening again
+                self.measure(scenario, radio.startReceive, setup=lambda: radio.send(b'\x00'))
+                radio.standby()
+            elif scenario == 'config_change':
+                sf = self.beginArgs.get('sf', 9)
+                other = sf + 1 if sf < 12 else sf - 1
+                self._sf = sf
+
+                def change():
+                    self._sf = other if self._sf == sf else sf
+                    return radio.setSpreadingFactor(self._sf)
+
+                self.measure(scenario, change)
+                radio.setSpreadingFactor(sf)
+            elif scenario == 'hop':
+                freq = self.beginArgs.get('freq', 923.0)
+                self._freq = freq
+
+                def hop():
+                    self._freq = freq + 0.2 if self._freq == freq else freq
+                    return radio.setFrequency(self._freq, calibrate=False)
+
+                self.measure(scenario, hop)
+                radio.setFrequency(freq)
+        print('bench-end,%s,%s,%s' % (self.board, self.label, self.driver))
+        return self.results
@@ -0,0 +1,288 @@
+from _sx126x import *
+
+# Authenticated encryption for payloads: AES-CTR with a truncated AES-CMAC tag
+# (encrypt-then-MAC, separate derived keys for the two).
+#
+# Frame: src, dst, counter (4), ciphertext, tag. The counter is the sender's packet counter;
+# it makes every keystream unique and is checked for replays. A counter must never repeat
+# under one key, so persist txCounter across reboots (e.g. in nvm) or rotate keys.
+SECURE_HEADER_LENGTH = const(6)
+_BLOCK = const(16)
+
+try:
+    import aesio
+
+    def _ecb(key):
+        return aesio.AES(key, aesio.MODE_ECB).encrypt_into
+except ImportError:
+    try:
+        from ucryptolib import aes
+
+        def _ecb(key):
+            return aes(key, 1).encrypt
+    except ImportError:
+        _ecb = None
+
+# Pure Python AES encryption, used on the host and on boards without aesio
+_SBOX = bytearray(256)
+_p = 1
+_q = 1
+while True:
+    _p ^= ((_p << 1) ^ (0x1B if _p & 0x80 else 0)) & 0xFF
+    _q ^= _q << 1
+    _q ^= _q << 2
+    _q ^= _q << 4
+    _q &= 0xFF
+    if _q & 0x80:
+        _q ^= 0x09
+    _SBOX[_p] = (_q ^ ((_q << 1) | (_q >> 7)) ^ ((_q << 2) | (_q >> 6)) ^ ((_q << 3) | (_q >> 5)) ^ ((_q << 4) | (_q >> 4)) ^ 0x63) & 0xFF
+    if _p == 1:
+        break
+_SBOX[0] = 0x63
+del _p, _q
+
+
+def _xtime(a):
+    a <<= 1
+    return (a ^ 0x1B) & 0xFF if a & 0x100 else a
+
+
+class _AES:
+
+    def __init__(self, key):
+        # the expanded key schedule is computed once, here
+        nk = len(key) // 4
+        self.rounds = nk + 6
+        w = bytearray(key)
+        rcon = 1
+        i = nk
+        while len(w) < 16 * (self.rounds + 1):
+            t = w[-4:]
+            if i % nk == 0:
+                t = bytearray((_SBOX[t[1]] ^ rcon, _SBOX[t[2]], _SBOX[t[3]], _SBOX[t[0]]))
+                rcon = _xtime(rcon)
+            elif nk > 6 and i % nk == 4:
+                t = bytearray(_SBOX[b] for b in t)
+            base = len(w) - 4 * nk
+            w.extend(bytearray(w[base + j] ^ t[j] for j in range(4)))
+            i += 1
+        self.w = w
+
+    def encrypt_into(self, src, dst):
+        w = self.w
+        s = bytearray(src[j] ^ w[j] for j in range(16))
+        t = bytearray(16)
+        for r in range(1, self.rounds + 1):
+            # SubBytes and ShiftRows
+            for c in range(4):
+                for row in range(4):
+                    t[4 * c + row] = _SBOX[s[4 * ((c + row) & 3) + row]]
+            # MixColumns, skipped in the last round
+            if r != self.rounds:
+                for c in range(4):
+                    a0, a1, a2, a3 = t[4 * c], t[4 * c + 1], t[4 * c + 2], t[4 * c + 3]
+                    x = a0 ^ a1 ^ a2 ^ a3
+                    t[4 * c] = a0 ^ x ^ _xtime(a0 ^ a1)
+                    t[4 * c + 1] = a1 ^ x ^ _xtime(a1 ^ a2)
+                    t[4 * c + 2] = a2 ^ x ^ _xtime(a2 ^ a3)
+                    t[4 * c + 3] = a3 ^ x ^ _xtime(a3 ^ a0)
+            k = 16 * r
+            for j in range(16):
+                s[j] = t[j] ^ w[k + j]
+        dst[:16] = s
+
+
+def _cipher(key):
+    if _ecb is not None:
+        return _ecb(bytes(key))
+    return _AES(key).encrypt_into
+
+
+def _shift(block):
+    # CMAC subkey derivation: left shift by one bit, folding in 0x87 on carry
+    out = bytearray(_BLOCK)
+    carry = 0
+    for i in range(_BLOCK - 1, -1, -1):
+        b = block[i]
+        out[i] = ((b << 1) | carry) & 0xFF
+        carry = b >> 7
+    if carry:
+        out[_BLOCK - 1] ^= 0x87
+    return out
+
+
+class _Peer:
+
+    def __init__(self, key):
+        derive = _cipher(key)
+        enc = bytearray(_BLOCK)
+        mac = bytearray(_BLOCK)
+        derive(bytes([1] + [0] * 15), enc)
+        derive(bytes([2] + [0] * 15), mac)
+        if len(key) == 32:
+            extra = bytearray(_BLOCK)
+            derive(bytes([3] + [0] * 15), extra)
+            enc = enc + extra
+            derive(bytes([4] + [0] * 15), extra)
+            mac = mac + extra
+        self.enc = _cipher(enc)
+        self.mac = _cipher(mac)
+        l = bytearray(_BLOCK)
+        self.mac(bytes(_BLOCK), l)
+        self.k1 = _shift(l)
+        self.k2 = _shift(self.k1)
+
+
+class SecureLink:
+
+    def __init__(self, radio, address, key, macLength=4, counter=0):
+        self.radio = radio
+        self.address = address
+        self.macLength = macLength
+        self.txCounter = counter
+        self._default = _Peer(key)
+        self._peers = {}
+        # replay window per source address, whichever key its frames came under
+        self._lastCounter = {}
+
+        self._frame = bytearray(SX126X_MAX_PACKET_LENGTH)
+        self._frame_mv = memoryview(self._frame)
+        self._rx = bytearray(SX126X_MAX_PACKET_LENGTH)
+        self._block = bytearray(_BLOCK)
+        self._ks = bytearray(_BLOCK)
+
+        self.rejected = 0
+        self.replayed = 0
+
+    def addPeer(self, address, key):
+        # pairwise key for unicasts to and from one peer; everyone else, and all broadcasts,
+        # use the network key
+        self._peers[address] = _Peer(key)
+
+    def removePeer(self, address):
+        self._peers.pop(address, None)
+
+    def _peer(self, address, dst):
+        # broadcasts always go under the network key, so both ends pick the same key
+        if dst == 0xFF:
+            return self._default
+        return self._peers.get(address, self._default)
+
+    def seal(self, data, dst=0xFF):
+        # returns the finished frame as a memoryview of the TX buffer, valid until the next seal()
+        n = len(data)
+        if n > SX126X_MAX_PACKET_LENGTH - SECURE_HEADER_LENGTH - self.macLength:
+            return None
+        peer = self._peer(dst, dst)
+        counter = self.txCounter
+        self.txCounter = (counter + 1) & 0xFFFFFFFF
+
+        f = self._frame
+        f[0] = self.address
+        f[1] = dst
+        f[2] = (counter >> 24) & 0xFF
+        f[3] = (counter >> 16) & 0xFF
+        f[4] = (counter >> 8) & 0xFF
+        f[5] = counter & 0xFF
+        # the plaintext is encrypted straight into the frame, no intermediate copy
+        self._ctr(peer, f, data, SECURE_HEADER_LENGTH, n)
+        end = SECURE_HEADER_LENGTH + n
+        self._cmac(peer, f, end)
+        f[end:end + self.macLength] = self._block[:self.macLength]
+        return self._frame_mv[:end + self.macLength]
+
+    def open(self, frame):
+        # returns (src, plaintext memoryview) or (None, error); the plaintext is valid until the next open()
+        n = len(frame) - SECURE_HEADER_LENGTH - self.macLength
+        if n < 0:
+            return None, ERR_FRAME_MALFORMED
+        src = frame[0]
+        dst = frame[1]
+        if dst != self.address and dst != 0xFF:
+            return None, ERR_FRAME_UNEXPECTED_ID
+        peer = self._peer(src, dst)
+
+        end = SECURE_HEADER_LENGTH + n
+        self._cmac(peer, frame, end)
+        diff = 0
+        for i in range(self.macLength):
+            diff |= frame[end + i] ^ self._block[i]
+        if diff:
+            self.rejected += 1
+            return None, ERR_FRAME_INCORRECT_CHECKSUM
+
+        counter = (frame[2] << 24) | (frame[3] << 16) | (frame[4] << 8) | frame[5]
+        if counter <= self._lastCounter.get(src, -1):
+            self.replayed += 1
+            return None, ERR_FRAME_UNEXPECTED_ID
+        self._lastCounter[src] = counter
+
+        self._ctr(peer, self._rx, memoryview(frame)[SECURE_HEADER_LENGTH:end], 0, n, frame)
+        return src, memoryview(self._rx)[:n]
+
+    def send(self, data, dst=0xFF):
+        frame = self.seal(data, dst)
+        if frame is None:
+            return 0, ERR_PACKET_TOO_LONG
+        _, state = self.radio.send(frame)
+        return len(data), state
+
+    def recv(self, len=0, timeout_en=False, timeout_ms=0):
+        # returns ((src, plaintext), state)
+        frame, state = self.radio.recv(len=len, timeout_en=timeout_en, timeout_ms=timeout_ms)
+        if state != ERR_NONE:
+            return None, state
+        src, data = self.open(frame)
+        if src is None:
+            return None, data
+        return (src, data), ERR_NONE
+
+    def _ctr(self, peer, out, data, pos, n, header=None):
+        # counter block: 0x01, src, dst, packet counter (4), zeros, block index (2)
+        if header is None:
+            header = self._frame
+        block = self._block
+        ks = self._ks
+        block[0] = 1
+        block[1:6] = header[0:SECURE_HEADER_LENGTH - 1]
+        block[6] = header[5]
+        for i in range(7, 14):
+            block[i] = 0
+        enc = peer.enc
+        i = 0
+        b = 0
+        while i < n:
+            block[14] = b >> 8
+            block[15] = b & 0xFF
+            enc(block, ks)
+            m = min(_BLOCK, n - i)
+            for j in range(m):
+                out[pos + i + j] = data[i + j] ^ ks[j]
+            i += m
+            b += 1
+
+    def _cmac(self, peer, frame, end):
+        # AES-CMAC (RFC 4493) over header and ciphertext, tag left in self._block
+        x = self._block
+        for i in range(_BLOCK):
+            x[i] = 0
+        mac = peer.mac
+        pos = 0
+        while end - pos > _BLOCK:
+            for i in range(_BLOCK):
+                x[i] ^= frame[pos + i]
+            mac(x, x)
+            pos += _BLOCK
+        rem = end - pos
+        if rem == _BLOCK:
+            k = peer.k1
+            for i in range(_BLOCK):
+                x[i] ^= frame[pos + i] ^ k[i]
+        else:
+            k = peer.k2
+            for i in range(_BLOCK):
+                x[i] ^= k[i]
+            for i in range(rem):
+                x[i] ^= frame[pos + i]
+            x[rem] ^= 0x80
+        mac(x, x)
@@ -0,0 +1,124 @@
+from _sx126x import *
+from sx126x import ticks_ms, ticks_diff
+
+# ETSI EN 300 220 style sub-bands: (low MHz, high MHz, duty cycle)
+EU868_SUBBANDS = (
+    (863.0, 865.0, 0.001),
+    (865.0, 868.0, 0.01),
+    (868.0, 868.6, 0.01),
+    (868.7, 869.2, 0.001),
+    (869.4, 869.65, 0.1),
+    (869.7, 870.0, 0.01),
+)
+
+
+class _Bucket:
+
+    def __init__(self, dutyCycle, window_ms):
+        # the bucket holds at most one window's worth of airtime, refilled continuously
+        self.rate = dutyCycle
+        self.capacity = int(dutyCycle * window_ms * 1000)
+        self.tokens = self.capacity
+        self.last = ticks_ms()
+
+    def refill(self):
+        now = ticks_ms()
+        gained = int(abs(ticks_diff(now, self.last)) * 1000 * self.rate)
+        # only advance once a whole microsecond has accrued, so frequent calls do not round it away
+        if gained:
+            self.tokens = min(self.capacity, self.tokens + gained)
+            self.last = now
+        return self.tokens
+
+
+class DutyCycle:
+
+    def __init__(self, radio, freq, subbands=EU868_SUBBANDS, window_ms=3600000, queueLength=4):
+        self.radio = radio
+        self.window_ms = window_ms
+        self._subbands = subbands
+        self._buckets = [_Bucket(dc, window_ms) for _, _, dc in subbands]
+        self._queue = []
+        self.queueLength = queueLength
+        self.freq = freq
+        self.airtimeUsed = 0
+        self.rejected = 0
+
+    def setFrequency(self, freq):
+        state = self.radio.setFrequency(freq)
+        if state == ERR_NONE:
+            self.freq = freq
+        return state
+
+    def subband(self, freq=None):
+        if freq is None:
+            freq = self.freq
+        for i in range(len(self._subbands)):
+            lo, hi, _ = self._subbands[i]
+            if lo <= freq < hi:
+                return i
+        return -1
+
+    def cost(self, len_):
+        return self.radio.getTimeOnAir(len_)
+
+    def time_until_can_send(self, len_):
+        # milliseconds until a packet of len_ bytes fits the current sub-band's budget, -1 if never
+        i = self.subband()
+        if i < 0:
+            return 0
+        bucket = self._buckets[i]
+        cost = self.cost(len_)
+        if cost > bucket.capacity:
+            return -1
+        missing = cost - bucket.refill()
+        if missing <= 0:
+            return 0
+        return int(missing / (bucket.rate * 1000)) + 1
+
+    def send(self, data, queue=False):
+        # charges the exact time-on-air; over budget packets are queued for flush(), or rejected
+        # with ERR_DUTY_CYCLE_EXCEEDED (ERR_QUEUE_FULL) and can be retried after time_until_can_send()
+        if queue and self._queue:
+            return self._enqueue(data)
+
+        i = self.subband()
+        cost = self.cost(len(data))
+        if i >= 0:
+            bucket = self._buckets[i]
+            if bucket.refill() < cost:
+                if queue:
+                    return self._enqueue(data)
+                self.rejected += 1
+                return 0, ERR_DUTY_CYCLE_EXCEEDED
+
+        n, state = self.radio.send(data)
+        if state == ERR_NONE:
+            if i >= 0:
+                bucket.tokens -= cost
+            self.airtimeUsed += cost
+        return n, state
+
+    def flush(self):
+        # sends queued packets while the budget allows, returns how many were sent
+        sent = 0
+        while self._queue:
+            if self.time_until_can_send(len(self._queue[0])) != 0:
+                break
+            # dequeued only once it went out, a failed send stays at the head for the next flush()
+            _, state = self.send(self._queue[0])
+            if state != ERR_NONE:
+                break
+            self._queue.pop(0)
+            sent += 1
+        return sent
+
+    def pending(self):
+        return len(self._queue)
+
+    def _enqueue(self, data):
+        if len(self._queue) >= self.queueLength:
+            self.rejected += 1
+            return 0, ERR_QUEUE_FULL
+        self._queue.append(bytes(data))
+        return len(data), ERR_NONE
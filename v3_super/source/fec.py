@@ -0,0 +1,291 @@
+from _sx126x import *
+from sx126x import ticks_ms, ticks_diff
+
+# Systematic Reed-Solomon erasure code over GF(256). A message is cut into k data shards and
+# n - k parity shards are added, one shard per packet. Byte b of every shard forms one RS
+# codeword, so each codeword is interleaved across all n packets and a lost packet costs every
+# codeword exactly one erasure: any k packets rebuild the message.
+#
+# Shard header: source address, message id, k, n, shard index, padding added to the last
+# data shard. Message ids are only unique per sender, so the decoder keeps messages apart by
+# (source, id).
+FEC_HEADER_LENGTH = const(6)
+FEC_MAX_SHARDS = const(255)
+
+# GF(256) log/antilog tables for the 0x11D polynomial, doubled so products need no modulo
+_EXP = bytearray(512)
+_LOG = bytearray(256)
+_x = 1
+for _i in range(255):
+    _EXP[_i] = _x
+    _LOG[_x] = _i
+    _x <<= 1
+    if _x & 0x100:
+        _x ^= 0x11D
+for _i in range(255, 512):
+    _EXP[_i] = _EXP[_i - 255]
+del _x, _i
+
+
+def gfMul(a, b):
+    if a == 0 or b == 0:
+        return 0
+    return _EXP[_LOG[a] + _LOG[b]]
+
+
+def gfInv(a):
+    return _EXP[255 - _LOG[a]]
+
+
+def _coef(row, col):
+    # Cauchy matrix below the identity: every k x k selection of rows is invertible
+    return gfInv(row ^ col)
+
+
+def _mulTable(c):
+    t = bytearray(256)
+    lc = _LOG[c]
+    for x in range(1, 256):
+        t[x] = _EXP[lc + _LOG[x]]
+    return t
+
+
+def _addMul(dst, src, c, n):
+    # dst[:n] ^= c * src[:n]; the per-coefficient table keeps the inner loop to a lookup and a xor
+    if c == 0:
+        return
+    if c == 1:
+        for b in range(n):
+            dst[b] ^= src[b]
+        return
+    t = _mulTable(c)
+    for b in range(n):
+        dst[b] ^= t[src[b]]
+
+
+def _invert(m, e):
+    # Gauss-Jordan over GF(256) on an e x e list of bytearrays, in place
+    inv = [bytearray(e) for _ in range(e)]
+    for i in range(e):
+        inv[i][i] = 1
+    for c in range(e):
+        p = c
+        while m[p][c] == 0:
+            p += 1
+        m[c], m[p] = m[p], m[c]
+        inv[c], inv[p] = inv[p], inv[c]
+        s = gfInv(m[c][c])
+        for j in range(e):
+            m[c][j] = gfMul(m[c][j], s)
+            inv[c][j] = gfMul(inv[c][j], s)
+        for r in range(e):
+            f = m[r][c]
+            if r != c and f:
+                for j in range(e):
+                    m[r][j] ^= gfMul(f, m[c][j])
+                    inv[r][j] ^= gfMul(f, inv[c][j])
+    return inv
+
+
+class FECEncoder:
+
+    def __init__(self, radio, address, k=4, n=6, mtu=SX126X_MAX_PACKET_LENGTH):
+        self.radio = radio
+        self.address = address
+        self.k = k
+        self.n = n
+        self.shardSize = mtu - FEC_HEADER_LENGTH
+        self._frame = bytearray(mtu)
+        self._frame_mv = memoryview(self._frame)
+        self._parity = [bytearray(self.shardSize) for _ in range(n - k)]
+        self._msgId = 0
+        self.shardsSent = 0
+
+    def send(self, data):
+        k = self.k
+        length = len(data)
+        if k < 1 or self.n > FEC_MAX_SHARDS or self.n < k:
+            return ERR_INVALID_CODING_RATE
+        if length > k * self.shardSize:
+            return ERR_PACKET_TOO_LONG
+        self._msgId = (self._msgId + 1) & 0xFF
+        shardLen = max(1, (length + k - 1) // k)
+        pad = k * shardLen - length
+
+        data = memoryview(data)
+        frame_mv = self._frame_mv
+        payload = frame_mv[FEC_HEADER_LENGTH:FEC_HEADER_LENGTH + shardLen]
+        for p in self._parity:
+            for b in range(shardLen):
+                p[b] = 0
+
+        for i in range(k):
+            # the data shard is built in the frame, so parity is accumulated from it directly
+            n = max(0, min(shardLen, length - i * shardLen))
+            payload[:n] = data[i * shardLen:i * shardLen + n]
+            for b in range(n, shardLen):
+                payload[b] = 0
+            for j in range(self.n - k):
+                _addMul(self._parity[j], payload, _coef(k + j, i), shardLen)
+            state = self._sendShard(i, pad, shardLen)
+            if state != ERR_NONE:
+                return state
+
+        for j in range(self.n - k):
+            payload[:] = memoryview(self._parity[j])[:shardLen]
+            state = self._sendShard(k + j, pad, shardLen)
+            if state != ERR_NONE:
+                return state
+        return ERR_NONE
+
+    def _sendShard(self, index, pad, shardLen):
+        f = self._frame
+        f[0] = self.address
+        f[1] = self._msgId
+        f[2] = self.k
+        f[3] = self.n
+        f[4] = index
+        f[5] = pad
+        # shards go out back to back, each one has to be off the air before the frame is rebuilt
+        _, state = self.radio.sendWait(self._frame_mv[:FEC_HEADER_LENGTH + shardLen])
+        if state == ERR_NONE:
+            self.shardsSent += 1
+        return state
+
+
+class FECDecoder:
+
+    def __init__(self, slots=2, maxK=8, timeout_ms=30000, mtu=SX126X_MAX_PACKET_LENGTH):
+        self.shardSize = mtu - FEC_HEADER_LENGTH
+        self.maxK = maxK
+        self.timeout_ms = timeout_ms
+
+        # only the first k shards of a message are kept, so a slot never needs more than maxK rows
+        self._rows = [bytearray(maxK * self.shardSize) for _ in range(slots)]
+        self._index = [bytearray(maxK) for _ in range(slots)]
+        self._key = [-1] * slots
+        self._count = [0] * slots
+        self._done = [False] * slots
+        self._start = [0] * slots
+        self._out = bytearray(maxK * self.shardSize)
+
+        self.messagesDecoded = 0
+        self.messagesRepaired = 0
+        self.messagesEvicted = 0
+        self.shardsDropped = 0
+
+    def recv(self, radio, timeout_en=False, timeout_ms=0):
+        # receives shards until a message can be rebuilt or the radio reports an error
+        while True:
+            frame, state = radio.recv(timeout_en=timeout_en, timeout_ms=timeout_ms)
+            if state != ERR_NONE:
+                return None, state
+            msg = None
+            if len(frame) > 0:
+                msg = self.push(frame)
+            if msg is not None or not radio.blocking:
+                return msg, ERR_NONE
+
+    def push(self, frame):
+        # returns a memoryview of the rebuilt message, valid until the next message is rebuilt
+        shardLen = len(frame) - FEC_HEADER_LENGTH
+        if shardLen < 1 or shardLen > self.shardSize:
+            self.shardsDropped += 1
+            return None
+        key = (frame[0] << 8) | frame[1]
+        k, n, index, pad = frame[2], frame[3], frame[4], frame[5]
+        if k < 1 or k > self.maxK or n < k or index >= n or pad > k * shardLen:
+            self.shardsDropped += 1
+            return None
+
+        self.evict()
+        slot = self._slotFor(key)
+        if self._done[slot]:
+            return None
+
+        count = self._count[slot]
+        idx = self._index[slot]
+        for i in range(count):
+            if idx[i] == index:
+                return None
+        idx[count] = index
+        rows = memoryview(self._rows[slot])
+        rows[count * shardLen:(count + 1) * shardLen] = memoryview(frame)[FEC_HEADER_LENGTH:]
+        count += 1
+        self._count[slot] = count
+        if count < k:
+            return None
+
+        self._done[slot] = True
+        self.messagesDecoded += 1
+        return self._decode(slot, k, shardLen, pad)
+
+    def _decode(self, slot, k, shardLen, pad):
+        out = memoryview(self._out)
+        rows = memoryview(self._rows[slot])
+        idx = self._index[slot]
+
+        have = bytearray(k)
+        parity = []
+        for r in range(k):
+            i = idx[r]
+            if i < k:
+                out[i * shardLen:(i + 1) * shardLen] = rows[r * shardLen:(r + 1) * shardLen]
+                have[i] = 1
+            else:
+                parity.append(r)
+        missing = [i for i in range(k) if not have[i]]
+        e = len(missing)
+
+        if e:
+            self.messagesRepaired += 1
+            # strip the known data shards from each parity shard, leaving an e x e system
+            # in the missing ones
+            for r in parity:
+                p = rows[r * shardLen:(r + 1) * shardLen]
+                for i in range(k):
+                    if have[i]:
+                        _addMul(p, out[i * shardLen:(i + 1) * shardLen], _coef(idx[r], i), shardLen)
+            inv = _invert([bytearray(_coef(idx[r], i) for i in missing) for r in parity], e)
+            for c in range(e):
+                dst = out[missing[c] * shardLen:(missing[c] + 1) * shardLen]
+                for b in range(shardLen):
+                    dst[b] = 0
+                for j in range(e):
+                    r = parity[j]
+                    _addMul(dst, rows[r * shardLen:(r + 1) * shardLen], inv[c][j], shardLen)
+
+        return out[:k * shardLen - pad]
+
+    def evict(self):
+        now = ticks_ms()
+        for slot in range(len(self._rows)):
+            if self._key[slot] >= 0 and abs(ticks_diff(now, self._start[slot])) > self.timeout_ms:
+                if not self._done[slot]:
+                    self.messagesEvicted += 1
+                self._free(slot)
+
+    def _slotFor(self, key):
+        oldest = 0
+        for slot in range(len(self._rows)):
+            if self._key[slot] == key:
+                return slot
+        for slot in range(len(self._rows)):
+            if self._key[slot] < 0:
+                oldest = slot
+                break
+            if ticks_diff(self._start[slot], self._start[oldest]) < 0:
+                oldest = slot
+        else:
+            if not self._done[oldest]:
+                self.messagesEvicted += 1
+            self._free(oldest)
+
+        self._key[oldest] = key
+        self._start[oldest] = ticks_ms()
+        return oldest
+
+    def _free(self, slot):
+        self._key[slot] = -1
+        self._count[slot] = 0
+        self._done[slot] = False
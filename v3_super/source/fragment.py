@@ -0,0 +1,200 @@
+from _sx126x import *
+from sx126x import ticks_ms, ticks_diff
+
+# Fragment header: source address, message id, then a 16 bit field holding the fragment
+# index in the lower 15 bits and the "last fragment" flag in the top bit. Message ids are
+# only unique per sender, so the receiver keeps messages apart by (source, id).
+FRAG_HEADER_LENGTH = const(4)
+_FRAG_LAST = const(0x8000)
+_FRAG_INDEX_MASK = const(0x7FFF)
+
+
+class Fragmenter:
+
+    def __init__(self, radio, address, mtu=SX126X_MAX_PACKET_LENGTH):
+        self.radio = radio
+        self.address = address
+        self.mtu = mtu
+        self.fragSize = mtu - FRAG_HEADER_LENGTH
+        self._frame = bytearray(mtu)
+        self._frame_mv = memoryview(self._frame)
+        self._msgId = 0
+        self.fragmentsSent = 0
+
+    def send(self, data):
+        # data may be bytes-like or an iterable (e.g. a generator) of bytes-like chunks
+        self._msgId = (self._msgId + 1) & 0xFF
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            chunks = iter((data,))
+        else:
+            chunks = iter(data)
+
+        index = 0
+        fill = 0
+        pending = None
+        pendingPos = 0
+        while True:
+            if pending is None:
+                try:
+                    pending = memoryview(next(chunks))
+                except StopIteration:
+                    break
+                pendingPos = 0
+
+            n = min(self.fragSize - fill, len(pending) - pendingPos)
+            start = FRAG_HEADER_LENGTH + fill
+            self._frame_mv[start:start + n] = pending[pendingPos:pendingPos + n]
+            fill += n
+            pendingPos += n
+            if pendingPos >= len(pending):
+                pending = None
+
+            if fill == self.fragSize:
+                # only flush a full fragment once more data is known to follow,
+                # otherwise it has to carry the last flag
+                if pending is None:
+                    try:
+                        pending = memoryview(next(chunks))
+                        pendingPos = 0
+                    except StopIteration:
+                        break
+                if index > _FRAG_INDEX_MASK:
+                    return ERR_PACKET_TOO_LONG
+                state = self._sendFragment(index, fill, False)
+                if state != ERR_NONE:
+                    return state
+                index += 1
+                fill = 0
+
+        if index > _FRAG_INDEX_MASK:
+            return ERR_PACKET_TOO_LONG
+        return self._sendFragment(index, fill, True)
+
+    def _sendFragment(self, index, fill, last):
+        field = index | _FRAG_LAST if last else index
+        self._frame[0] = self.address
+        self._frame[1] = self._msgId
+        self._frame[2] = (field >> 8) & 0xFF
+        self._frame[3] = field & 0xFF
+        # fragments go out back to back, each one has to be off the air before the next
+        _, state = self.radio.sendWait(self._frame_mv[:FRAG_HEADER_LENGTH + fill])
+        if state == ERR_NONE:
+            self.fragmentsSent += 1
+        return state
+
+
+class Reassembler:
+
+    def __init__(self, slots=2, maxSize=4096, timeout_ms=30000, mtu=SX126X_MAX_PACKET_LENGTH):
+        self.fragSize = mtu - FRAG_HEADER_LENGTH
+        self.maxSize = maxSize
+        self.maxFragments = (maxSize + self.fragSize - 1) // self.fragSize
+        self.timeout_ms = timeout_ms
+
+        # the pool is allocated once; messages are written straight into it
+        self._buf = [bytearray(maxSize) for _ in range(slots)]
+        self._bitmap = [bytearray((self.maxFragments + 7) // 8) for _ in range(slots)]
+        self._key = [-1] * slots
+        self._count = [0] * slots
+        self._last = [-1] * slots
+        self._length = [0] * slots
+        self._start = [0] * slots
+        self._delivered = -1
+
+        self.messagesCompleted = 0
+        self.messagesEvicted = 0
+        self.fragmentsDropped = 0
+
+    def recv(self, radio, timeout_en=False, timeout_ms=0):
+        # receives fragments until a message completes or the radio reports an error
+        while True:
+            frame, state = radio.recv(timeout_en=timeout_en, timeout_ms=timeout_ms)
+            if state != ERR_NONE:
+                return None, state
+            msg = None
+            if len(frame) > 0:
+                msg = self.push(frame)
+            if msg is not None or not radio.blocking:
+                return msg, ERR_NONE
+
+    def push(self, frame):
+        # returns a memoryview of the completed message; it stays valid until the next push()
+        if self._delivered >= 0:
+            self._free(self._delivered)
+            self._delivered = -1
+
+        if len(frame) < FRAG_HEADER_LENGTH:
+            self.fragmentsDropped += 1
+            return None
+
+        key = (frame[0] << 8) | frame[1]
+        field = (frame[2] << 8) | frame[3]
+        index = field & _FRAG_INDEX_MASK
+        last = field & _FRAG_LAST
+        n = len(frame) - FRAG_HEADER_LENGTH
+
+        if index >= self.maxFragments or (not last and n != self.fragSize):
+            self.fragmentsDropped += 1
+            return None
+        offset = index * self.fragSize
+        if offset + n > self.maxSize:
+            self.fragmentsDropped += 1
+            return None
+
+        self.evict()
+        slot = self._slotFor(key)
+
+        bitmap = self._bitmap[slot]
+        bit = 1 << (index & 7)
+        if bitmap[index >> 3] & bit:
+            return None
+        bitmap[index >> 3] |= bit
+
+        self._buf[slot][offset:offset + n] = memoryview(frame)[FRAG_HEADER_LENGTH:]
+        self._count[slot] += 1
+        if last:
+            self._last[slot] = index
+            self._length[slot] = offset + n
+
+        if self._last[slot] >= 0 and self._count[slot] == self._last[slot] + 1:
+            self._delivered = slot
+            self.messagesCompleted += 1
+            return memoryview(self._buf[slot])[:self._length[slot]]
+
+        return None
+
+    def evict(self):
+        now = ticks_ms()
+        for slot in range(len(self._buf)):
+            if self._key[slot] >= 0 and abs(ticks_diff(now, self._start[slot])) > self.timeout_ms:
+                self._free(slot)
+                self.messagesEvicted += 1
+
+    def _slotFor(self, key):
+        # key: source address and message id as one int; -1 marks a free slot
+        oldest = 0
+        for slot in range(len(self._buf)):
+            if self._key[slot] == key:
+                return slot
+        for slot in range(len(self._buf)):
+            if self._key[slot] < 0:
+                oldest = slot
+                break
+            if ticks_diff(self._start[slot], self._start[oldest]) < 0:
+                oldest = slot
+        else:
+            self._free(oldest)
+            self.messagesEvicted += 1
+
+        self._key[oldest] = key
+        self._start[oldest] = ticks_ms()
+        return oldest
+
+    def _free(self, slot):
+        self._key[slot] = -1
+        self._count[slot] = 0
+        self._last[slot] = -1
+        self._length[slot] = 0
+        bitmap = self._bitmap[slot]
+        for i in range(len(bitmap)):
+            bitmap[i] = 0
@@ -0,0 +1,164 @@
+from _sx126x import *
+from sx126x import ticks_ms, ticks_diff, ticks_add, frfFromMhz
+
+# hop index and milliseconds into the current dwell at the start of transmission
+HOP_HEADER_LENGTH = const(4)
+_HOP_MASK = const(0xFFFF)
+# re-anchor the hop clock well before ticks_diff() stops being meaningful
+_REANCHOR_MS = const(3600000)
+
+
+class HopScheduler:
+
+    def __init__(self, radio, channels, seed, dwell_ms=400, budget_ms=400, budgetPeriod_ms=20000):
+        self.radio = radio
+        self.channels = channels
+        self.seed = seed
+        self.dwell_ms = dwell_ms
+        self.budget_us = budget_ms * 1000
+        self.budgetPeriod_ms = budgetPeriod_ms
+
+        # SetRfFrequency payloads, so a hop is a single SPI write with nothing to compute
+        self._frfs = []
+        self._frfData = []
+        for freq in channels:
+            frf = frfFromMhz(freq)
+            self._frfs.append(frf)
+            self._frfData.append([(frf >> 24) & 0xFF, (frf >> 16) & 0xFF, (frf >> 8) & 0xFF, frf & 0xFF])
+
+        n = len(channels)
+        self._perm = bytearray(n)
+        self._permCycle = -1
+        self._used = [0] * n
+        self._usedStart = [ticks_ms()] * n
+        self._channel = -1
+
+        self._epoch = ticks_ms()
+        self._hopBase = 0
+        self.synced = False
+
+        self._frame = bytearray(SX126X_MAX_PACKET_LENGTH)
+        self._frame_mv = memoryview(self._frame)
+
+        self.hops = 0
+        self.rejected = 0
+
+    def begin(self, master=False):
+        # image calibration covers the band, so it is done once here rather than per hop;
+        # the master owns the hop clock, everyone else camps until sync()
+        lo = min(self.channels)
+        state = self.radio.setFrequency(lo)
+        if state != ERR_NONE:
+            return state
+        self._channel = self.channels.index(lo)
+        self.synced = master
+        return ERR_NONE
+
+    def channelAt(self, hop):
+        n = len(self.channels)
+        cycle = hop // n
+        if cycle != self._permCycle:
+            self._shuffle(cycle)
+        return self._perm[hop % n]
+
+    def currentHop(self):
+        now = ticks_ms()
+        elapsed = ticks_diff(now, self._epoch)
+        if elapsed >= _REANCHOR_MS:
+            k = elapsed // self.dwell_ms
+            self._epoch = ticks_add(self._epoch, k * self.dwell_ms)
+            self._hopBase = (self._hopBase + k) & _HOP_MASK
+            elapsed -= k * self.dwell_ms
+        return (self._hopBase + elapsed // self.dwell_ms) & _HOP_MASK, elapsed % self.dwell_ms
+
+    def hop(self):
+        hop, offset = self.currentHop()
+        channel = self.channelAt(hop)
+        if channel != self._channel:
+            state = self.radio.SPIwriteCommand([SX126X_CMD_SET_RF_FREQUENCY], 1, self._frfData[channel], 4)
+            if state != ERR_NONE:
+                return hop, offset, state
+            # kept in step with the driver so a watchdog recovery comes back on this channel
+            self.radio._frf = self._frfs[channel]
+            self._channel = channel
+            self.hops += 1
+        return hop, offset, ERR_NONE
+
+    def timeUntilHop(self):
+        return self.dwell_ms - self.currentHop()[1]
+
+    def airtimeLeft(self, channel):
+        if abs(ticks_diff(ticks_ms(), self._usedStart[channel])) >= self.budgetPeriod_ms:
+            self._used[channel] = 0
+            self._usedStart[channel] = ticks_ms()
+        return self.budget_us - self._used[channel]
+
+    def send(self, data):
+        n = len(data)
+        if n > SX126X_MAX_PACKET_LENGTH - HOP_HEADER_LENGTH:
+            return 0, ERR_PACKET_TOO_LONG
+
+        hop, offset, state = self.hop()
+        if state != ERR_NONE:
+            return 0, state
+
+        airtime = self.radio.getTimeOnAir(n + HOP_HEADER_LENGTH)
+        # the packet has to end inside this dwell and fit the channel budget; retry after
+        # timeUntilHop(), or once the channel's budget period has passed
+        if (self.dwell_ms - offset) * 1000 < airtime:
+            self.rejected += 1
+            return 0, ERR_DWELL_EXCEEDED
+        if self.airtimeLeft(self._channel) < airtime:
+            self.rejected += 1
+            return 0, ERR_BUDGET_EXCEEDED
+
+        frame = self._frame
+        frame[0] = (hop >> 8) & 0xFF
+        frame[1] = hop & 0xFF
+        frame[2] = (offset >> 8) & 0xFF
+        frame[3] = offset & 0xFF
+        self._frame_mv[HOP_HEADER_LENGTH:HOP_HEADER_LENGTH + n] = data
+        _, state = self.radio.send(self._frame_mv[:HOP_HEADER_LENGTH + n])
+        if state == ERR_NONE:
+            self._used[self._channel] += airtime
+        return n, state
+
+    def recv(self, timeout_en=False, timeout_ms=0):
+        if self.synced:
+            _, _, state = self.hop()
+            if state != ERR_NONE:
+                return b'', state
+            if not timeout_en or timeout_ms == 0 or timeout_ms > self.timeUntilHop():
+                timeout_en = True
+                timeout_ms = max(1, self.timeUntilHop())
+
+        # unsynced receivers camp on their channel until any packet arrives
+        data, state = self.radio.recv(timeout_en=timeout_en, timeout_ms=timeout_ms)
+        if state != ERR_NONE or len(data) < HOP_HEADER_LENGTH:
+            return b'', state
+
+        self.sync(data)
+        return data[HOP_HEADER_LENGTH:], state
+
+    def sync(self, data):
+        # align the local hop clock to the sender's from a received header
+        hop = (data[0] << 8) | data[1]
+        offset = (data[2] << 8) | data[3]
+        sentAgo = self.radio.getTimeOnAir(len(data)) // 1000 + offset
+        self._epoch = ticks_add(ticks_ms(), -sentAgo)
+        self._hopBase = hop
+        self._channel = self.channelAt(hop)
+        self.synced = True
+
+    def _shuffle(self, cycle):
+        # Fisher-Yates driven by a small LCG so every node derives the same order from the seed
+        n = len(self.channels)
+        perm = self._perm
+        for i in range(n):
+            perm[i] = i
+        x = (self.seed + cycle * 7919) % 65537
+        for i in range(n - 1, 0, -1):
+            x = (x * 75 + 74) % 65537
+            j = x % (i + 1)
+            perm[i], perm[j] = perm[j], perm[i]
+        self._permCycle = cycle
@@ -0,0 +1,232 @@
+from _sx126x import *
+from sx126x import ticks_ms, ticks_diff, sleep_ms, loraSymbolLength, _thousandths
+
+# SX1262 datasheet typical supply currents in mA (3.3 V). RX is the DC-DC figure, the LDO
+# one is almost twice that. TX is for the 22 dBm PA configuration setOutputPower() uses;
+# below 14 dBm the 14 dBm figure is kept, which overestimates, so pass a measured table
+# if the low power end matters.
+SLEEP_MA = 0.0012
+STANDBY_MA = 0.6
+RX_MA = 4.6
+RX_LDO_MA = 8.3
+TX_TABLE = ((14, 90.0), (17, 95.0), (20, 102.0), (22, 118.0))
+
+_LPL_MAGIC = const(0x1B)
+# magic, address, rx period us (3), sleep period us (3), min symbols
+LPL_ADVERT_LENGTH = const(9)
+_MAX_PREAMBLE = const(0xFFFF)
+_US_PER_DAY = 86400000000
+
+
+def txCurrent(power, table=TX_TABLE):
+    # linear interpolation between datasheet points
+    if power <= table[0][0]:
+        return table[0][1]
+    for i in range(1, len(table)):
+        p1, i1 = table[i]
+        if power <= p1:
+            p0, i0 = table[i - 1]
+            return i0 + (i1 - i0) * (power - p0) / (p1 - p0)
+    return table[-1][1]
+
+
+def minPreamble(sf, bwKhz, rxPeriod, sleepPeriod, minSymbols=8):
+    # shortest preamble (symbols) a receiver waking for rxPeriod every rxPeriod + sleepPeriod us
+    # is sure to catch: it may just miss one window, sleeps through a whole sleep period and
+    # needs minSymbols of it after waking. -1 when no preamble works at this SF and bandwidth.
+    # The symbol length is the driver's integer one, so getDutyCycleWindows(n) gives back n.
+    symbolLength = loraSymbolLength(sf, _thousandths(bwKhz) // 10)
+    if sleepPeriod == 0:
+        return 0
+    if rxPeriod < (minSymbols + 1) * symbolLength:
+        return -1
+    n = (sleepPeriod + symbolLength - 1) // symbolLength
+    n += 2 * minSymbols
+    if n > _MAX_PREAMBLE:
+        return -1
+    return n
+
+
+class EnergyModel:
+
+    def __init__(self, radio, power=14, ldo=False, txTable=TX_TABLE):
+        self.radio = radio
+        self.power = power
+        self.rxCurrent = RX_LDO_MA if ldo else RX_MA
+        self.txTable = txTable
+        # accumulated charge in mA*us per state
+        self.charge = {'tx': 0, 'rx': 0, 'listen': 0}
+
+    def listenCurrent(self, rxPeriod, sleepPeriod):
+        # average current of duty cycled listening; the chip spends the transition in standby
+        if sleepPeriod == 0:
+            return self.rxCurrent
+        transition = self.radio._tcxoDelay + 1000
+        period = rxPeriod + sleepPeriod
+        return (rxPeriod * self.rxCurrent + transition * STANDBY_MA +
+                (sleepPeriod - transition) * SLEEP_MA) / period
+
+    def txCharge(self, len_, preambleLength=0):
+        # mA*us to send a packet of len_ bytes, optionally with a longer preamble
+        airtime = self.radio.getTimeOnAir(len_)
+        if preambleLength:
+            symbolLength = loraSymbolLength(self.radio._sf, self.radio._bw10Hz)
+            airtime += (preambleLength - self.radio._preambleLength) * symbolLength
+        return airtime * txCurrent(self.power, self.txTable)
+
+    def rxCharge(self, len_):
+        return self.radio.getTimeOnAir(len_) * self.rxCurrent
+
+    def account(self, state, charge):
+        self.charge[state] += charge
+
+    def consumed(self):
+        # mAh accounted so far
+        total = 0
+        for c in self.charge.values():
+            total += c
+        return total / 3600000000.0
+
+    def mAhPerDay(self, txPerDay=0, rxPerDay=0, len_=32, rxPeriod=0, sleepPeriod=-1, preambleLength=0):
+        # estimated mAh per day: the packets plus listening (or sleeping, sleepPeriod=-1) in between
+        tx = txPerDay * self.txCharge(len_, preambleLength)
+        rx = rxPerDay * self.rxCharge(len_)
+        busy = txPerDay * self.radio.getTimeOnAir(len_) + rxPerDay * self.radio.getTimeOnAir(len_)
+        idle = max(0, _US_PER_DAY - busy)
+        if sleepPeriod < 0:
+            idleCurrent = SLEEP_MA
+        else:
+            idleCurrent = self.listenCurrent(rxPeriod, sleepPeriod)
+        return (tx + rx + idle * idleCurrent) / 3600000000.0
+
+
+class LowPowerListener:
+
+    def __init__(self, radio, address, preambleLength=128, minSymbols=8, model=None, poll_ms=10):
+        # senders must use preambleLength for the receiver to catch them while it sleeps;
+        # advertise() tells them
+        self.radio = radio
+        self.address = address
+        self.preambleLength = preambleLength
+        self.minSymbols = minSymbols
+        self.model = model
+        self.poll_ms = poll_ms
+        self._buf = bytearray(SX126X_MAX_PACKET_LENGTH)
+        self._buf_mv = memoryview(self._buf)
+        self._listenStart = -1
+        self.rxPeriod = 0
+        self.sleepPeriod = 0
+
+    def listen(self):
+        self.rxPeriod, self.sleepPeriod = self.radio.getDutyCycleWindows(self.preambleLength, self.minSymbols)
+        state = self.radio.startReceiveDutyCycleAuto(self.preambleLength, self.minSymbols)
+        self._listenStart = ticks_ms()
+        return state
+
+    def _stopListening(self):
+        if self._listenStart >= 0 and self.model is not None:
+            elapsed = abs(ticks_diff(ticks_ms(), self._listenStart)) * 1000
+            self.model.account('listen', elapsed * self.model.listenCurrent(self.rxPeriod, self.sleepPeriod))
+        self._listenStart = -1
+
+    def recv(self, timeout_ms=0):
+        # duty cycled receive; the host sleeps between polls of DIO1 as well
+        state = self.listen()
+        if state != ERR_NONE:
+            return b'', state
+        start = ticks_ms()
+        while not self.radio.irq.value:
+            if timeout_ms and abs(ticks_diff(ticks_ms(), start)) >= timeout_ms:
+                self._stopListening()
+                self.radio.standby()
+                return b'', ERR_RX_TIMEOUT
+            sleep_ms(self.poll_ms)
+        self._stopListening()
+
+        try:
+            state = self.radio.readData(self._buf_mv, SX126X_MAX_PACKET_LENGTH)
+        except AssertionError as e:
+            state = errorCode(e)
+        if state != ERR_NONE and state != ERR_CRC_MISMATCH:
+            return b'', state
+        n = self.radio.getPacketLength()
+        if self.model is not None:
+            self.model.account('rx', self.model.rxCharge(n))
+        return bytes(self._buf_mv[:n]), state
+
+    def advertise(self):
+        # announces the listen windows, sent with the long preamble so sleeping peers hear it too
+        rx, sl = self.radio.getDutyCycleWindows(self.preambleLength, self.minSymbols)
+        adv = bytes((_LPL_MAGIC, self.address,
+                     (rx >> 16) & 0xFF, (rx >> 8) & 0xFF, rx & 0xFF,
+                     (sl >> 16) & 0xFF, (sl >> 8) & 0xFF, sl & 0xFF,
+                     self.minSymbols))
+        return LowPowerSender.sendWith(self.radio, adv, self.preambleLength, self.model)
+
+    def mAhPerDay(self, txPerDay=0, rxPerDay=0, len_=32):
+        rxPeriod, sleepPeriod = self.radio.getDutyCycleWindows(self.preambleLength, self.minSymbols)
+        return self.model.mAhPerDay(txPerDay, rxPerDay, len_, rxPeriod, sleepPeriod)
+
+    def latency_ms(self):
+        # worst case wait before a packet can start being received
+        rxPeriod, sleepPeriod = self.radio.getDutyCycleWindows(self.preambleLength, self.minSymbols)
+        return (rxPeriod + sleepPeriod) // 1000
+
+
+class LowPowerSender:
+
+    def __init__(self, radio, model=None):
+        self.radio = radio
+        self.model = model
+        # listen windows advertised by duty cycled peers: address -> (rx us, sleep us, min symbols)
+        self.peers = {}
+        # preamble per peer for the modulation in _key, worked out again when SF or BW changes
+        self._preambles = {}
+        self._key = None
+
+    def handle(self, frame):
+        # returns True if frame was a low power listen advertisement
+        if len(frame) != LPL_ADVERT_LENGTH or frame[0] != _LPL_MAGIC:
+            return False
+        rx = (frame[2] << 16) | (frame[3] << 8) | frame[4]
+        sl = (frame[5] << 16) | (frame[6] << 8) | frame[7]
+        self.peers[frame[1]] = (rx, sl, frame[8])
+        self._key = None
+        return True
+
+    def preambleFor(self, dst=None):
+        # a broadcast has to reach the deepest sleeper; -1 if a peer cannot be reached at this SF/BW
+        key = (self.radio._sf, self.radio._bwKhz)
+        if key != self._key:
+            self._preambles = {}
+            for address, (rx, sl, minSymbols) in self.peers.items():
+                self._preambles[address] = minPreamble(key[0], key[1], rx, sl, minSymbols)
+            self._key = key
+        if dst is None:
+            n = 0
+            for p in self._preambles.values():
+                if p < 0:
+                    return -1
+                n = max(n, p)
+            return n
+        return self._preambles.get(dst, 0)
+
+    def send(self, data, dst=None):
+        return LowPowerSender.sendWith(self.radio, data, self.preambleFor(dst), self.model)
+
+    @staticmethod
+    def sendWith(radio, data, preambleLength, model=None):
+        if preambleLength < 0:
+            return 0, ERR_INVALID_PREAMBLE_LENGTH
+        default = radio._preambleLength
+        if preambleLength > default:
+            state = radio.setPreambleLength(preambleLength)
+            if state != ERR_NONE:
+                return 0, state
+        # the long preamble has to stay configured until TX_DONE, also on a non-blocking radio
+        n, state = radio.sendWait(data)
+        if preambleLength > default:
+            radio.setPreambleLength(default)
+        if model is not None and state == ERR_NONE:
+            model.account('tx', model.txCharge(len(data), max(preambleLength, default)))
+        return n, state
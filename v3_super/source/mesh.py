@@ -0,0 +1,135 @@
+from _sx126x import *
+from sx126x import ticks_ms, ticks_diff
+from random import randint
+
+MESH_BROADCAST = const(0xFF)
+# src, dst, seq (2), hop limit in the high nibble and hops taken in the low nibble
+MESH_HEADER_LENGTH = const(5)
+_SEQ_MASK = const(0xFFFF)
+_MAX_HOPS = const(0x0F)
+
+# SNR range used to scale the rebroadcast delay; strong links wait longest
+_SNR_LOW = -20.0
+_SNR_HIGH = 10.0
+
+
+class Mesh:
+
+    def __init__(self, radio, address, hopLimit=3, cacheSize=32, contention_ms=0):
+        self.radio = radio
+        self.address = address
+        self.hopLimit = min(hopLimit, _MAX_HOPS)
+        self.seq = 0
+
+        # duplicate suppression: fixed ring of (src << 16 | seq) keys
+        self._cache = [-1] * cacheSize
+        self._cacheNext = 0
+
+        # a contention window of a few packet airtimes lets a farther node go first
+        if contention_ms == 0:
+            contention_ms = 2 * radio.getTimeOnAir(SX126X_MAX_PACKET_LENGTH // 4) // 1000
+        self.contention_ms = contention_ms
+
+        self._frame = bytearray(SX126X_MAX_PACKET_LENGTH)
+        self._frame_mv = memoryview(self._frame)
+        # packets heard while waiting to forward, handled by the next recv()
+        self._pending = []
+        self.pendingLength = 4
+
+        self.received = 0
+        self.duplicates = 0
+        self.forwarded = 0
+        self.cancelled = 0
+        self.forwardedFrom = {}
+
+    def send(self, data, dst=MESH_BROADCAST):
+        n = len(data)
+        if n > SX126X_MAX_PACKET_LENGTH - MESH_HEADER_LENGTH:
+            return 0, ERR_PACKET_TOO_LONG
+        self.seq = (self.seq + 1) & _SEQ_MASK
+        frame = self._frame
+        frame[0] = self.address
+        frame[1] = dst
+        frame[2] = (self.seq >> 8) & 0xFF
+        frame[3] = self.seq & 0xFF
+        frame[4] = self.hopLimit << 4
+        self._frame_mv[MESH_HEADER_LENGTH:MESH_HEADER_LENGTH + n] = data
+        self._remember(self.address, self.seq)
+        _, state = self.radio.send(self._frame_mv[:MESH_HEADER_LENGTH + n])
+        return n, state
+
+    def recv(self, timeout_en=False, timeout_ms=0):
+        # returns (src, payload) for packets addressed to this node or broadcast, forwarding as needed
+        while True:
+            if self._pending:
+                frame, snr = self._pending.pop(0)
+            else:
+                frame, state = self.radio.recv(timeout_en=timeout_en, timeout_ms=timeout_ms)
+                if state != ERR_NONE:
+                    return None, state
+                snr = self.radio.getSNR()
+            if len(frame) < MESH_HEADER_LENGTH:
+                continue
+            src = frame[0]
+            dst = frame[1]
+            seq = (frame[2] << 8) | frame[3]
+            if self._seen(src, seq):
+                self.duplicates += 1
+                continue
+            self._remember(src, seq)
+            self.received += 1
+
+            if dst != self.address:
+                self._forward(frame, snr)
+            if dst == self.address or dst == MESH_BROADCAST:
+                return (src, frame[MESH_HEADER_LENGTH:]), ERR_NONE
+
+    def delay_ms(self, snr):
+        scale = (snr - _SNR_LOW) / (_SNR_HIGH - _SNR_LOW)
+        scale = min(max(scale, 0.0), 1.0)
+        return int(scale * self.contention_ms) + randint(0, max(1, self.contention_ms // 4))
+
+    def _forward(self, frame, snr):
+        limit = frame[4] >> 4
+        hops = (frame[4] & _MAX_HOPS) + 1
+        if hops > limit or frame[0] == self.address:
+            return
+
+        src = frame[0]
+        seq = (frame[2] << 8) | frame[3]
+
+        # managed flooding: wait a randomised, SNR scaled delay and drop our copy if a
+        # neighbour rebroadcasts the packet first
+        delay = self.delay_ms(snr)
+        start = ticks_ms()
+        while True:
+            remaining = delay - abs(ticks_diff(ticks_ms(), start))
+            if remaining <= 0:
+                break
+            heard, state = self.radio.recv(timeout_en=True, timeout_ms=remaining)
+            if state != ERR_NONE or len(heard) < MESH_HEADER_LENGTH:
+                continue
+            if heard[0] == src and ((heard[2] << 8) | heard[3]) == seq:
+                self.cancelled += 1
+                return
+            if len(self._pending) < self.pendingLength:
+                self._pending.append((heard, self.radio.getSNR()))
+
+        n = len(frame)
+        self._frame_mv[:n] = frame
+        self._frame[4] = (limit << 4) | hops
+        _, state = self.radio.send(self._frame_mv[:n])
+        if state == ERR_NONE:
+            self.forwarded += 1
+            self.forwardedFrom[src] = self.forwardedFrom.get(src, 0) + 1
+
+    def _seen(self, src, seq):
+        key = (src << 16) | seq
+        for k in self._cache:
+            if k == key:
+                return True
+        return False
+
+    def _remember(self, src, seq):
+        self._cache[self._cacheNext] = (src << 16) | seq
+        self._cacheNext = (self._cacheNext + 1) % len(self._cache)
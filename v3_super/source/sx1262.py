@@ -1,5 +1,5 @@
 from _sx126x import *
-from sx126x import SX126X
+from sx126x import SX126X, ticks_ms, ticks_us, ticks_diff, ticks_add
 
 _SX126X_PA_CONFIG_SX1262 = const(0x00)
 
@@ -16,14 +16,19 @@ class SX1262(SX126X):
     PREAMBLE_DETECT_32 = SX126X_GFSK_PREAMBLE_DETECT_32
     STATUS = ERROR
 
-    def __init__(self, spi_bus, clk, mosi, miso, cs, irq, rst, gpio):
-        super().__init__(spi_bus, clk, mosi, miso, cs, irq, rst, gpio)
+    def __init__(self, spi_bus, clk, mosi, miso, cs, irq, rst, gpio, spi=None, baudrate=2000000):
+        super().__init__(spi_bus, clk, mosi, miso, cs, irq, rst, gpio, spi, baudrate)
         self._callbackFunction = self._dummyFunction
 
     def begin(self, freq=434.0, bw=125.0, sf=9, cr=7, syncWord=SX126X_SYNC_WORD_PRIVATE,
               power=14, currentLimit=60.0, preambleLength=8, implicit=False, implicitLen=0xFF,
               crcOn=True, txIq=False, rxIq=False, tcxoVoltage=1.6, useRegulatorLDO=False,
               blocking=True):
+        self._beginArgs = ('begin', {'freq': freq, 'bw': bw, 'sf': sf, 'cr': cr, 'syncWord': syncWord,
+                                     'power': power, 'currentLimit': currentLimit, 'preambleLength': preambleLength,
+                                     'implicit': implicit, 'implicitLen': implicitLen, 'crcOn': crcOn,
+                                     'txIq': txIq, 'rxIq': rxIq, 'tcxoVoltage': tcxoVoltage,
+                                     'useRegulatorLDO': useRegulatorLDO, 'blocking': blocking})
         state = super().begin(bw, sf, cr, syncWord, currentLimit, preambleLength, tcxoVoltage, useRegulatorLDO, txIq, rxIq)
         ASSERT(state)
 
@@ -56,6 +61,16 @@ class SX1262(SX126X):
                  fixedPacketLength=False, packetLength=0xFF, preambleDetectorLength=SX126X_GFSK_PREAMBLE_DETECT_16,
                  tcxoVoltage=1.6, useRegulatorLDO=False,
                  blocking=True):
+        self._beginArgs = ('beginFSK', {'freq': freq, 'br': br, 'freqDev': freqDev, 'rxBw': rxBw, 'power': power,
+                                        'currentLimit': currentLimit, 'preambleLength': preambleLength,
+                                        'dataShaping': dataShaping, 'syncWord': syncWord, 'syncBitsLength': syncBitsLength,
+                                        'addrFilter': addrFilter, 'addr': addr, 'crcLength': crcLength,
+                                        'crcInitial': crcInitial, 'crcPolynomial': crcPolynomial,
+                                        'crcInverted': crcInverted, 'whiteningOn': whiteningOn,
+                                        'whiteningInitial': whiteningInitial, 'fixedPacketLength': fixedPacketLength,
+                                        'packetLength': packetLength, 'preambleDetectorLength': preambleDetectorLength,
+                                        'tcxoVoltage': tcxoVoltage, 'useRegulatorLDO': useRegulatorLDO,
+                                        'blocking': blocking})
         state = super().beginFSK(br, freqDev, rxBw, currentLimit, preambleLength, dataShaping, preambleDetectorLength, tcxoVoltage, useRegulatorLDO)
         ASSERT(state)
 
@@ -129,6 +144,12 @@ class SX1262(SX126X):
         if not ((power >= -9) and (power <= 22)):
             return ERR_INVALID_OUTPUT_POWER
 
+        if self._paConfigured:
+            state = super().setTxParams(power)
+            if state == ERR_NONE:
+                self._power = power
+            return state
+
         ocp = bytearray(1)
         ocp_mv = memoryview(ocp)
         state = super().readRegister(SX126X_REG_OCP_CONFIGURATION, ocp_mv, 1)
@@ -140,7 +161,11 @@ class SX1262(SX126X):
         state = super().setTxParams(power)
         ASSERT(state)
 
-        return super().writeRegister(SX126X_REG_OCP_CONFIGURATION, ocp, 1)
+        state = super().writeRegister(SX126X_REG_OCP_CONFIGURATION, ocp, 1)
+        if state == ERR_NONE:
+            self._paConfigured = True
+            self._power = power
+        return state
 
     def setTxIq(self, txIq):
         self._txIq = txIq
@@ -186,6 +211,19 @@ class SX1262(SX126X):
         else:
             return self._transmit(data)
 
+    def sendWait(self, data):
+        # send() that only returns after TX_DONE, also on a non-blocking radio, for layers that
+        # send frames back to back: the next startTransmit() would overwrite the FIFO while the
+        # previous frame is still on air. A non-blocking radio goes back to receive afterwards.
+        if self.blocking:
+            return self._transmit(data)
+        callback = self._callbackFunction
+        self.setBlockingCallback(True)
+        try:
+            return self._transmit(data)
+        finally:
+            self.setBlockingCallback(False, None if callback == self._dummyFunction else callback)
+
     def _events(self):
         return super().getIrqStatus()
 
@@ -200,10 +238,21 @@ class SX1262(SX126X):
         data = bytearray(length)
         data_mv = memoryview(data)
 
-        try:
-            state = super().receive(data_mv, length, timeout_en, timeout_ms)
-        except AssertionError as e:
-            state = list(ERROR.keys())[list(ERROR.values()).index(str(e))]
+        start = ticks_ms()
+        while True:
+            try:
+                state = super().receive(data_mv, length, timeout_en, timeout_ms)
+            except AssertionError as e:
+                state = errorCode(e)
+            if state != ERR_PACKET_FILTERED:
+                break
+            # filtered packets do not end the wait, listen again for what is left of the timeout
+            if timeout_en and timeout_ms != 0:
+                remaining = timeout_ms - abs(ticks_diff(ticks_ms(), start))
+                if remaining <= 0:
+                    return b'', ERR_RX_TIMEOUT
+                timeout_ms = remaining
+                start = ticks_ms()
 
         if state == ERR_NONE or state == ERR_CRC_MISMATCH:
             if len_ == 0:
@@ -216,7 +265,7 @@ class SX1262(SX126X):
         return  bytes(data), state
 
     def _transmit(self, data):
-        if isinstance(data, bytes) or isinstance(data, bytearray):
+        if isinstance(data, bytes) or isinstance(data, bytearray) or isinstance(data, memoryview):
             pass
         else:
             return 0, ERR_INVALID_PACKET_TYPE
@@ -238,7 +287,7 @@ class SX1262(SX126X):
         try:
             state = super().readData(data_mv, length)
         except AssertionError as e:
-            state = list(ERROR.keys())[list(ERROR.values()).index(str(e))]
+            state = errorCode(e)
 
         ASSERT(super().startReceive())
 
@@ -249,7 +298,7 @@ class SX1262(SX126X):
             return b'', state
 
     def _startTransmit(self, data):
-        if isinstance(data, bytes) or isinstance(data, bytearray):
+        if isinstance(data, bytes) or isinstance(data, bytearray) or isinstance(data, memoryview):
             pass
         else:
             return 0, ERR_INVALID_PACKET_TYPE
@@ -261,7 +310,11 @@ class SX1262(SX126X):
         pass
 
     def _onIRQ(self, callback):
+        edge = ticks_us()
         events = self._events()
         if events & SX126X_IRQ_TX_DONE:
+            self._txTimestamp = ticks_add(edge, -self._txLatency)
             super().startReceive()
+        if events & SX126X_IRQ_RX_DONE:
+            self._rxTimestamp = ticks_add(edge, -self._rxLatency)
         self._callbackFunction(events)
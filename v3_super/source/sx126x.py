@@ -4,12 +4,17 @@ from sys import implementation
 
 if implementation.name == 'micropython':
     from machine import SPI, Pin
-    from utime import sleep_ms, sleep_us, ticks_ms, ticks_us, ticks_diff
+    from utime import sleep_ms, sleep_us, ticks_ms, ticks_us, ticks_diff, ticks_add
 
 if implementation.name == 'circuitpython':
     import digitalio
     import busio
     import board
+
+if implementation.name == 'cpython':
+    from sx126x_linux import SpiDev, GPIOLine as Pin, line
+
+if implementation.name != 'micropython':
     from time import sleep, monotonic_ns
 
     _MS_PER_NS = const(1000000)
@@ -36,29 +41,301 @@ if implementation.name == 'circuitpython':
         diff = ((diff + _TICKS_HALFPERIOD) & _TICKS_MAX) - _TICKS_HALFPERIOD
         return diff
 
+    def ticks_add(ticks, delta):
+        return (ticks + delta) & _TICKS_MAX
+
+# chip constants only the driver itself needs; private, so mpy-cross folds them into the
+# bytecode and they take no RAM in this or any importing module
+_SX126X_CMD_NOP = const(0x00)
+_SX126X_CMD_SET_FS = const(0xC1)
+_SX126X_CMD_STOP_TIMER_ON_PREAMBLE = const(0x9F)
+_SX126X_CMD_SET_CAD = const(0xC5)
+_SX126X_CMD_SET_TX_CONTINUOUS_WAVE = const(0xD1)
+_SX126X_CMD_SET_TX_INFINITE_PREAMBLE = const(0xD2)
+_SX126X_CMD_SET_REGULATOR_MODE = const(0x96)
+_SX126X_CMD_CALIBRATE = const(0x89)
+_SX126X_CMD_CALIBRATE_IMAGE = const(0x98)
+_SX126X_CMD_SET_PA_CONFIG = const(0x95)
+_SX126X_CMD_SET_RX_TX_FALLBACK_MODE = const(0x93)
+_SX126X_CMD_SET_DIO2_AS_RF_SWITCH_CTRL = const(0x9D)
+_SX126X_CMD_SET_DIO3_AS_TCXO_CTRL = const(0x97)
+_SX126X_CMD_SET_TX_PARAMS = const(0x8E)
+_SX126X_CMD_SET_MODULATION_PARAMS = const(0x8B)
+_SX126X_CMD_SET_CAD_PARAMS = const(0x88)
+_SX126X_CMD_SET_LORA_SYMB_NUM_TIMEOUT = const(0x0A)
+_SX126X_CMD_RESET_STATS = const(0x00)
+_SX126X_REG_WHITENING_INITIAL_MSB = const(0x06B8)
+_SX126X_REG_WHITENING_INITIAL_LSB = const(0x06B9)
+_SX126X_REG_CRC_INITIAL_MSB = const(0x06BC)
+_SX126X_REG_CRC_INITIAL_LSB = const(0x06BD)
+_SX126X_REG_CRC_POLYNOMIAL_MSB = const(0x06BE)
+_SX126X_REG_CRC_POLYNOMIAL_LSB = const(0x06BF)
+_SX126X_REG_SYNC_WORD_0 = const(0x06C0)
+_SX126X_REG_SYNC_WORD_1 = const(0x06C1)
+_SX126X_REG_SYNC_WORD_2 = const(0x06C2)
+_SX126X_REG_SYNC_WORD_3 = const(0x06C3)
+_SX126X_REG_SYNC_WORD_4 = const(0x06C4)
+_SX126X_REG_SYNC_WORD_5 = const(0x06C5)
+_SX126X_REG_SYNC_WORD_6 = const(0x06C6)
+_SX126X_REG_SYNC_WORD_7 = const(0x06C7)
+_SX126X_REG_NODE_ADDRESS = const(0x06CD)
+_SX126X_REG_BROADCAST_ADDRESS = const(0x06CE)
+_SX126X_REG_LORA_SYNC_WORD_MSB = const(0x0740)
+_SX126X_REG_LORA_SYNC_WORD_LSB = const(0x0741)
+_SX126X_REG_RANDOM_NUMBER_0 = const(0x0819)
+_SX126X_REG_RANDOM_NUMBER_1 = const(0x081A)
+_SX126X_REG_RANDOM_NUMBER_2 = const(0x081B)
+_SX126X_REG_RANDOM_NUMBER_3 = const(0x081C)
+_SX126X_REG_RX_GAIN = const(0x08AC)
+_SX126X_REG_XTA_TRIM = const(0x0911)
+_SX126X_REG_XTB_TRIM = const(0x0912)
+_SX126X_REG_SENSITIVITY_CONFIG = const(0x0889)
+_SX126X_REG_TX_CLAMP_CONFIG = const(0x08D8)
+_SX126X_REG_RTC_STOP = const(0x0920)
+_SX126X_REG_RTC_EVENT = const(0x0944)
+_SX126X_REG_IQ_CONFIG = const(0x0736)
+_SX126X_REG_RX_GAIN_RETENTION_0 = const(0x029F)
+_SX126X_REG_RX_GAIN_RETENTION_1 = const(0x02A0)
+_SX126X_REG_RX_GAIN_RETENTION_2 = const(0x02A1)
+_SX126X_SLEEP_START_COLD = const(0b00000000)
+_SX126X_SLEEP_START_WARM = const(0b00000100)
+_SX126X_SLEEP_RTC_OFF = const(0b00000000)
+_SX126X_SLEEP_RTC_ON = const(0b00000001)
+_SX126X_STANDBY_RC = const(0x00)
+_SX126X_STANDBY_XOSC = const(0x01)
+_SX126X_RX_TIMEOUT_NONE = const(0x000000)
+_SX126X_RX_TIMEOUT_INF = const(0xFFFFFF)
+_SX126X_TX_TIMEOUT_NONE = const(0x000000)
+_SX126X_STOP_ON_PREAMBLE_OFF = const(0x00)
+_SX126X_STOP_ON_PREAMBLE_ON = const(0x01)
+_SX126X_REGULATOR_LDO = const(0x00)
+_SX126X_REGULATOR_DC_DC = const(0x01)
+_SX126X_CALIBRATE_IMAGE_OFF = const(0b00000000)
+_SX126X_CALIBRATE_IMAGE_ON = const(0b01000000)
+_SX126X_CALIBRATE_ADC_BULK_P_OFF = const(0b00000000)
+_SX126X_CALIBRATE_ADC_BULK_P_ON = const(0b00100000)
+_SX126X_CALIBRATE_ADC_BULK_N_OFF = const(0b00000000)
+_SX126X_CALIBRATE_ADC_BULK_N_ON = const(0b00010000)
+_SX126X_CALIBRATE_ADC_PULSE_OFF = const(0b00000000)
+_SX126X_CALIBRATE_ADC_PULSE_ON = const(0b00001000)
+_SX126X_CALIBRATE_PLL_OFF = const(0b00000000)
+_SX126X_CALIBRATE_PLL_ON = const(0b00000100)
+_SX126X_CALIBRATE_RC13M_OFF = const(0b00000000)
+_SX126X_CALIBRATE_RC13M_ON = const(0b00000010)
+_SX126X_CALIBRATE_RC64K_OFF = const(0b00000000)
+_SX126X_CALIBRATE_RC64K_ON = const(0b00000001)
+_SX126X_CALIBRATE_ALL = const(0b01111111)
+_SX126X_PA_CONFIG_HP_MAX = const(0x07)
+_SX126X_PA_CONFIG_PA_LUT = const(0x01)
+_SX126X_PA_CONFIG_SX1262_8 = const(0x00)
+_SX126X_RX_TX_FALLBACK_MODE_FS = const(0x40)
+_SX126X_RX_TX_FALLBACK_MODE_STDBY_XOSC = const(0x30)
+_SX126X_RX_TX_FALLBACK_MODE_STDBY_RC = const(0x20)
+_SX126X_IRQ_TIMEOUT = const(0b1000000000)
+_SX126X_IRQ_CAD_DETECTED = const(0b0100000000)
+_SX126X_IRQ_CAD_DONE = const(0b0010000000)
+_SX126X_IRQ_CRC_ERR = const(0b0001000000)
+_SX126X_IRQ_HEADER_ERR = const(0b0000100000)
+_SX126X_IRQ_HEADER_VALID = const(0b0000010000)
+_SX126X_IRQ_SYNC_WORD_VALID = const(0b0000001000)
+_SX126X_IRQ_PREAMBLE_DETECTED = const(0b0000000100)
+_SX126X_IRQ_ALL = const(0b1111111111)
+_SX126X_IRQ_NONE = const(0b0000000000)
+_SX126X_DIO2_AS_IRQ = const(0x00)
+_SX126X_DIO2_AS_RF_SWITCH = const(0x01)
+_SX126X_DIO3_OUTPUT_1_6 = const(0x00)
+_SX126X_DIO3_OUTPUT_1_7 = const(0x01)
+_SX126X_DIO3_OUTPUT_1_8 = const(0x02)
+_SX126X_DIO3_OUTPUT_2_2 = const(0x03)
+_SX126X_DIO3_OUTPUT_2_4 = const(0x04)
+_SX126X_DIO3_OUTPUT_2_7 = const(0x05)
+_SX126X_DIO3_OUTPUT_3_0 = const(0x06)
+_SX126X_DIO3_OUTPUT_3_3 = const(0x07)
+_SX126X_PACKET_TYPE_GFSK = const(0x00)
+_SX126X_PACKET_TYPE_LORA = const(0x01)
+_SX126X_PA_RAMP_10U = const(0x00)
+_SX126X_PA_RAMP_20U = const(0x01)
+_SX126X_PA_RAMP_40U = const(0x02)
+_SX126X_PA_RAMP_80U = const(0x03)
+_SX126X_PA_RAMP_200U = const(0x04)
+_SX126X_PA_RAMP_800U = const(0x05)
+_SX126X_PA_RAMP_1700U = const(0x06)
+_SX126X_PA_RAMP_3400U = const(0x07)
+_SX126X_GFSK_FILTER_NONE = const(0x00)
+_SX126X_GFSK_FILTER_GAUSS_0_3 = const(0x08)
+_SX126X_GFSK_FILTER_GAUSS_0_5 = const(0x09)
+_SX126X_GFSK_FILTER_GAUSS_0_7 = const(0x0A)
+_SX126X_GFSK_FILTER_GAUSS_1 = const(0x0B)
+_SX126X_GFSK_RX_BW_4_8 = const(0x1F)
+_SX126X_GFSK_RX_BW_5_8 = const(0x17)
+_SX126X_GFSK_RX_BW_7_3 = const(0x0F)
+_SX126X_GFSK_RX_BW_9_7 = const(0x1E)
+_SX126X_GFSK_RX_BW_11_7 = const(0x16)
+_SX126X_GFSK_RX_BW_14_6 = const(0x0E)
+_SX126X_GFSK_RX_BW_19_5 = const(0x1D)
+_SX126X_GFSK_RX_BW_23_4 = const(0x15)
+_SX126X_GFSK_RX_BW_29_3 = const(0x0D)
+_SX126X_GFSK_RX_BW_39_0 = const(0x1C)
+_SX126X_GFSK_RX_BW_46_9 = const(0x14)
+_SX126X_GFSK_RX_BW_58_6 = const(0x0C)
+_SX126X_GFSK_RX_BW_78_2 = const(0x1B)
+_SX126X_GFSK_RX_BW_93_8 = const(0x13)
+_SX126X_GFSK_RX_BW_117_3 = const(0x0B)
+_SX126X_GFSK_RX_BW_156_2 = const(0x1A)
+_SX126X_GFSK_RX_BW_187_2 = const(0x12)
+_SX126X_GFSK_RX_BW_234_3 = const(0x0A)
+_SX126X_GFSK_RX_BW_312_0 = const(0x19)
+_SX126X_GFSK_RX_BW_373_6 = const(0x11)
+_SX126X_GFSK_RX_BW_467_0 = const(0x09)
+_SX126X_LORA_BW_7_8 = const(0x00)
+_SX126X_LORA_BW_10_4 = const(0x08)
+_SX126X_LORA_BW_15_6 = const(0x01)
+_SX126X_LORA_BW_20_8 = const(0x09)
+_SX126X_LORA_BW_31_25 = const(0x02)
+_SX126X_LORA_BW_41_7 = const(0x0A)
+_SX126X_LORA_BW_62_5 = const(0x03)
+_SX126X_LORA_BW_125_0 = const(0x04)
+_SX126X_LORA_BW_250_0 = const(0x05)
+_SX126X_LORA_BW_500_0 = const(0x06)
+_SX126X_LORA_CR_4_5 = const(0x01)
+_SX126X_LORA_CR_4_6 = const(0x02)
+_SX126X_LORA_CR_4_7 = const(0x03)
+_SX126X_LORA_CR_4_8 = const(0x04)
+_SX126X_LORA_LOW_DATA_RATE_OPTIMIZE_OFF = const(0x00)
+_SX126X_LORA_LOW_DATA_RATE_OPTIMIZE_ON = const(0x01)
+_SX126X_GFSK_PACKET_FIXED = const(0x00)
+_SX126X_GFSK_PACKET_VARIABLE = const(0x01)
+_SX126X_GFSK_CRC_OFF = const(0x01)
+_SX126X_GFSK_CRC_1_BYTE = const(0x00)
+_SX126X_GFSK_CRC_2_BYTE = const(0x02)
+_SX126X_GFSK_CRC_1_BYTE_INV = const(0x04)
+_SX126X_GFSK_CRC_2_BYTE_INV = const(0x06)
+_SX126X_GFSK_WHITENING_OFF = const(0x00)
+_SX126X_GFSK_WHITENING_ON = const(0x01)
+_SX126X_LORA_HEADER_EXPLICIT = const(0x00)
+_SX126X_LORA_CRC_OFF = const(0x00)
+_SX126X_LORA_IQ_STANDARD = const(0x00)
+_SX126X_LORA_IQ_INVERTED = const(0x01)
+_SX126X_CAD_ON_1_SYMB = const(0x00)
+_SX126X_CAD_ON_2_SYMB = const(0x01)
+_SX126X_CAD_ON_4_SYMB = const(0x02)
+_SX126X_CAD_ON_8_SYMB = const(0x03)
+_SX126X_CAD_ON_16_SYMB = const(0x04)
+_SX126X_CAD_GOTO_STDBY = const(0x00)
+_SX126X_CAD_GOTO_RX = const(0x01)
+_SX126X_STATUS_MODE_STDBY_RC = const(0b00100000)
+_SX126X_STATUS_MODE_STDBY_XOSC = const(0b00110000)
+_SX126X_STATUS_MODE_FS = const(0b01000000)
+_SX126X_STATUS_MODE_RX = const(0b01010000)
+_SX126X_STATUS_MODE_TX = const(0b01100000)
+_SX126X_STATUS_DATA_AVAILABLE = const(0b00000100)
+_SX126X_STATUS_CMD_TIMEOUT = const(0b00000110)
+_SX126X_STATUS_CMD_INVALID = const(0b00001000)
+_SX126X_STATUS_CMD_FAILED = const(0b00001010)
+_SX126X_STATUS_TX_DONE = const(0b00001100)
+_SX126X_STATUS_SPI_FAILED = const(0b11111111)
+_SX126X_GFSK_RX_STATUS_PREAMBLE_ERR = const(0b10000000)
+_SX126X_GFSK_RX_STATUS_SYNC_ERR = const(0b01000000)
+_SX126X_GFSK_RX_STATUS_ADRS_ERR = const(0b00100000)
+_SX126X_GFSK_RX_STATUS_CRC_ERR = const(0b00010000)
+_SX126X_GFSK_RX_STATUS_LENGTH_ERR = const(0b00001000)
+_SX126X_GFSK_RX_STATUS_ABORT_ERR = const(0b00000100)
+_SX126X_GFSK_RX_STATUS_PACKET_RECEIVED = const(0b00000010)
+_SX126X_GFSK_RX_STATUS_PACKET_SENT = const(0b00000001)
+_SX126X_ADC_CALIB_ERR = const(0b000001000)
+_SX126X_PLL_CALIB_ERR = const(0b000000100)
+_SX126X_RC13M_CALIB_ERR = const(0b000000010)
+_SX126X_RC64K_CALIB_ERR = const(0b000000001)
+_SX126X_SYNC_WORD_PUBLIC = const(0x34)
+
+# DIO1 is polled in the last stretch of a transmission instead of yielding, for an exact TX_DONE time
+_TX_SPIN_US = const(2000)
+# BUSY wait once BUSY has already timed out, so a stuck line costs milliseconds per command, not seconds
+_STUCK_BUSY_TIMEOUT_MS = const(10)
+
+# Integer forms of the float math: on CircuitPython a float is single precision with two
+# mantissa bits dropped, which is not enough for an frf word. The intermediates here stay
+# within the small int range, so they do not allocate either.
+
+def _mulDiv(a, m, d):
+    # a * m // d for non-negative a, without forming a * m
+    q, r = divmod(a, d)
+    return q * m + r * m // d
+
+def _thousandths(x):
+    # round(x * 1000) for a value given to three decimals (MHz to kHz, kHz to Hz); the integer
+    # part is split off first so the rounding error of a single precision float stays far below 0.5
+    n = int(x)
+    return n * 1000 + int((x - n) * 1000 + 0.5)
+
+def hzToRaw(hz):
+    # hz * 2^25 / 32 MHz, the PLL step used by frf and the FSK frequency deviation
+    return _mulDiv(hz, 1 << 14, 15625)
+
+def frfFromMhz(freq):
+    return hzToRaw(_thousandths(freq) * 1000)
+
+def loraSymbolLength(sf, bw10Hz):
+    # microseconds, bandwidth in units of 10 Hz
+    return (100000 << sf) // bw10Hz
+
+def loraTimeOnAir(len_, sf, bwKhz, cr, preambleLength, explicit=True, crc=True):
+    symbolLength_us = loraSymbolLength(sf, _thousandths(bwKhz) // 10)
+    sfCoeff1_x4 = 17
+    sfCoeff2 = 8
+    if sf == 5 or sf == 6:
+        sfCoeff1_x4 = 25
+        sfCoeff2 = 0
+    sfDivisor = 4*sf
+    if symbolLength_us >= 16000:
+        sfDivisor = 4*(sf - 2)
+    bitsPerCrc = 16
+    N_symbol_header = 20 if explicit else 0
+
+    bitCount = int(8 * len_ + int(crc) * bitsPerCrc - 4 * sf  + sfCoeff2 + N_symbol_header)
+    if bitCount < 0:
+        bitCount = 0
+
+    nPreCodedSymbols = (bitCount + (sfDivisor - 1)) // sfDivisor
+
+    nSymbol_x4 = int((preambleLength + 8) * 4 + sfCoeff1_x4 + nPreCodedSymbols * cr * 4)
+
+    return _mulDiv(symbolLength_us, nSymbol_x4, 4)
+
 class SX126X:
 
-    def __init__(self, spi_bus, clk, mosi, miso, cs, irq, rst, gpio):
+    def __init__(self, spi_bus, clk, mosi, miso, cs, irq, rst, gpio, spi=None, baudrate=2000000):
         self._irq = irq
+        # an existing bus may be shared with other devices (e.g. a second radio); it is then
+        # locked and configured for every transaction instead of once here
+        self._sharedSpi = spi is not None
+        self._baudrate = baudrate
         if implementation.name == 'micropython':
-          try:
-              self.spi = SPI(spi_bus, mode=SPI.MASTER, baudrate=2000000, pins=(clk, mosi, miso))        # Pycom variant uPy
-          except:
-              self.spi = SPI(spi_bus, baudrate=2000000, sck=Pin(clk), mosi=Pin(mosi), miso=Pin(miso))   # Generic variant uPy
+          if spi is not None:
+              # machine.SPI has no lock: with a shared bus keep DIO1 handlers from doing SPI in IRQ context
+              self.spi = spi
+          else:
+              try:
+                  self.spi = SPI(spi_bus, mode=SPI.MASTER, baudrate=baudrate, pins=(clk, mosi, miso))        # Pycom variant uPy
+              except:
+                  self.spi = SPI(spi_bus, baudrate=baudrate, sck=Pin(clk), mosi=Pin(mosi), miso=Pin(miso))   # Generic variant uPy
           self.cs = Pin(cs, mode=Pin.OUT)
           self.irq = Pin(irq, mode=Pin.IN)
           self.rst = Pin(rst, mode=Pin.OUT)
           self.gpio = Pin(gpio, mode=Pin.IN)
 
         if implementation.name == 'circuitpython':
-          self.spi = busio.SPI(clk, MOSI=mosi, MISO=miso)
-          #now deinit and reinit, to be able to use on nrf on battery power -- not sure this will work
-          self.spi.deinit()
-          self.spi = busio.SPI(clk, MOSI=mosi, MISO=miso)
-          while not self.spi.try_lock():
-              pass
-          self.spi.configure(baudrate=2000000, phase=0, polarity=0, bits=8)
-          self.spi.unlock()
+          if spi is not None:
+              self.spi = spi
+          else:
+              self.spi = busio.SPI(clk, MOSI=mosi, MISO=miso)
+              #now deinit and reinit, to be able to use on nrf on battery power -- not sure this will work
+              self.spi.deinit()
+              self.spi = busio.SPI(clk, MOSI=mosi, MISO=miso)
+              while not self.spi.try_lock():
+                  pass
+              self.spi.configure(baudrate=baudrate, phase=0, polarity=0, bits=8)
+              self.spi.unlock()
           self.cs = digitalio.DigitalInOut(cs)
           self.cs.switch_to_output(value=True)
           self.irq = digitalio.DigitalInOut(irq)
@@ -68,7 +345,20 @@ class SX126X:
           self.gpio = digitalio.DigitalInOut(gpio)
           self.gpio.switch_to_input()
 
+        if implementation.name == 'cpython':
+          # spi_bus is a spidev path or (bus, chip select); pins are gpiochip line offsets or
+          # (chip, offset) pairs. cs=None leaves chip select to the spidev hardware line.
+          if spi is not None:
+              self.spi = spi
+          else:
+              self.spi = SpiDev(spi_bus, baudrate)
+          self.cs = line(cs, Pin.OUT, True)
+          self.irq = line(irq, Pin.IN)
+          self.rst = line(rst, Pin.OUT, True)
+          self.gpio = line(gpio, Pin.IN)
+
         self._bwKhz = 0
+        self._bw10Hz = 0
         self._sf = 0
         self._bw = 0
         self._cr = 0
@@ -98,22 +388,43 @@ class SX126X:
         self._packetLength = 0
         self._preambleDetectorLength = 0
 
+        self._txTimestamp = 0
+        self._rxTimestamp = 0
+        self._txLatency = 0
+        self._rxLatency = 500
+
+        # PA and OCP setup survives until a reset or cold sleep, so later power changes can skip it
+        self._paConfigured = False
+        self._power = 0
+        self._frf = 0
+
+        # set by SX1262.begin()/beginFSK() so the configuration can be replayed after a reset
+        self._beginArgs = None
+        self._busyStuck = False
+        self.spiTimeouts = 0
+
+        self._rxFilter = None
+        self._peekLength = 0
+        self._peek = bytearray(0)
+        self.packetsFiltered = 0
+
     def begin(self, bw, sf, cr, syncWord, currentLimit, preambleLength, tcxoVoltage, useRegulatorLDO=False, txIq=False, rxIq=False):
         self._bwKhz = bw
+        self._bw10Hz = _thousandths(bw) // 10
         self._sf = sf
 
-        self._bw = SX126X_LORA_BW_125_0
-        self._cr = SX126X_LORA_CR_4_7
+        self._bw = _SX126X_LORA_BW_125_0
+        self._cr = _SX126X_LORA_CR_4_7
         self._ldro = 0x00
         self._crcType = SX126X_LORA_CRC_ON
         self._preambleLength = preambleLength
         self._tcxoDelay = 0
-        self._headerType = SX126X_LORA_HEADER_EXPLICIT
+        self._headerType = _SX126X_LORA_HEADER_EXPLICIT
         self._implicitLen = 0xFF
 
         self._txIq = txIq
         self._rxIq = rxIq
-        self._invertIQ = SX126X_LORA_IQ_STANDARD
+        self._invertIQ = _SX126X_LORA_IQ_STANDARD
 
         state = self.reset()
         ASSERT(state)
@@ -125,7 +436,7 @@ class SX126X:
             state = self.setTCXO(tcxoVoltage)
             ASSERT(state)
 
-        state = self.config(SX126X_PACKET_TYPE_LORA)
+        state = self.config(_SX126X_PACKET_TYPE_LORA)
         ASSERT(state)
         
         if useRegulatorLDO:
@@ -156,8 +467,74 @@ class SX126X:
         ASSERT(state)
 
         return state
-        
+
+    def beginFSK(self, br, freqDev, rxBw, currentLimit, preambleLength, dataShaping, preambleDetectorLength, tcxoVoltage, useRegulatorLDO=False):
+        self._br = 21333
+        self._freqDev = 52428
+        self._rxBw = _SX126X_GFSK_RX_BW_156_2
+        self._rxBwKhz = 156.2
+        self._pulseShape = _SX126X_GFSK_FILTER_GAUSS_0_5
+        self._crcTypeFSK = _SX126X_GFSK_CRC_2_BYTE_INV
+        self._preambleLengthFSK = preambleLength
+        self._addrComp = SX126X_GFSK_ADDRESS_FILT_OFF
+        self._whitening = _SX126X_GFSK_WHITENING_ON
+        self._packetType = _SX126X_GFSK_PACKET_VARIABLE
+        self._packetLength = SX126X_MAX_PACKET_LENGTH
+        self._preambleDetectorLength = preambleDetectorLength
+
+        state = self.reset()
+        ASSERT(state)
+
+        state = self.standby()
+        ASSERT(state)
+
+        if tcxoVoltage > 0.0:
+            state = self.setTCXO(tcxoVoltage)
+            ASSERT(state)
+
+        state = self.config(_SX126X_PACKET_TYPE_GFSK)
+        ASSERT(state)
+
+        if useRegulatorLDO:
+            state = self.setRegulatorLDO()
+        else:
+            state = self.setRegulatorDCDC()
+        ASSERT(state)
+
+        state = self.setBitRate(br)
+        ASSERT(state)
+
+        state = self.setFrequencyDeviation(freqDev)
+        ASSERT(state)
+
+        state = self.setRxBandwidth(rxBw)
+        ASSERT(state)
+
+        state = self.setDataShaping(dataShaping)
+        ASSERT(state)
+
+        state = self.setCurrentLimit(currentLimit)
+        ASSERT(state)
+
+        state = self.setPreambleLength(preambleLength)
+        ASSERT(state)
+
+        state = self.setSyncWord([0x2D, 0x01], 2)
+        ASSERT(state)
+
+        state = self.setWhitening(True, 0x0100)
+        ASSERT(state)
+
+        state = self.variablePacketLengthMode(SX126X_MAX_PACKET_LENGTH)
+        ASSERT(state)
+
+        state = self.setDio2AsRfSwitch(True)
+        ASSERT(state)
+
+        return state
+
     def reset(self, verify=True):
+        self._paConfigured = False
         if implementation.name == 'micropython':
           self.rst.value(1)
           sleep_us(150)
@@ -166,7 +543,7 @@ class SX126X:
           self.rst.value(1)
           sleep_us(150)
 
-        if implementation.name == 'circuitpython':
+        if implementation.name != 'micropython':
           self.rst.value = True
           sleep_us(150)
           self.rst.value = False
@@ -196,11 +573,12 @@ class SX126X:
         timeout = 0
 
         modem = self.getPacketType()
-        if modem == SX126X_PACKET_TYPE_LORA:
-            timeout = int((self.getTimeOnAir(len_) * 3) / 2)
+        timeOnAir = self.getTimeOnAir(len_)
+        if modem == _SX126X_PACKET_TYPE_LORA:
+            timeout = (timeOnAir * 3) // 2
 
-        elif modem == SX126X_PACKET_TYPE_GFSK:
-            timeout = int(self.getTimeOnAir(len_) * 5)
+        elif modem == _SX126X_PACKET_TYPE_GFSK:
+            timeout = int(timeOnAir * 5)
 
         else:
             return ERR_UNKNOWN
@@ -209,14 +587,17 @@ class SX126X:
         ASSERT(state)
 
         start = ticks_us()
+        if timeOnAir > _TX_SPIN_US:
+            sleep_us(timeOnAir - _TX_SPIN_US)
         while not self.irq.value:
-            yield_()
             if abs(ticks_diff(start, ticks_us())) > timeout:
                 self.clearIrqStatus()
                 self.standby()
                 return ERR_TX_TIMEOUT
 
-        elapsed = abs(ticks_diff(start, ticks_us()))
+        end = ticks_us()
+        self._txTimestamp = ticks_add(end, -self._txLatency)
+        elapsed = abs(ticks_diff(start, end))
 
         self._dataRate = (len_*8.0)/(float(elapsed)/1000000.0)
 
@@ -234,15 +615,15 @@ class SX126X:
         timeout = 0
 
         modem = self.getPacketType()
-        if modem == SX126X_PACKET_TYPE_LORA:
-            symbolLength = float(1 << self._sf) / float(self._bwKhz)
-            timeout = int(symbolLength * 100.0 * 1000.0)
-        elif modem == SX126X_PACKET_TYPE_GFSK:
+        if modem == _SX126X_PACKET_TYPE_LORA:
+            # 100 symbols
+            timeout = _mulDiv(100000 << self._sf, 100, self._bw10Hz)
+        elif modem == _SX126X_PACKET_TYPE_GFSK:
             maxLen = len_
             if len_ == 0:
                 maxLen = 0xFF
-            brBps = (float(SX126X_CRYSTAL_FREQ) * 1000000.0 * 32.0) / float(self._br)
-            timeout = int(((maxLen * 8.0) / brBps) * 1000000.0 * 5.0)
+            # 5 times the airtime of maxLen bytes; a bit lasts br / 1024 us
+            timeout = _mulDiv(self._br, maxLen * 5, 128)
         else:
             return ERR_UNKNOWN
 
@@ -252,9 +633,9 @@ class SX126X:
             timeout = timeout_ms * 1000
 
         if timeout_en:
-            timeoutValue = int(float(timeout) / 15.625)
+            timeoutValue = _mulDiv(timeout, 8, 125)
         else:
-            timeoutValue = SX126X_RX_TIMEOUT_NONE
+            timeoutValue = _SX126X_RX_TIMEOUT_NONE
             
         state = self.startReceive(timeoutValue)
         ASSERT(state)
@@ -269,7 +650,9 @@ class SX126X:
                     self.standby()
                     return ERR_RX_TIMEOUT
 
-        if self._headerType == SX126X_LORA_HEADER_IMPLICIT and self.getPacketType() == SX126X_PACKET_TYPE_LORA:
+        self._rxTimestamp = ticks_add(ticks_us(), -self._rxLatency)
+
+        if self._headerType == SX126X_LORA_HEADER_IMPLICIT and self.getPacketType() == _SX126X_PACKET_TYPE_LORA:
             state = self.fixImplicitTimeout()
             ASSERT(state)
 
@@ -281,20 +664,20 @@ class SX126X:
             state = self.setRfFrequency(frf)
         ASSERT(state)
 
-        data = [SX126X_CMD_NOP]
-        return self.SPIwriteCommand([SX126X_CMD_SET_TX_CONTINUOUS_WAVE], 1, data, 1)
+        data = [_SX126X_CMD_NOP]
+        return self.SPIwriteCommand([_SX126X_CMD_SET_TX_CONTINUOUS_WAVE], 1, data, 1)
 
     def receiveDirect(self):
         return ERR_UNKNOWN
 
     def scanChannel(self):
-        if self.getPacketType() != SX126X_PACKET_TYPE_LORA:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_LORA:
             return ERR_WRONG_MODEM
 
         state = self.standby()
         ASSERT(state)
 
-        state = self.setDioIrqParams(SX126X_IRQ_CAD_DETECTED | SX126X_IRQ_CAD_DONE, SX126X_IRQ_CAD_DETECTED | SX126X_IRQ_CAD_DONE)
+        state = self.setDioIrqParams(_SX126X_IRQ_CAD_DETECTED | _SX126X_IRQ_CAD_DONE, _SX126X_IRQ_CAD_DETECTED | _SX126X_IRQ_CAD_DONE)
         ASSERT(state)
 
         state = self.clearIrqStatus()
@@ -307,26 +690,27 @@ class SX126X:
             yield_()
 
         cadResult = self.getIrqStatus()
-        if cadResult & SX126X_IRQ_CAD_DETECTED:
+        if cadResult & _SX126X_IRQ_CAD_DETECTED:
             self.clearIrqStatus()
             return LORA_DETECTED
-        elif cadResult & SX126X_IRQ_CAD_DONE:
+        elif cadResult & _SX126X_IRQ_CAD_DONE:
             self.clearIrqStatus()
             return CHANNEL_FREE
 
         return ERR_UNKNOWN
 
     def sleep(self, retainConfig=True):
-        sleepMode = [SX126X_SLEEP_START_WARM | SX126X_SLEEP_RTC_OFF]
+        sleepMode = [_SX126X_SLEEP_START_WARM | _SX126X_SLEEP_RTC_OFF]
         if not retainConfig:
-            sleepMode = [SX126X_SLEEP_START_COLD | SX126X_SLEEP_RTC_OFF]
+            sleepMode = [_SX126X_SLEEP_START_COLD | _SX126X_SLEEP_RTC_OFF]
+            self._paConfigured = False
         state = self.SPIwriteCommand([SX126X_CMD_SET_SLEEP], 1, sleepMode, 1, False)
 
         sleep_us(500)
 
         return state
 
-    def standby(self, mode=SX126X_STANDBY_RC):
+    def standby(self, mode=_SX126X_STANDBY_RC):
         data = [mode]
         return self.SPIwriteCommand([SX126X_CMD_SET_STANDBY], 1, data, 1)
 
@@ -340,7 +724,7 @@ class SX126X:
         if implementation.name == 'micropython':
           self.irq = Pin(self._irq, mode=Pin.IN)
 
-        if implementation.name == 'circuitpython':
+        if implementation.name != 'micropython':
           self.irq.switch_to_input()
 
     def startTransmit(self, data, len_, addr=0):
@@ -352,19 +736,19 @@ class SX126X:
                 
         state = ERR_NONE
         modem = self.getPacketType()
-        if modem == SX126X_PACKET_TYPE_LORA:
+        if modem == _SX126X_PACKET_TYPE_LORA:
             if self._txIq:
-                self._invertIQ = SX126X_LORA_IQ_INVERTED
+                self._invertIQ = _SX126X_LORA_IQ_INVERTED
             else:
-                self._invertIQ = SX126X_LORA_IQ_STANDARD
+                self._invertIQ = _SX126X_LORA_IQ_STANDARD
                 
             if self._headerType == SX126X_LORA_HEADER_IMPLICIT:
                 if len_ != self._implicitLen:
                     return ERR_INVALID_PACKET_LENGTH
                 
             state = self.setPacketParams(self._preambleLength, self._crcType, len_, self._headerType, self._invertIQ)
-        elif modem == SX126X_PACKET_TYPE_GFSK:
-            if self._packetType == SX126X_GFSK_PACKET_FIXED:
+        elif modem == _SX126X_PACKET_TYPE_GFSK:
+            if self._packetType == _SX126X_GFSK_PACKET_FIXED:
                 if len_ != self._packetLength:
                     return ERR_INVALID_PACKET_LENGTH
                 
@@ -373,7 +757,7 @@ class SX126X:
             return ERR_UNKNOWN
         ASSERT(state)
         
-        state = self.setDioIrqParams(SX126X_IRQ_TX_DONE | SX126X_IRQ_TIMEOUT, SX126X_IRQ_TX_DONE)
+        state = self.setDioIrqParams(SX126X_IRQ_TX_DONE | _SX126X_IRQ_TIMEOUT, SX126X_IRQ_TX_DONE)
         ASSERT(state)
         
         state = self.setBufferBaseAddress()
@@ -388,30 +772,30 @@ class SX126X:
         state = self.fixSensitivity()
         ASSERT(state)
         
-        state = self.setTx(SX126X_TX_TIMEOUT_NONE)
+        state = self.setTx(_SX126X_TX_TIMEOUT_NONE)
         ASSERT(state)
         
         if implementation.name == 'micropython':
           while self.gpio.value():
               yield_()
 
-        if implementation.name == 'circuitpython':
+        if implementation.name != 'micropython':
           while self.gpio.value:
               yield_()
 
         return state
 		
-    def startReceive(self, timeout=SX126X_RX_TIMEOUT_INF):
+    def startReceive(self, timeout=_SX126X_RX_TIMEOUT_INF):
         state = ERR_NONE
         modem = self.getPacketType()
-        if modem == SX126X_PACKET_TYPE_LORA:
+        if modem == _SX126X_PACKET_TYPE_LORA:
             if self._rxIq:
-                self._invertIQ = SX126X_LORA_IQ_INVERTED
+                self._invertIQ = _SX126X_LORA_IQ_INVERTED
             else:
-                self._invertIQ = SX126X_LORA_IQ_STANDARD
+                self._invertIQ = _SX126X_LORA_IQ_STANDARD
                 
             state = self.setPacketParams(self._preambleLength, self._crcType, self._implicitLen, self._headerType, self._invertIQ)
-        elif modem == SX126X_PACKET_TYPE_GFSK:
+        elif modem == _SX126X_PACKET_TYPE_GFSK:
             state = self.setPacketParamsFSK(self._preambleLengthFSK, self._crcTypeFSK, self._syncWordLength, self._addrComp, self._whitening, self._packetType, self._packetLength, self._preambleDetectorLength)
         else:
             return ERR_UNKNOWN
@@ -428,8 +812,8 @@ class SX126X:
         transitionTime = int(self._tcxoDelay + 1000)
         sleepPeriod -= transitionTime
         
-        rxPeriodRaw = int((rxPeriod * 8) / 125)
-        sleepPeriodRaw = int((sleepPeriod * 8) / 125)
+        rxPeriodRaw = _mulDiv(rxPeriod, 8, 125)
+        sleepPeriodRaw = _mulDiv(sleepPeriod, 8, 125)
         
         if rxPeriodRaw & 0xFF000000 or rxPeriodRaw == 0:
             return ERR_INVALID_RX_PERIOD
@@ -445,26 +829,34 @@ class SX126X:
         return self.SPIwriteCommand([SX126X_CMD_SET_RX_DUTY_CYCLE], 1, data, 6)
             
     def startReceiveDutyCycleAuto(self, senderPreambleLength=0, minSymbols=8):
+        rxPeriod, sleepPeriod = self.getDutyCycleWindows(senderPreambleLength, minSymbols)
+        if sleepPeriod == 0:
+            return self.startReceive()
+
+        return self.startReceiveDutyCycle(rxPeriod, sleepPeriod)
+
+    def getDutyCycleWindows(self, senderPreambleLength=0, minSymbols=8):
+        # (rx, sleep) periods in us picked by startReceiveDutyCycleAuto, (0, 0) when it listens continuously
         if senderPreambleLength == 0:
             senderPreambleLength = self._preambleLength
                 
         sleepSymbols = int(senderPreambleLength - 2 * minSymbols)
         
         if (2 * minSymbols) > senderPreambleLength:
-            return self.startReceive()
+            return 0, 0
                 
-        symbolLength = int(((10*1000) << self._sf) / (10 * self._bwKhz))
+        symbolLength = loraSymbolLength(self._sf, self._bw10Hz)
         sleepPeriod = symbolLength * sleepSymbols
         
-        wakePeriod = int(max((symbolLength * (senderPreambleLength + 1) - (sleepPeriod - 1000)) / 2, symbolLength * (minSymbols + 1)))
+        wakePeriod = max((symbolLength * (senderPreambleLength + 1) - (sleepPeriod - 1000)) // 2, symbolLength * (minSymbols + 1))
         
         if sleepPeriod < (self._tcxoDelay + 1016):
-            return self.startReceive()
+            return 0, 0
                 
-        return self.startReceiveDutyCycle(wakePeriod, sleepPeriod)
+        return wakePeriod, sleepPeriod
             
     def startReceiveCommon(self):
-        state = self.setDioIrqParams(SX126X_IRQ_RX_DONE | SX126X_IRQ_TIMEOUT | SX126X_IRQ_CRC_ERR | SX126X_IRQ_HEADER_ERR, SX126X_IRQ_RX_DONE)
+        state = self.setDioIrqParams(SX126X_IRQ_RX_DONE | _SX126X_IRQ_TIMEOUT | _SX126X_IRQ_CRC_ERR | _SX126X_IRQ_HEADER_ERR, SX126X_IRQ_RX_DONE)
         ASSERT(state)
         
         state = self.setBufferBaseAddress()
@@ -473,9 +865,9 @@ class SX126X:
         state = self.clearIrqStatus()
 
         modem = self.getPacketType()
-        if modem == SX126X_PACKET_TYPE_LORA:
+        if modem == _SX126X_PACKET_TYPE_LORA:
             state = self.setPacketParams(self._preambleLength, self._crcType, self._implicitLen, self._headerType, self._invertIQ)
-        elif modem == SX126X_PACKET_TYPE_GFSK:
+        elif modem == _SX126X_PACKET_TYPE_GFSK:
             state = self.setPacketParamsFSK(self._preambleLengthFSK, self._crcTypeFSK, self._syncWordLength, self._addrComp, self._whitening, self._packetType)
         else:
             return ERR_UNKNOWN
@@ -488,14 +880,28 @@ class SX126X:
         
         irq = self.getIrqStatus()
         crcState = ERR_NONE
-        if irq & SX126X_IRQ_CRC_ERR or irq & SX126X_IRQ_HEADER_ERR:
+        if irq & _SX126X_IRQ_CRC_ERR or irq & _SX126X_IRQ_HEADER_ERR:
             crcState = ERR_CRC_MISMATCH
                 
         length = len_
-        if len_ == SX126X_MAX_PACKET_LENGTH:
-            length = self.getPacketLength()
-                
-        state = self.readBuffer(data, length)
+        offset = 0
+        if len_ == SX126X_MAX_PACKET_LENGTH or self._rxFilter is not None:
+            packetLength, offset = self.getRxBufferStatus()
+            if len_ == SX126X_MAX_PACKET_LENGTH:
+                length = packetLength
+
+        # peek at the first bytes and drop the packet before the rest crosses the SPI bus
+        if self._rxFilter is not None and crcState == ERR_NONE:
+            n = min(self._peekLength, packetLength)
+            peek = memoryview(self._peek)[:n]
+            state = self.readBuffer(peek, n, offset)
+            ASSERT(state)
+            if not self._rxFilter(peek, packetLength):
+                self.packetsFiltered += 1
+                self.clearIrqStatus()
+                return ERR_PACKET_FILTERED
+
+        state = self.readBuffer(data, length, offset)
         ASSERT(state)
         
         state = self.clearIrqStatus()
@@ -505,33 +911,34 @@ class SX126X:
         return state
             
     def setBandwidth(self, bw):
-        if self.getPacketType() != SX126X_PACKET_TYPE_LORA:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_LORA:
             return ERR_WRONG_MODEM
                 
         if not ((bw > 0) and (bw < 510)):
             return ERR_INVALID_BANDWIDTH
                 
         bw_div2 = int(bw / 2 + 0.01)
-        switch = {3: SX126X_LORA_BW_7_8,
-                  5: SX126X_LORA_BW_10_4,
-                  7: SX126X_LORA_BW_15_6,
-                  10: SX126X_LORA_BW_20_8,
-                  15: SX126X_LORA_BW_31_25,
-                  20: SX126X_LORA_BW_41_7,
-                  31: SX126X_LORA_BW_62_5,
-                  62: SX126X_LORA_BW_125_0,
-                  125: SX126X_LORA_BW_250_0,
-                  250: SX126X_LORA_BW_500_0}
+        switch = {3: _SX126X_LORA_BW_7_8,
+                  5: _SX126X_LORA_BW_10_4,
+                  7: _SX126X_LORA_BW_15_6,
+                  10: _SX126X_LORA_BW_20_8,
+                  15: _SX126X_LORA_BW_31_25,
+                  20: _SX126X_LORA_BW_41_7,
+                  31: _SX126X_LORA_BW_62_5,
+                  62: _SX126X_LORA_BW_125_0,
+                  125: _SX126X_LORA_BW_250_0,
+                  250: _SX126X_LORA_BW_500_0}
         try:
             self._bw = switch[bw_div2]
         except:
             return ERR_INVALID_BANDWIDTH
 
         self._bwKhz = bw
+        self._bw10Hz = _thousandths(bw) // 10
         return self.setModulationParams(self._sf, self._bw, self._cr, self._ldro)
 
     def setSpreadingFactor(self, sf):
-        if self.getPacketType() != SX126X_PACKET_TYPE_LORA:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_LORA:
             return ERR_WRONG_MODEM
 
         if not ((sf >= 5) and (sf <= 12)):
@@ -541,7 +948,7 @@ class SX126X:
         return self.setModulationParams(self._sf, self._bw, self._cr, self._ldro)
 
     def setCodingRate(self, cr):
-        if self.getPacketType() != SX126X_PACKET_TYPE_LORA:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_LORA:
             return ERR_WRONG_MODEM
 
         if not ((cr >= 5) and (cr <= 8)):
@@ -551,20 +958,20 @@ class SX126X:
         return self.setModulationParams(self._sf, self._bw, self._cr, self._ldro)
 
     def setSyncWord(self, syncWord, *args):
-        if self.getPacketType() == SX126X_PACKET_TYPE_LORA:
+        if self.getPacketType() == _SX126X_PACKET_TYPE_LORA:
             if len(args) > 0:
                 controlBits = args[0]
             else:
                 controlBits = 0x44
             data = [int((syncWord & 0xF0) | ((controlBits & 0xF0) >> 4)), int(((syncWord & 0x0F) << 4) | (controlBits & 0x0F))]
-            return self.writeRegister(SX126X_REG_LORA_SYNC_WORD_MSB, data, 2)
+            return self.writeRegister(_SX126X_REG_LORA_SYNC_WORD_MSB, data, 2)
 
-        elif self.getPacketType() == SX126X_PACKET_TYPE_GFSK:
+        elif self.getPacketType() == _SX126X_PACKET_TYPE_GFSK:
             len_ = args[0]
             if len_ > 8:
                 return ERR_INVALID_SYNC_WORD
 
-            state = self.writeRegister(SX126X_REG_SYNC_WORD_0, syncWord, len_)
+            state = self.writeRegister(_SX126X_REG_SYNC_WORD_0, syncWord, len_)
             ASSERT(state)
 
             self._syncWordLength = len_ * 8
@@ -592,115 +999,116 @@ class SX126X:
 
     def setPreambleLength(self, preambleLength):
         modem = self.getPacketType()
-        if modem == SX126X_PACKET_TYPE_LORA:
+        if modem == _SX126X_PACKET_TYPE_LORA:
             self._preambleLength = preambleLength
             return self.setPacketParams(self._preambleLength, self._crcType, self._implicitLen, self._headerType, self._invertIQ)
-        elif modem == SX126X_PACKET_TYPE_GFSK:
+        elif modem == _SX126X_PACKET_TYPE_GFSK:
             self._preambleLengthFSK = preambleLength
             return self.setPacketParamsFSK(self._preambleLengthFSK, self._crcTypeFSK, self._syncWordLength, self._addrComp, self._whitening, self._packetType, self._packetLength, self._preambleDetectorLength)
 
         return ERR_UNKNOWN
 
     def setFrequencyDeviation(self, freqDev):
-        if self.getPacketType() != SX126X_PACKET_TYPE_GFSK:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_GFSK:
             return ERR_WRONG_MODEM
 
         if not (freqDev <= 200.0):
             return ERR_INVALID_FREQUENCY_DEVIATION
 
-        freqDevRaw = int(((freqDev * 1000.0) * float(1 << 25)) / (SX126X_CRYSTAL_FREQ * 1000000.0))
+        freqDevRaw = hzToRaw(_thousandths(freqDev))
 
         self._freqDev = freqDevRaw
         return self.setModulationParamsFSK(self._br, self._pulseShape, self._rxBw, self._freqDev)
 
     def setBitRate(self, br):
-        if self.getPacketType() != SX126X_PACKET_TYPE_GFSK:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_GFSK:
             return ERR_WRONG_MODEM
 
         if not ((br >= 0.6) and (br <= 300.0)):
             return ERR_INVALID_BIT_RATE
 
-        brRaw = int((SX126X_CRYSTAL_FREQ * 1000000.0 * 32.0) / (br * 1000.0))
+        # 32 * 32 MHz / bit rate in bps
+        brRaw = 1024000000 // _thousandths(br)
 
         self._br = brRaw
 
         return self.setModulationParamsFSK(self._br, self._pulseShape, self._rxBw, self._freqDev)
 
     def setRxBandwidth(self, rxBw):
-        if self.getPacketType() != SX126X_PACKET_TYPE_GFSK:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_GFSK:
             return ERR_WRONG_MODEM
 
         self._rxBwKhz = rxBw
 
         if abs(rxBw - 4.8) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_4_8
+            self._rxBw = _SX126X_GFSK_RX_BW_4_8
         elif abs(rxBw - 5.8) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_5_8
+            self._rxBw = _SX126X_GFSK_RX_BW_5_8
         elif abs(rxBw - 7.3) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_7_3
+            self._rxBw = _SX126X_GFSK_RX_BW_7_3
         elif abs(rxBw - 9.7) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_9_7
+            self._rxBw = _SX126X_GFSK_RX_BW_9_7
         elif abs(rxBw - 11.7) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_11_7
+            self._rxBw = _SX126X_GFSK_RX_BW_11_7
         elif abs(rxBw - 14.6) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_14_6
+            self._rxBw = _SX126X_GFSK_RX_BW_14_6
         elif abs(rxBw - 19.5) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_19_5
+            self._rxBw = _SX126X_GFSK_RX_BW_19_5
         elif abs(rxBw - 23.4) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_23_4
+            self._rxBw = _SX126X_GFSK_RX_BW_23_4
         elif abs(rxBw - 29.3) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_29_3
+            self._rxBw = _SX126X_GFSK_RX_BW_29_3
         elif abs(rxBw - 39.0) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_39_0
+            self._rxBw = _SX126X_GFSK_RX_BW_39_0
         elif abs(rxBw - 46.9) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_46_9
+            self._rxBw = _SX126X_GFSK_RX_BW_46_9
         elif abs(rxBw - 58.6) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_58_6
+            self._rxBw = _SX126X_GFSK_RX_BW_58_6
         elif abs(rxBw - 78.2) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_78_2
+            self._rxBw = _SX126X_GFSK_RX_BW_78_2
         elif abs(rxBw - 93.8) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_93_8
+            self._rxBw = _SX126X_GFSK_RX_BW_93_8
         elif abs(rxBw - 117.3) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_117_3
+            self._rxBw = _SX126X_GFSK_RX_BW_117_3
         elif abs(rxBw - 156.2) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_156_2
+            self._rxBw = _SX126X_GFSK_RX_BW_156_2
         elif abs(rxBw - 187.2) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_187_2
+            self._rxBw = _SX126X_GFSK_RX_BW_187_2
         elif abs(rxBw - 234.3) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_234_3
+            self._rxBw = _SX126X_GFSK_RX_BW_234_3
         elif abs(rxBw - 312.0) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_312_0
+            self._rxBw = _SX126X_GFSK_RX_BW_312_0
         elif abs(rxBw - 373.6) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_373_6
+            self._rxBw = _SX126X_GFSK_RX_BW_373_6
         elif abs(rxBw - 467.0) <= 0.001:
-            self._rxBw = SX126X_GFSK_RX_BW_467_0
+            self._rxBw = _SX126X_GFSK_RX_BW_467_0
         else:
             return ERR_INVALID_RX_BANDWIDTH
 
         return self.setModulationParamsFSK(self._br, self._pulseShape, self._rxBw, self._freqDev)
 
     def setDataShaping(self, sh):
-        if self.getPacketType() != SX126X_PACKET_TYPE_GFSK:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_GFSK:
             return ERR_WRONG_MODEM
 
         sh *= 10.0
         if abs(sh - 0.0) <= 0.001:
-            self._pulseShape = SX126X_GFSK_FILTER_NONE
+            self._pulseShape = _SX126X_GFSK_FILTER_NONE
         elif abs(sh - 3.0) <= 0.001:
-            self._pulseShape = SX126X_GFSK_FILTER_GAUSS_0_3
+            self._pulseShape = _SX126X_GFSK_FILTER_GAUSS_0_3
         elif abs(sh - 5.0) <= 0.001:
-            self._pulseShape = SX126X_GFSK_FILTER_GAUSS_0_5
+            self._pulseShape = _SX126X_GFSK_FILTER_GAUSS_0_5
         elif abs(sh - 7.0) <= 0.001:
-            self._pulseShape = SX126X_GFSK_FILTER_GAUSS_0_7
+            self._pulseShape = _SX126X_GFSK_FILTER_GAUSS_0_7
         elif abs(sh - 10.0) <= 0.001:
-            self._pulseShape = SX126X_GFSK_FILTER_GAUSS_1
+            self._pulseShape = _SX126X_GFSK_FILTER_GAUSS_1
         else:
             return ERR_INVALID_DATA_SHAPING
 
         return self.setModulationParamsFSK(self._br, self._pulseShape, self._rxBw, self._freqDev)
 
     def setSyncBits(self, syncWord, bitsLen):
-        if self.getPacketType() != SX126X_PACKET_TYPE_GFSK:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_GFSK:
             return ERR_WRONG_MODEM
 
         if bitsLen > 0x40:
@@ -710,7 +1118,7 @@ class SX126X:
         if (bitsLen % 8) != 0:
             bytesLen += 1
 
-        state = self.writeRegister(SX126X_REG_SYNC_WORD_0, syncWord, bytesLen)
+        state = self.writeRegister(_SX126X_REG_SYNC_WORD_0, syncWord, bytesLen)
         ASSERT(state)
 
         self._syncWordLength = bitsLen
@@ -719,7 +1127,7 @@ class SX126X:
         return state
 
     def setNodeAddress(self, nodeAddr):
-        if self.getPacketType() != SX126X_PACKET_TYPE_GFSK:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_GFSK:
             return ERR_WRONG_MODEM
 
         self._addrComp = SX126X_GFSK_ADDRESS_FILT_NODE
@@ -727,24 +1135,24 @@ class SX126X:
         state = self.setPacketParamsFSK(self._preambleLengthFSK, self._crcTypeFSK, self._syncWordLength, self._addrComp, self._whitening, self._packetType, self._packetLength, self._preambleDetectorLength)
         ASSERT(state)
 
-        state = self.writeRegister(SX126X_REG_NODE_ADDRESS, [nodeAddr], 1)
+        state = self.writeRegister(_SX126X_REG_NODE_ADDRESS, [nodeAddr], 1)
 
         return state
 
     def setBroadcastAddress(self, broadAddr):
-        if self.getPacketType() != SX126X_PACKET_TYPE_GFSK:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_GFSK:
             return ERR_WRONG_MODEM
 
         self._addrComp = SX126X_GFSK_ADDRESS_FILT_NODE_BROADCAST
         state = self.setPacketParamsFSK(self._preambleLengthFSK, self._crcTypeFSK, self._syncWordLength, self._addrComp, self._whitening, self._packetType, self._packetLength, self._preambleDetectorLength)
         ASSERT(state)
 
-        state = self.writeRegister(SX126X_REG_BROADCAST_ADDRESS, [broadAddr], 1)
+        state = self.writeRegister(_SX126X_REG_BROADCAST_ADDRESS, [broadAddr], 1)
 
         return state
 
     def disableAddressFiltering(self):
-        if self.getPacketType() != SX126X_PACKET_TYPE_GFSK:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_GFSK:
             return ERR_WRONG_MODEM
 
         self._addrComp = SX126X_GFSK_ADDRESS_FILT_OFF
@@ -753,19 +1161,19 @@ class SX126X:
     def setCRC(self, len_, initial=0x1D0F, polynomial=0x1021, inverted=True):
         modem = self.getPacketType()
 
-        if modem == SX126X_PACKET_TYPE_GFSK:
+        if modem == _SX126X_PACKET_TYPE_GFSK:
             if len_ == 0:
-                self._crcTypeFSK = SX126X_GFSK_CRC_OFF
+                self._crcTypeFSK = _SX126X_GFSK_CRC_OFF
             elif len_ == 1:
                 if inverted:
-                    self._crcTypeFSK = SX126X_GFSK_CRC_1_BYTE_INV
+                    self._crcTypeFSK = _SX126X_GFSK_CRC_1_BYTE_INV
                 else:
-                    self._crcTypeFSK = SX126X_GFSK_CRC_1_BYTE
+                    self._crcTypeFSK = _SX126X_GFSK_CRC_1_BYTE
             elif len_ == 2:
                 if inverted:
-                    self._crcTypeFSK = SX126X_GFSK_CRC_2_BYTE_INV
+                    self._crcTypeFSK = _SX126X_GFSK_CRC_2_BYTE_INV
                 else:
-                    self._crcTypeFSK = SX126X_GFSK_CRC_2_BYTE
+                    self._crcTypeFSK = _SX126X_GFSK_CRC_2_BYTE
             else:
                 return ERR_INVALID_CRC_CONFIGURATION
 
@@ -773,45 +1181,45 @@ class SX126X:
             ASSERT(state)
 
             data = [int((initial >> 8) & 0xFF), int(initial & 0xFF)]
-            state = self.writeRegister(SX126X_REG_CRC_INITIAL_MSB, data, 2)
+            state = self.writeRegister(_SX126X_REG_CRC_INITIAL_MSB, data, 2)
             ASSERT(state)
 
             data[0] = int((polynomial >> 8) & 0xFF)
             data[1] = int(polynomial & 0xFF)
-            state = self.writeRegister(SX126X_REG_CRC_POLYNOMIAL_MSB, data, 2)
+            state = self.writeRegister(_SX126X_REG_CRC_POLYNOMIAL_MSB, data, 2)
 
             return state
 
-        elif modem == SX126X_PACKET_TYPE_LORA:
+        elif modem == _SX126X_PACKET_TYPE_LORA:
 
             if len_:
                 self._crcType = SX126X_LORA_CRC_ON
             else:
-                self._crcType = SX126X_LORA_CRC_OFF
+                self._crcType = _SX126X_LORA_CRC_OFF
 
             return self.setPacketParams(self._preambleLength, self._crcType, self._implicitLen, self._headerType, self._invertIQ)
 
         return ERR_UNKNOWN
 
     def setWhitening(self, enabled, initial=0x0100):
-        if self.getPacketType() != SX126X_PACKET_TYPE_GFSK:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_GFSK:
             return ERR_WRONG_MODEM
 
         state = ERR_NONE
         if enabled != True:
-            self._whitening = SX126X_GFSK_WHITENING_OFF
+            self._whitening = _SX126X_GFSK_WHITENING_OFF
 
             state = self.setPacketParamsFSK(self._preambleLengthFSK, self._crcTypeFSK, self._syncWordLength, self._addrComp, self._whitening, self._packetType, self._packetLength, self._preambleDetectorLength)
             ASSERT(state)
         else:
-            self._whitening = SX126X_GFSK_WHITENING_ON
+            self._whitening = _SX126X_GFSK_WHITENING_ON
             
             data = bytearray(1)
             data_mv = memoryview(data)
-            state = self.readRegister(SX126X_REG_WHITENING_INITIAL_MSB, data_mv, 1)
+            state = self.readRegister(_SX126X_REG_WHITENING_INITIAL_MSB, data_mv, 1)
             ASSERT(state)
             data2 = [(data[0] & 0xFE) | int((initial >> 8) & 0x01), int(initial & 0xFF)]
-            state = self.writeRegister(SX126X_REG_WHITENING_INITIAL_MSB, data2, 2)
+            state = self.writeRegister(_SX126X_REG_WHITENING_INITIAL_MSB, data2, 2)
             ASSERT(state)
 
             state = self.setPacketParamsFSK(self._preambleLengthFSK, self._crcTypeFSK, self._syncWordLength, self._addrComp, self._whitening, self._packetType, self._packetLength, self._preambleDetectorLength)
@@ -821,13 +1229,49 @@ class SX126X:
     def getDataRate(self):
         return self._dataRate
 
+    def getTxTimestamp(self):
+        return self._txTimestamp
+
+    def getRxTimestamp(self):
+        return self._rxTimestamp
+
+    def setTimestampLatency(self, txLatency_us=0, rxLatency_us=500):
+        # delay between the DIO1 edge and the host noticing it; the RX default is half the poll interval
+        self._txLatency = txLatency_us
+        self._rxLatency = rxLatency_us
+
+    def setRxFilter(self, predicate=None, peekLength=4):
+        # predicate(header, length) sees the first peekLength bytes of every good packet and
+        # its full length; packets it rejects are dropped without reading the payload
+        self._rxFilter = predicate
+        self._peekLength = peekLength
+        self._peek = bytearray(peekLength)
+
+    def getPreambleTime(self):
+        # microseconds from the start of the packet to the end of the preamble and sync word
+        if self.getPacketType() == _SX126X_PACKET_TYPE_LORA:
+            symbolLength_us = loraSymbolLength(self._sf, self._bw10Hz)
+            sfdSymbols_x4 = 17
+            if self._sf == 5 or self._sf == 6:
+                sfdSymbols_x4 = 25
+            return _mulDiv(symbolLength_us, self._preambleLength * 4 + sfdSymbols_x4, 4)
+        else:
+            return _mulDiv(self._br, self._preambleLengthFSK + self._syncWordLength, 1024)
+
+    def getPreambleEndTime(self, len_):
+        # end-of-preamble time of the last received packet of len_ bytes, in ticks_us
+        return ticks_add(self._rxTimestamp, self.getPreambleTime() - self.getTimeOnAir(len_))
+
+    def getTxStartTime(self, len_):
+        return ticks_add(self._txTimestamp, -self.getTimeOnAir(len_))
+
     def getRSSI(self):
         packetStatus = self.getPacketStatus()
         rssiPkt = int(packetStatus & 0xFF)
         return -1.0 * rssiPkt/2.0
 
     def getSNR(self):
-        if self.getPacketType() != SX126X_PACKET_TYPE_LORA:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_LORA:
             return ERR_WRONG_MODEM
 
         packetStatus = self.getPacketStatus()
@@ -843,55 +1287,54 @@ class SX126X:
         self.SPIreadCommand([SX126X_CMD_GET_RX_BUFFER_STATUS], 1, rxBufStatus_mv, 2)
         return rxBufStatus[0]
 
+    def getRxBufferStatus(self):
+        # (payload length, RX buffer offset of its first byte)
+        rxBufStatus = bytearray(2)
+        rxBufStatus_mv = memoryview(rxBufStatus)
+        self.SPIreadCommand([SX126X_CMD_GET_RX_BUFFER_STATUS], 1, rxBufStatus_mv, 2)
+        return rxBufStatus[0], rxBufStatus[1]
+
     def fixedPacketLengthMode(self, len_=SX126X_MAX_PACKET_LENGTH):
-        return self.setPacketMode(SX126X_GFSK_PACKET_FIXED, len_)
+        return self.setPacketMode(_SX126X_GFSK_PACKET_FIXED, len_)
 
     def variablePacketLengthMode(self, maxLen=SX126X_MAX_PACKET_LENGTH):
-        return self.setPacketMode(SX126X_GFSK_PACKET_VARIABLE, maxLen)
+        return self.setPacketMode(_SX126X_GFSK_PACKET_VARIABLE, maxLen)
 
     def getTimeOnAir(self, len_):
-        if self.getPacketType() == SX126X_PACKET_TYPE_LORA:
-            symbolLength_us = int(((1000 * 10) << self._sf) / (self._bwKhz * 10))
-            sfCoeff1_x4 = 17
-            sfCoeff2 = 8
-            if self._sf == 5 or self._sf == 6:
-                sfCoeff1_x4 = 25
-                sfCoeff2 = 0
-            sfDivisor = 4*self._sf
-            if symbolLength_us >= 16000:
-                sfDivisor = 4*(self._sf - 2)
-            bitsPerCrc = 16
-            N_symbol_header = 20 if self._headerType == SX126X_LORA_HEADER_EXPLICIT else 0
-
-            bitCount = int(8 * len_ + self._crcType * bitsPerCrc - 4 * self._sf  + sfCoeff2 + N_symbol_header)
-            if bitCount < 0:
-                bitCount = 0
-
-            nPreCodedSymbols = int((bitCount + (sfDivisor - 1)) / sfDivisor)
-
-            nSymbol_x4 = int((self._preambleLength + 8) * 4 + sfCoeff1_x4 + nPreCodedSymbols * (self._cr + 4) * 4)
-
-            return int((symbolLength_us * nSymbol_x4) / 4)
+        if self.getPacketType() == _SX126X_PACKET_TYPE_LORA:
+            return loraTimeOnAir(len_, self._sf, self._bwKhz, self._cr + 4, self._preambleLength,
+                                 self._headerType == _SX126X_LORA_HEADER_EXPLICIT, self._crcType)
         else:
-            return int((len_ * 8 * self._br) / (SX126X_CRYSTAL_FREQ * 32))
+            # preamble and sync word lengths are in bits, the rest in bytes
+            overhead = 0
+            if self._packetType == _SX126X_GFSK_PACKET_VARIABLE:
+                overhead += 1
+            if self._addrComp != SX126X_GFSK_ADDRESS_FILT_OFF:
+                overhead += 1
+            if self._crcTypeFSK == _SX126X_GFSK_CRC_1_BYTE or self._crcTypeFSK == _SX126X_GFSK_CRC_1_BYTE_INV:
+                overhead += 1
+            elif self._crcTypeFSK == _SX126X_GFSK_CRC_2_BYTE or self._crcTypeFSK == _SX126X_GFSK_CRC_2_BYTE_INV:
+                overhead += 2
+            bitCount = self._preambleLengthFSK + self._syncWordLength + (len_ + overhead) * 8
+            return _mulDiv(self._br, bitCount, 1024)
 
     def implicitHeader(self, len_):
         return self.setHeaderType(SX126X_LORA_HEADER_IMPLICIT, len_)
 
     def explicitHeader(self):
-        return self.setHeaderType(SX126X_LORA_HEADER_EXPLICIT)
+        return self.setHeaderType(_SX126X_LORA_HEADER_EXPLICIT)
 
     def setRegulatorLDO(self):
-        return self.setRegulatorMode(SX126X_REGULATOR_LDO)
+        return self.setRegulatorMode(_SX126X_REGULATOR_LDO)
 
     def setRegulatorDCDC(self):
-        return self.setRegulatorMode(SX126X_REGULATOR_DC_DC)
+        return self.setRegulatorMode(_SX126X_REGULATOR_DC_DC)
 
     def setEncoding(self, encoding):
         return self.setWhitening(encoding)
 
     def forceLDRO(self, enable):
-        if self.getPacketType() != SX126X_PACKET_TYPE_LORA:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_LORA:
             return ERR_WRONG_MODEM
 
         self._ldroAuto = False
@@ -899,7 +1342,7 @@ class SX126X:
         return self.setModulationParams(self._sf, self._bw, self._cr, self._ldro)
 
     def autoLDRO(self):
-        if self.getPacketType() != SX126X_PACKET_TYPE_LORA:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_LORA:
             return ERR_WRONG_MODEM
 
         self._ldroAuto = True
@@ -916,40 +1359,40 @@ class SX126X:
 
         data = [0,0,0,0]
         if abs(voltage - 1.6) <= 0.001:
-            data[0] = SX126X_DIO3_OUTPUT_1_6
+            data[0] = _SX126X_DIO3_OUTPUT_1_6
         elif abs(voltage - 1.7) <= 0.001:
-            data[0] = SX126X_DIO3_OUTPUT_1_7
+            data[0] = _SX126X_DIO3_OUTPUT_1_7
         elif abs(voltage - 1.8) <= 0.001:
-            data[0] = SX126X_DIO3_OUTPUT_1_8
+            data[0] = _SX126X_DIO3_OUTPUT_1_8
         elif abs(voltage - 2.2) <= 0.001:
-            data[0] = SX126X_DIO3_OUTPUT_2_2
+            data[0] = _SX126X_DIO3_OUTPUT_2_2
         elif abs(voltage - 2.4) <= 0.001:
-            data[0] = SX126X_DIO3_OUTPUT_2_4
+            data[0] = _SX126X_DIO3_OUTPUT_2_4
         elif abs(voltage - 2.7) <= 0.001:
-            data[0] = SX126X_DIO3_OUTPUT_2_7
+            data[0] = _SX126X_DIO3_OUTPUT_2_7
         elif abs(voltage - 3.0) <= 0.001:
-            data[0] = SX126X_DIO3_OUTPUT_3_0
+            data[0] = _SX126X_DIO3_OUTPUT_3_0
         elif abs(voltage - 3.3) <= 0.001:
-            data[0] = SX126X_DIO3_OUTPUT_3_3
+            data[0] = _SX126X_DIO3_OUTPUT_3_3
         else:
             return ERR_INVALID_TCXO_VOLTAGE
 
-        delayValue = int(float(delay) / 15.625)
+        delayValue = _mulDiv(int(delay), 8, 125)
         data[1] = int((delayValue >> 16) & 0xFF)
         data[2] = int((delayValue >> 8) & 0xFF)
         data[3] = int(delayValue & 0xFF)
 
         self._tcxoDelay = delay
 
-        return self.SPIwriteCommand([SX126X_CMD_SET_DIO3_AS_TCXO_CTRL], 1, data, 4)
+        return self.SPIwriteCommand([_SX126X_CMD_SET_DIO3_AS_TCXO_CTRL], 1, data, 4)
 
     def setDio2AsRfSwitch(self, enable=True):
         data = [0]
         if enable:
-            data = [SX126X_DIO2_AS_RF_SWITCH]
+            data = [_SX126X_DIO2_AS_RF_SWITCH]
         else:
-            data = [SX126X_DIO2_AS_IRQ]
-        return self.SPIwriteCommand([SX126X_CMD_SET_DIO2_AS_RF_SWITCH_CTRL], 1, data, 1)
+            data = [_SX126X_DIO2_AS_IRQ]
+        return self.SPIwriteCommand([_SX126X_CMD_SET_DIO2_AS_RF_SWITCH_CTRL], 1, data, 1)
 
     def setTx(self, timeout=0):
         data = [int((timeout >> 16) & 0xFF), int((timeout >> 8) & 0xFF), int(timeout & 0xFF)]
@@ -960,11 +1403,11 @@ class SX126X:
         return self.SPIwriteCommand([SX126X_CMD_SET_RX], 1, data, 3)
 
     def setCad(self):
-        return self.SPIwriteCommand([SX126X_CMD_SET_CAD], 1, [], 0)
+        return self.SPIwriteCommand([_SX126X_CMD_SET_CAD], 1, [], 0)
 
-    def setPaConfig(self, paDutyCycle, deviceSel, hpMax=SX126X_PA_CONFIG_HP_MAX, paLut=SX126X_PA_CONFIG_PA_LUT):
+    def setPaConfig(self, paDutyCycle, deviceSel, hpMax=_SX126X_PA_CONFIG_HP_MAX, paLut=_SX126X_PA_CONFIG_PA_LUT):
         data = [paDutyCycle, hpMax, deviceSel, paLut]
-        return self.SPIwriteCommand([SX126X_CMD_SET_PA_CONFIG], 1, data, 4)
+        return self.SPIwriteCommand([_SX126X_CMD_SET_PA_CONFIG], 1, data, 4)
 
     def writeRegister(self, addr, data, numBytes):
         cmd = [SX126X_CMD_WRITE_REGISTER, int((addr >> 8) & 0xFF), int(addr & 0xFF)]
@@ -981,13 +1424,13 @@ class SX126X:
 
         return state
 
-    def readBuffer(self, data, numBytes):
-        cmd = [SX126X_CMD_READ_BUFFER, SX126X_CMD_NOP]
+    def readBuffer(self, data, numBytes, offset=0x00):
+        cmd = [SX126X_CMD_READ_BUFFER, offset]
         state = self.SPIreadCommand(cmd, 2, data, numBytes)
 
         return state
 
-    def setDioIrqParams(self, irqMask, dio1Mask, dio2Mask=SX126X_IRQ_NONE, dio3Mask=SX126X_IRQ_NONE):
+    def setDioIrqParams(self, irqMask, dio1Mask, dio2Mask=_SX126X_IRQ_NONE, dio3Mask=_SX126X_IRQ_NONE):
         data = [int((irqMask >> 8) & 0xFF), int(irqMask & 0xFF),
                 int((dio1Mask >> 8) & 0xFF), int(dio1Mask & 0xFF),
                 int((dio2Mask >> 8) & 0xFF), int(dio2Mask & 0xFF),
@@ -1000,7 +1443,7 @@ class SX126X:
         self.SPIreadCommand([SX126X_CMD_GET_IRQ_STATUS], 1, data_mv, 2)
         return int((data[0] << 8) | data[1])
 
-    def clearIrqStatus(self, clearIrqParams=SX126X_IRQ_ALL):
+    def clearIrqStatus(self, clearIrqParams=_SX126X_IRQ_ALL):
         data = [int((clearIrqParams >> 8) & 0xFF), int(clearIrqParams & 0xFF)]
         return self.SPIwriteCommand([SX126X_CMD_CLEAR_IRQ_STATUS], 1, data, 2)
 
@@ -1009,10 +1452,11 @@ class SX126X:
                 int((frf >> 16) & 0xFF),
                 int((frf >> 8) & 0xFF),
                 int(frf & 0xFF)]
+        self._frf = frf
         return self.SPIwriteCommand([SX126X_CMD_SET_RF_FREQUENCY], 1, data, 4)
 
     def calibrateImage(self, data):
-        return self.SPIwriteCommand([SX126X_CMD_CALIBRATE_IMAGE], 1, data, 2)
+        return self.SPIwriteCommand([_SX126X_CMD_CALIBRATE_IMAGE], 1, data, 2)
 
     def getPacketType(self):
         data = bytearray([0xFF])
@@ -1020,14 +1464,14 @@ class SX126X:
         self.SPIreadCommand([SX126X_CMD_GET_PACKET_TYPE], 1, data_mv, 1)
         return data[0]
 
-    def setTxParams(self, power, rampTime=SX126X_PA_RAMP_200U):
+    def setTxParams(self, power, rampTime=_SX126X_PA_RAMP_200U):
         if power < 0:
             power += 256
         data = [power, rampTime]
-        return self.SPIwriteCommand([SX126X_CMD_SET_TX_PARAMS], 1, data, 2)
+        return self.SPIwriteCommand([_SX126X_CMD_SET_TX_PARAMS], 1, data, 2)
 
     def setPacketMode(self, mode, len_):
-        if self.getPacketType() != SX126X_PACKET_TYPE_GFSK:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_GFSK:
             return ERR_WRONG_MODEM
 
         state = self.setPacketParamsFSK(self._preambleLengthFSK, self._crcTypeFSK, self._syncWordLength, self._addrComp, self._whitening, mode, len_, self._preambleDetectorLength)
@@ -1038,7 +1482,7 @@ class SX126X:
         return state
 
     def setHeaderType(self, headerType, len_=0xFF):
-        if self.getPacketType() != SX126X_PACKET_TYPE_LORA:
+        if self.getPacketType() != _SX126X_PACKET_TYPE_LORA:
             return ERR_WRONG_MODEM
 
         state = self.setPacketParams(self._preambleLength, self._crcType, len_, headerType, self._invertIQ)
@@ -1051,31 +1495,31 @@ class SX126X:
 
     def setModulationParams(self, sf, bw, cr, ldro):
         if self._ldroAuto:
-            symbolLength = float((1 << self._sf)) / float(self._bwKhz)
-            if symbolLength >= 16.0:
-                self._ldro = SX126X_LORA_LOW_DATA_RATE_OPTIMIZE_ON
+            # symbol length of 16 ms or more
+            if (100 << self._sf) >= 16 * self._bw10Hz:
+                self._ldro = _SX126X_LORA_LOW_DATA_RATE_OPTIMIZE_ON
             else:
-                self._ldro = SX126X_LORA_LOW_DATA_RATE_OPTIMIZE_OFF
+                self._ldro = _SX126X_LORA_LOW_DATA_RATE_OPTIMIZE_OFF
         else:
             self._ldro = ldro
 
         data = [sf, bw, cr, self._ldro]
-        return self.SPIwriteCommand([SX126X_CMD_SET_MODULATION_PARAMS], 1, data, 4)
+        return self.SPIwriteCommand([_SX126X_CMD_SET_MODULATION_PARAMS], 1, data, 4)
 
     def setModulationParamsFSK(self, br, pulseShape, rxBw, freqDev):
         data = [int((br >> 16) & 0xFF), int((br >> 8) & 0xFF), int(br & 0xFF),
                 pulseShape, rxBw,
                 int((freqDev >> 16) & 0xFF), int((freqDev >> 8) & 0xFF), int(freqDev & 0xFF)]
-        return self.SPIwriteCommand([SX126X_CMD_SET_MODULATION_PARAMS], 1, data, 8)
+        return self.SPIwriteCommand([_SX126X_CMD_SET_MODULATION_PARAMS], 1, data, 8)
 
-    def setPacketParams(self, preambleLength, crcType, payloadLength, headerType, invertIQ=SX126X_LORA_IQ_STANDARD):
+    def setPacketParams(self, preambleLength, crcType, payloadLength, headerType, invertIQ=_SX126X_LORA_IQ_STANDARD):
         state = self.fixInvertedIQ(invertIQ)
         ASSERT(state)
         data = [int((preambleLength >> 8) & 0xFF), int(preambleLength & 0xFF),
                 headerType, payloadLength, crcType, invertIQ]
         return self.SPIwriteCommand([SX126X_CMD_SET_PACKET_PARAMS], 1, data, 6)
 
-    def setPacketParamsFSK(self, preambleLength, crcType, syncWordLength, addrComp, whitening, packetType=SX126X_GFSK_PACKET_VARIABLE, payloadLength=0xFF, preambleDetectorLength=SX126X_GFSK_PREAMBLE_DETECT_16):
+    def setPacketParamsFSK(self, preambleLength, crcType, syncWordLength, addrComp, whitening, packetType=_SX126X_GFSK_PACKET_VARIABLE, payloadLength=0xFF, preambleDetectorLength=SX126X_GFSK_PREAMBLE_DETECT_16):
         data = [int((preambleLength >> 8) & 0xFF), int(preambleLength & 0xFF),
                 preambleDetectorLength, syncWordLength, addrComp,
                 packetType, payloadLength, crcType, whitening]
@@ -1087,7 +1531,7 @@ class SX126X:
 
     def setRegulatorMode(self, mode):
         data = [mode]
-        return self.SPIwriteCommand([SX126X_CMD_SET_REGULATOR_MODE], 1, data, 1)
+        return self.SPIwriteCommand([_SX126X_CMD_SET_REGULATOR_MODE], 1, data, 1)
 
     def getStatus(self):
         data = bytearray(1)
@@ -1105,66 +1549,65 @@ class SX126X:
         data = bytearray(2)
         data_mv = memoryview(data)
         self.SPIreadCommand([SX126X_CMD_GET_DEVICE_ERRORS], 1, data_mv, 2)
-        opError = ((data[0] & 0xFF) << 8) & data[1]
+        opError = ((data[0] & 0xFF) << 8) | data[1]
         return opError
 
     def clearDeviceErrors(self):
-        data = [SX126X_CMD_NOP, SX126X_CMD_NOP]
+        data = [_SX126X_CMD_NOP, _SX126X_CMD_NOP]
         return self.SPIwriteCommand([SX126X_CMD_CLEAR_DEVICE_ERRORS], 1, data, 2)
 
     def setFrequencyRaw(self, freq):
-        frf = int((freq * (1 << SX126X_DIV_EXPONENT)) / SX126X_CRYSTAL_FREQ)
-        return self.setRfFrequency(frf)
+        return self.setRfFrequency(frfFromMhz(freq))
 
     def fixSensitivity(self):
         sensitivityConfig = bytearray(1)
         sensitivityConfig_mv = memoryview(sensitivityConfig)
-        state = self.readRegister(SX126X_REG_SENSITIVITY_CONFIG, sensitivityConfig_mv, 1)
+        state = self.readRegister(_SX126X_REG_SENSITIVITY_CONFIG, sensitivityConfig_mv, 1)
         ASSERT(state)
 
-        if self.getPacketType() == SX126X_PACKET_TYPE_LORA and abs(self._bwKhz - 500.0) <= 0.001:
+        if self.getPacketType() == _SX126X_PACKET_TYPE_LORA and abs(self._bwKhz - 500.0) <= 0.001:
             sensitivityConfig_mv[0] &= 0xFB
         else:
             sensitivityConfig_mv[0] |= 0x04
-        return self.writeRegister(SX126X_REG_SENSITIVITY_CONFIG, sensitivityConfig, 1)
+        return self.writeRegister(_SX126X_REG_SENSITIVITY_CONFIG, sensitivityConfig, 1)
 
     def fixPaClamping(self):
         clampConfig = bytearray(1)
         clampConfig_mv = memoryview(clampConfig)
-        state = self.readRegister(SX126X_REG_TX_CLAMP_CONFIG, clampConfig_mv, 1)
+        state = self.readRegister(_SX126X_REG_TX_CLAMP_CONFIG, clampConfig_mv, 1)
         ASSERT(state)
 
         clampConfig_mv[0] |= 0x1E
-        return self.writeRegister(SX126X_REG_TX_CLAMP_CONFIG, clampConfig, 1)
+        return self.writeRegister(_SX126X_REG_TX_CLAMP_CONFIG, clampConfig, 1)
 
     def fixImplicitTimeout(self):
-        if not (self._headerType == SX126X_LORA_HEADER_IMPLICIT and self.getPacketType() == SX126X_PACKET_TYPE_LORA):
+        if not (self._headerType == SX126X_LORA_HEADER_IMPLICIT and self.getPacketType() == _SX126X_PACKET_TYPE_LORA):
             return ERR_WRONG_MODEM
 
         rtcStop = [0x00]
-        state = self.writeRegister(SX126X_REG_RTC_STOP, rtcStop, 1)
+        state = self.writeRegister(_SX126X_REG_RTC_STOP, rtcStop, 1)
         ASSERT(state)
 
         rtcEvent = bytearray(1)
         rtcEvent_mv = memoryview(rtcEvent)
-        state = self.readRegister(SX126X_REG_RTC_EVENT, rtcEvent_mv, 1)
+        state = self.readRegister(_SX126X_REG_RTC_EVENT, rtcEvent_mv, 1)
         ASSERT(state)
 
         rtcEvent_mv[0] |= 0x02
-        return self.writeRegister(SX126X_REG_RTC_EVENT, rtcEvent, 1)
+        return self.writeRegister(_SX126X_REG_RTC_EVENT, rtcEvent, 1)
 
     def fixInvertedIQ(self, iqConfig):
         iqConfigCurrent = bytearray(1)
         iqConfigCurrent_mv = memoryview(iqConfigCurrent)
-        state = self.readRegister(SX126X_REG_IQ_CONFIG, iqConfigCurrent_mv, 1)
+        state = self.readRegister(_SX126X_REG_IQ_CONFIG, iqConfigCurrent_mv, 1)
         ASSERT(state)
 
-        if iqConfig == SX126X_LORA_IQ_STANDARD:
+        if iqConfig == _SX126X_LORA_IQ_STANDARD:
             iqConfigCurrent_mv[0] &= 0xFB
         else:
             iqConfigCurrent_mv[0] |= 0x04
 
-        return self.writeRegister(SX126X_REG_IQ_CONFIG, iqConfigCurrent, 1)
+        return self.writeRegister(_SX126X_REG_IQ_CONFIG, iqConfigCurrent, 1)
 
     def config(self, modem):
         state = self.setBufferBaseAddress()
@@ -1175,26 +1618,26 @@ class SX126X:
         state = self.SPIwriteCommand([SX126X_CMD_SET_PACKET_TYPE], 1, data, 1)
         ASSERT(state)
 
-        data[0] = SX126X_RX_TX_FALLBACK_MODE_STDBY_RC
-        state = self.SPIwriteCommand([SX126X_CMD_SET_RX_TX_FALLBACK_MODE], 1, data, 1)
+        data[0] = _SX126X_RX_TX_FALLBACK_MODE_STDBY_RC
+        state = self.SPIwriteCommand([_SX126X_CMD_SET_RX_TX_FALLBACK_MODE], 1, data, 1)
         ASSERT(state)
 
-        data[0] = SX126X_CAD_ON_8_SYMB
+        data[0] = _SX126X_CAD_ON_8_SYMB
         data[1] = self._sf + 13
         data[2] = 10
-        data[3] = SX126X_CAD_GOTO_STDBY
+        data[3] = _SX126X_CAD_GOTO_STDBY
         data[4] = 0x00
         data[5] = 0x00
         data[6] = 0x00
-        state = self.SPIwriteCommand([SX126X_CMD_SET_CAD_PARAMS], 1, data, 7)
+        state = self.SPIwriteCommand([_SX126X_CMD_SET_CAD_PARAMS], 1, data, 7)
         ASSERT(state)
 
         state = self.clearIrqStatus()
-        state |= self.setDioIrqParams(SX126X_IRQ_NONE, SX126X_IRQ_NONE)
+        state |= self.setDioIrqParams(_SX126X_IRQ_NONE, _SX126X_IRQ_NONE)
         ASSERT(state)
 
-        data[0] = SX126X_CALIBRATE_ALL
-        state = self.SPIwriteCommand([SX126X_CMD_CALIBRATE], 1, data, 1)
+        data[0] = _SX126X_CALIBRATE_ALL
+        state = self.SPIwriteCommand([_SX126X_CMD_CALIBRATE], 1, data, 1)
         ASSERT(state)
 
         sleep_ms(5)
@@ -1203,7 +1646,7 @@ class SX126X:
           while self.gpio.value():
               yield_()
 
-        if implementation.name == 'circuitpython':
+        if implementation.name != 'micropython':
           while self.gpio.value:
               yield_()
 
@@ -1216,6 +1659,12 @@ class SX126X:
         return self.SPItransfer(cmd, cmdLen, False, [], data, numBytes, waitForBusy)
 
     def SPItransfer(self, cmd, cmdLen, write, dataOut, dataIn, numBytes, waitForBusy, timeout=5000):
+        if self._busyStuck:
+            timeout = _STUCK_BUSY_TIMEOUT_MS
+
+        if implementation.name == 'cpython':
+            return self._SPItransferBlock(cmd, cmdLen, write, dataOut, dataIn, numBytes, waitForBusy, timeout)
+
         if implementation.name == 'micropython':
           self.cs.value(0)
 
@@ -1224,14 +1673,16 @@ class SX126X:
               yield_()
               if abs(ticks_diff(start, ticks_ms())) >= timeout:
                   self.cs.value(1)
-                  return ERR_SPI_CMD_TIMEOUT
+                  return self._busyTimeout()
 
           for i in range(cmdLen):
               self.spi.write(bytes([cmd[i]]))
 
         if implementation.name == 'circuitpython':
           while not self.spi.try_lock():
-              pass
+              yield_()
+          if self._sharedSpi:
+              self.spi.configure(baudrate=self._baudrate, phase=0, polarity=0, bits=8)
           self.cs.value = False
 
           start = ticks_ms()
@@ -1240,7 +1691,7 @@ class SX126X:
               if abs(ticks_diff(start, ticks_ms())) >= timeout:
                   self.cs.value = True
                   self.spi.unlock()
-                  return ERR_SPI_CMD_TIMEOUT
+                  return self._busyTimeout()
 
           for i in range(cmdLen):
               self.spi.write(bytes([cmd[i]]))
@@ -1260,37 +1711,37 @@ class SX126X:
                 if implementation.name == 'circuitpython':
                   self.spi.write_readinto(bytes([dataOut[i]]), in_)
 
-                if (in_[0] & 0b00001110) == SX126X_STATUS_CMD_TIMEOUT or\
-                   (in_[0] & 0b00001110) == SX126X_STATUS_CMD_INVALID or\
-                   (in_[0] & 0b00001110) == SX126X_STATUS_CMD_FAILED:
+                if (in_[0] & 0b00001110) == _SX126X_STATUS_CMD_TIMEOUT or\
+                   (in_[0] & 0b00001110) == _SX126X_STATUS_CMD_INVALID or\
+                   (in_[0] & 0b00001110) == _SX126X_STATUS_CMD_FAILED:
                     status = in_[0] & 0b00001110
                     break
                 elif (in_[0] == 0x00) or (in_[0] == 0xFF):
-                    status = SX126X_STATUS_SPI_FAILED
+                    status = _SX126X_STATUS_SPI_FAILED
                     break
         else:
             if implementation.name == 'micropython':
                 try:
-                    in_ = self.spi.read(1, SX126X_CMD_NOP)
+                    in_ = self.spi.read(1, _SX126X_CMD_NOP)
                 except:
-                    in_ = self.spi.read(1, write=SX126X_CMD_NOP)
+                    in_ = self.spi.read(1, write=_SX126X_CMD_NOP)
 
             if implementation.name == 'circuitpython':
               self.spi.readinto(in_)
 
-            if (in_[0] & 0b00001110) == SX126X_STATUS_CMD_TIMEOUT or\
-               (in_[0] & 0b00001110) == SX126X_STATUS_CMD_INVALID or\
-               (in_[0] & 0b00001110) == SX126X_STATUS_CMD_FAILED:
+            if (in_[0] & 0b00001110) == _SX126X_STATUS_CMD_TIMEOUT or\
+               (in_[0] & 0b00001110) == _SX126X_STATUS_CMD_INVALID or\
+               (in_[0] & 0b00001110) == _SX126X_STATUS_CMD_FAILED:
                 status = in_[0] & 0b00001110
             elif (in_[0] == 0x00) or (in_[0] == 0xFF):
-                status = SX126X_STATUS_SPI_FAILED
+                status = _SX126X_STATUS_SPI_FAILED
             else:
                 if implementation.name == 'micropython':
                     for i in range(numBytes):
                         try:
-                            dataIn[i] = self.spi.read(1, SX126X_CMD_NOP)[0]
+                            dataIn[i] = self.spi.read(1, _SX126X_CMD_NOP)[0]
                         except:
-                            dataIn[i] = self.spi.read(1, write=SX126X_CMD_NOP)[0]
+                            dataIn[i] = self.spi.read(1, write=_SX126X_CMD_NOP)[0]
 
                 if implementation.name == 'circuitpython':
                   for i in range(numBytes):
@@ -1304,6 +1755,8 @@ class SX126X:
           self.cs.value = True
           self.spi.unlock()
 
+        # only a BUSY wait that runs out counts as a stuck chip, not CMD_TIMEOUT in the status byte
+        busyStuck = False
         if waitForBusy:
             sleep_us(1)
             start = ticks_ms()
@@ -1311,21 +1764,108 @@ class SX126X:
               while self.gpio.value():
                   yield_()
                   if abs(ticks_diff(start, ticks_ms())) >= timeout:
-                      status =  SX126X_STATUS_CMD_TIMEOUT
+                      status =  _SX126X_STATUS_CMD_TIMEOUT
+                      busyStuck = True
                       break
 
             if implementation.name == 'circuitpython':
               while self.gpio.value:
                   yield_()
                   if abs(ticks_diff(start, ticks_ms())) >= timeout:
-                      status =  SX126X_STATUS_CMD_TIMEOUT
+                      status =  _SX126X_STATUS_CMD_TIMEOUT
+                      busyStuck = True
                       break
 
-        switch = {SX126X_STATUS_CMD_TIMEOUT: ERR_SPI_CMD_TIMEOUT,
-                  SX126X_STATUS_CMD_INVALID: ERR_SPI_CMD_INVALID,
-                  SX126X_STATUS_CMD_FAILED: ERR_SPI_CMD_FAILED,
-                  SX126X_STATUS_SPI_FAILED: ERR_CHIP_NOT_FOUND}
+        self._busyStuck = busyStuck
+        if busyStuck:
+            self.spiTimeouts += 1
+
+        switch = {_SX126X_STATUS_CMD_TIMEOUT: ERR_SPI_CMD_TIMEOUT,
+                  _SX126X_STATUS_CMD_INVALID: ERR_SPI_CMD_INVALID,
+                  _SX126X_STATUS_CMD_FAILED: ERR_SPI_CMD_FAILED,
+                  _SX126X_STATUS_SPI_FAILED: ERR_CHIP_NOT_FOUND}
         try:
             return switch[status]
         except:
             return ERR_NONE
+
+    def _SPItransferBlock(self, cmd, cmdLen, write, dataOut, dataIn, numBytes, waitForBusy, timeout=5000):
+        # the whole command goes out as one full duplex transfer instead of a call per byte
+        while not self.spi.try_lock():
+            yield_()
+        try:
+            if self._sharedSpi:
+                self.spi.configure(baudrate=self._baudrate, phase=0, polarity=0, bits=8)
+
+            # a sleeping chip holds BUSY until NSS falls. spidev only drives chip select inside
+            # transfer(), so without a cs pin the chip is woken with a GetStatus first
+            if self.cs is not None:
+                self.cs.value = False
+            elif self.gpio.value:
+                self.spi.transfer(bytes([SX126X_CMD_GET_STATUS, _SX126X_CMD_NOP]))
+
+            start = ticks_ms()
+            while self.gpio.value:
+                yield_()
+                if abs(ticks_diff(start, ticks_ms())) >= timeout:
+                    if self.cs is not None:
+                        self.cs.value = True
+                    return self._busyTimeout()
+
+            tx = bytearray(cmdLen + numBytes + (0 if write else 1))
+            for i in range(cmdLen):
+                tx[i] = cmd[i]
+            if write:
+                for i in range(numBytes):
+                    tx[cmdLen + i] = dataOut[i]
+
+            rx = self.spi.transfer(tx)
+            if self.cs is not None:
+                self.cs.value = True
+        finally:
+            self.spi.unlock()
+
+        # a write returns a status byte for every data byte, a read one status byte before the data
+        status = 0
+        for i in range(cmdLen, cmdLen + (numBytes if write else 1)):
+            s = rx[i]
+            if (s & 0b00001110) == _SX126X_STATUS_CMD_TIMEOUT or\
+               (s & 0b00001110) == _SX126X_STATUS_CMD_INVALID or\
+               (s & 0b00001110) == _SX126X_STATUS_CMD_FAILED:
+                status = s & 0b00001110
+                break
+            elif s == 0x00 or s == 0xFF:
+                status = _SX126X_STATUS_SPI_FAILED
+                break
+        if not write and status == 0:
+            for i in range(numBytes):
+                dataIn[i] = rx[cmdLen + 1 + i]
+
+        busyStuck = False
+        if waitForBusy:
+            sleep_us(1)
+            start = ticks_ms()
+            while self.gpio.value:
+                yield_()
+                if abs(ticks_diff(start, ticks_ms())) >= timeout:
+                    status = _SX126X_STATUS_CMD_TIMEOUT
+                    busyStuck = True
+                    break
+
+        self._busyStuck = busyStuck
+        if busyStuck:
+            self.spiTimeouts += 1
+
+        switch = {_SX126X_STATUS_CMD_TIMEOUT: ERR_SPI_CMD_TIMEOUT,
+                  _SX126X_STATUS_CMD_INVALID: ERR_SPI_CMD_INVALID,
+                  _SX126X_STATUS_CMD_FAILED: ERR_SPI_CMD_FAILED,
+                  _SX126X_STATUS_SPI_FAILED: ERR_CHIP_NOT_FOUND}
+        try:
+            return switch[status]
+        except:
+            return ERR_NONE
+
+    def _busyTimeout(self):
+        self._busyStuck = True
+        self.spiTimeouts += 1
+        return ERR_SPI_CMD_TIMEOUT
@@ -0,0 +1,205 @@
+# Linux backend for running the driver under CPython on a gateway host: SPI through
+# /dev/spidevX.Y and GPIO lines through the /dev/gpiochipN character device (v1 uAPI).
+#
+# The objects mimic the parts of busio.SPI and digitalio.DigitalInOut the driver uses,
+# plus a MicroPython style irq() for the DIO1 callback, so SX126X only needs a small
+# CPython branch. Anything already exposing that interface (e.g. a fake chip in tests)
+# can be passed in place of a pin spec or through the spi= argument.
+
+import os
+import struct
+import select
+import threading
+from ctypes import addressof, create_string_buffer
+from fcntl import ioctl
+
+
+def _IOC(direction, type_, nr, size):
+    return (direction << 30) | (size << 16) | (ord(type_) << 8) | nr
+
+
+_SPI_IOC_WR_MODE = _IOC(1, 'k', 1, 1)
+_SPI_IOC_WR_BITS_PER_WORD = _IOC(1, 'k', 3, 1)
+_SPI_IOC_WR_MAX_SPEED_HZ = _IOC(1, 'k', 4, 4)
+# struct spi_ioc_transfer: tx_buf, rx_buf, len, speed_hz, delay_usecs, bits_per_word, cs_change,
+# tx_nbits, rx_nbits, word_delay_usecs, pad
+_SPI_TRANSFER = 'QQIIHBBBBBB'
+_SPI_IOC_MESSAGE_1 = _IOC(1, 'k', 0, struct.calcsize(_SPI_TRANSFER))
+# spidev's default bufsiz, the most a single message may carry
+_SPI_MAX_TRANSFER = 4096
+
+_GPIOHANDLES_MAX = 64
+# struct gpiohandle_request: lineoffsets[64], flags, default_values[64], consumer_label[32], lines, fd
+_GPIO_HANDLE_REQUEST = '64II64s32sIi'
+# struct gpioevent_request: lineoffset, handleflags, eventflags, consumer_label[32], fd
+_GPIO_EVENT_REQUEST = 'III32si'
+_GPIO_GET_LINEHANDLE_IOCTL = _IOC(3, '\xB4', 0x03, struct.calcsize(_GPIO_HANDLE_REQUEST))
+_GPIO_GET_LINEEVENT_IOCTL = _IOC(3, '\xB4', 0x04, struct.calcsize(_GPIO_EVENT_REQUEST))
+_GPIOHANDLE_GET_LINE_VALUES_IOCTL = _IOC(3, '\xB4', 0x08, _GPIOHANDLES_MAX)
+_GPIOHANDLE_SET_LINE_VALUES_IOCTL = _IOC(3, '\xB4', 0x09, _GPIOHANDLES_MAX)
+_GPIOHANDLE_REQUEST_INPUT = 1 << 0
+_GPIOHANDLE_REQUEST_OUTPUT = 1 << 1
+_GPIOEVENT_REQUEST_RISING_EDGE = 1 << 0
+_GPIOEVENT_REQUEST_FALLING_EDGE = 1 << 1
+# struct gpioevent_data: u64 timestamp, u32 id, padded to 16 bytes
+_GPIO_EVENT_DATA_SIZE = 16
+
+_CONSUMER = b'sx126x'
+
+
+class SpiDev:
+
+    def __init__(self, device, baudrate=2000000, mode=0):
+        # device is a path or a (bus, chip select) pair, e.g. (0, 0) for /dev/spidev0.0
+        if isinstance(device, tuple):
+            device = '/dev/spidev%d.%d' % device
+        self.device = device
+        self._fd = os.open(device, os.O_RDWR)
+        self._lock = threading.Lock()
+        self._tx = create_string_buffer(_SPI_MAX_TRANSFER)
+        self._rx = create_string_buffer(_SPI_MAX_TRANSFER)
+        self._config = None
+        self.baudrate = baudrate
+        self.configure(baudrate, (mode >> 1) & 1, mode & 1, 8)
+
+    def try_lock(self):
+        return self._lock.acquire(False)
+
+    def unlock(self):
+        self._lock.release()
+
+    def configure(self, baudrate=2000000, polarity=0, phase=0, bits=8):
+        # only touches the device when something changed, so calling it per transaction is cheap
+        config = (baudrate, polarity, phase, bits)
+        if config == self._config:
+            return
+        ioctl(self._fd, _SPI_IOC_WR_MODE, struct.pack('B', (polarity << 1) | phase))
+        ioctl(self._fd, _SPI_IOC_WR_BITS_PER_WORD, struct.pack('B', bits))
+        ioctl(self._fd, _SPI_IOC_WR_MAX_SPEED_HZ, struct.pack('I', baudrate))
+        self.baudrate = baudrate
+        self._config = config
+
+    def transfer(self, data):
+        # one full duplex message with chip select held for its whole length
+        n = len(data)
+        self._tx[:n] = bytes(data)
+        xfer = struct.pack(_SPI_TRANSFER, addressof(self._tx), addressof(self._rx), n,
+                           self.baudrate, 0, 8, 0, 0, 0, 0, 0)
+        ioctl(self._fd, _SPI_IOC_MESSAGE_1, xfer)
+        return self._rx.raw[:n]
+
+    def deinit(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class GPIOLine:
+
+    IN = 0
+    OUT = 1
+    IRQ_RISING = _GPIOEVENT_REQUEST_RISING_EDGE
+    IRQ_FALLING = _GPIOEVENT_REQUEST_FALLING_EDGE
+
+    def __init__(self, line, mode=IN, value=False):
+        # line is an offset on /dev/gpiochip0 or a (chip, offset) pair, the chip given as
+        # a number or a path
+        chip = 0
+        if isinstance(line, tuple):
+            chip, line = line
+        if not isinstance(chip, str):
+            chip = '/dev/gpiochip%d' % chip
+        self.chip = chip
+        self.line = line
+        self.mode = mode
+        self._chipFd = os.open(chip, os.O_RDWR)
+        self._fd = -1
+        self._request(mode, value)
+        self._thread = None
+        self._stop = None
+
+    def _request(self, mode, value=False):
+        self._close()
+        offsets = [self.line] + [0] * (_GPIOHANDLES_MAX - 1)
+        flags = _GPIOHANDLE_REQUEST_OUTPUT if mode == GPIOLine.OUT else _GPIOHANDLE_REQUEST_INPUT
+        defaults = bytes([1 if value else 0]) + bytes(_GPIOHANDLES_MAX - 1)
+        req = bytearray(struct.pack(_GPIO_HANDLE_REQUEST, *offsets, flags, defaults, _CONSUMER, 1, 0))
+        ioctl(self._chipFd, _GPIO_GET_LINEHANDLE_IOCTL, req)
+        self._fd = struct.unpack(_GPIO_HANDLE_REQUEST, req)[-1]
+        self.mode = mode
+
+    def _requestEvents(self, trigger):
+        self._close()
+        req = bytearray(struct.pack(_GPIO_EVENT_REQUEST, self.line, _GPIOHANDLE_REQUEST_INPUT,
+                                    trigger, _CONSUMER, 0))
+        ioctl(self._chipFd, _GPIO_GET_LINEEVENT_IOCTL, req)
+        self._fd = struct.unpack(_GPIO_EVENT_REQUEST, req)[-1]
+        self.mode = GPIOLine.IN
+
+    def _close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    @property
+    def value(self):
+        data = bytearray(_GPIOHANDLES_MAX)
+        ioctl(self._fd, _GPIOHANDLE_GET_LINE_VALUES_IOCTL, data)
+        return bool(data[0])
+
+    @value.setter
+    def value(self, value):
+        data = bytearray(_GPIOHANDLES_MAX)
+        data[0] = 1 if value else 0
+        ioctl(self._fd, _GPIOHANDLE_SET_LINE_VALUES_IOCTL, data)
+
+    def switch_to_input(self):
+        self._stopEvents()
+        self._request(GPIOLine.IN)
+
+    def switch_to_output(self, value=False):
+        self._stopEvents()
+        self._request(GPIOLine.OUT, value)
+
+    def irq(self, trigger=IRQ_RISING, handler=None):
+        # edge events are waited for with poll() on a thread; handler(line) runs on that thread
+        self._stopEvents()
+        if handler is None:
+            self._request(GPIOLine.IN)
+            return
+        self._requestEvents(trigger)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._events, args=(handler, self._fd, self._stop))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _events(self, handler, fd, stop):
+        poller = select.poll()
+        poller.register(fd, select.POLLIN | select.POLLPRI)
+        while not stop.is_set():
+            if not poller.poll(100):
+                continue
+            try:
+                os.read(fd, _GPIO_EVENT_DATA_SIZE)
+            except OSError:
+                return
+            if not stop.is_set():
+                handler(self)
+
+    def _stopEvents(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def deinit(self):
+        self._stopEvents()
+        self._close()
+        os.close(self._chipFd)
+
+
+def line(spec, mode=GPIOLine.IN, value=False):
+    # pin objects (anything with a value attribute) pass straight through
+    if spec is None or hasattr(spec, 'value'):
+        return spec
+    return GPIOLine(spec, mode, value)
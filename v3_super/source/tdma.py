@@ -0,0 +1,282 @@
+from _sx126x import *
+from sx126x import sleep_ms, ticks_ms, ticks_us, ticks_diff, ticks_add
+from random import randint
+
+_BEACON_MAGIC = const(0x7D)
+_JOIN_MAGIC = const(0x7E)
+# magic, coordinator, superframe seq (2), slots (2), slot length ms (2), slot 0 offset ms (2),
+# then optionally a count and that many slot assignments: address, slot (2)
+BEACON_LENGTH = const(10)
+_MAX_ASSIGNMENTS = const(4)
+_MAX_BEACON_LENGTH = const(23)
+# magic, address; sent in slot 0, which is shared, to ask the coordinator for a slot
+JOIN_LENGTH = const(2)
+_SEQ_MASK = const(0xFFFF)
+# wake up this long before a slot or beacon to leave room for radio wake-up and SPI traffic
+_WAKE_EARLY_US = const(5000)
+
+
+def _wait(target):
+    # sleep most of the way, then spin on ticks_us for the last few milliseconds
+    remaining = ticks_diff(target, ticks_us())
+    if remaining > 3000:
+        sleep_ms((remaining - 2000) // 1000)
+    while ticks_diff(target, ticks_us()) > 0:
+        pass
+
+
+class TDMACoordinator:
+
+    def __init__(self, radio, address, slots, payloadLength=32, guard_ms=20):
+        # slot 0 is the shared join slot, slots 1 .. slots-1 are handed out by assign(), either
+        # up front or when a node's join request comes in; the next beacon announces it
+        self.radio = radio
+        self.address = address
+        self.slots = slots
+        # a slot is the airtime of the largest payload plus guard time for clock error and turnaround
+        self.slotLen_ms = radio.getTimeOnAir(payloadLength) // 1000 + 1 + guard_ms
+        self.offset_ms = radio.getTimeOnAir(_MAX_BEACON_LENGTH) // 1000 + 1 + guard_ms
+        self.superframe_ms = self.offset_ms + slots * self.slotLen_ms
+        self.seq = 0
+        self._beacon = bytearray(_MAX_BEACON_LENGTH)
+        self._beacon_mv = memoryview(self._beacon)
+        self.beaconsSent = 0
+
+        self.assigned = {}
+        self._owner = [-1] * slots
+        self._announce = []
+
+    def assign(self, address, slot=-1):
+        # returns the node's slot, the one it already has or the lowest free one; -1 when full
+        current = self.assigned.get(address)
+        if current is not None and slot < 0:
+            slot = current
+        else:
+            if slot < 0:
+                for i in range(1, self.slots):
+                    if self._owner[i] < 0:
+                        slot = i
+                        break
+                else:
+                    return -1
+            elif slot == 0 or slot >= self.slots or self._owner[slot] not in (-1, address):
+                return -1
+            if current is not None:
+                self._owner[current] = -1
+            self._owner[slot] = address
+            self.assigned[address] = slot
+        if address not in self._announce:
+            self._announce.append(address)
+        return slot
+
+    def release(self, address):
+        slot = self.assigned.pop(address, None)
+        if slot is not None:
+            self._owner[slot] = -1
+
+    def beacon(self):
+        b = self._beacon
+        b[0] = _BEACON_MAGIC
+        b[1] = self.address
+        b[2] = (self.seq >> 8) & 0xFF
+        b[3] = self.seq & 0xFF
+        b[4] = (self.slots >> 8) & 0xFF
+        b[5] = self.slots & 0xFF
+        b[6] = (self.slotLen_ms >> 8) & 0xFF
+        b[7] = self.slotLen_ms & 0xFF
+        b[8] = (self.offset_ms >> 8) & 0xFF
+        b[9] = self.offset_ms & 0xFF
+        n = BEACON_LENGTH
+        count = min(len(self._announce), _MAX_ASSIGNMENTS)
+        if count:
+            b[n] = count
+            n += 1
+            for address in self._announce[:count]:
+                slot = self.assigned.get(address, 0)
+                b[n] = address
+                b[n + 1] = (slot >> 8) & 0xFF
+                b[n + 2] = slot & 0xFF
+                n += 3
+        _, state = self.radio.send(self._beacon_mv[:n])
+        if state == ERR_NONE:
+            self.beaconsSent += 1
+            del self._announce[:count]
+        return self.radio.getTxStartTime(n), state
+
+    def run(self, handler, superframes=0):
+        # beacons then listens through the slots, calling handler(slot, data) for every packet
+        count = 0
+        while superframes == 0 or count < superframes:
+            start, state = self.beacon()
+            if state != ERR_NONE:
+                return state
+            end = ticks_add(start, self.superframe_ms * 1000)
+            while True:
+                remaining = ticks_diff(end, ticks_us()) // 1000
+                if remaining <= 1:
+                    break
+                data, state = self.radio.recv(timeout_en=True, timeout_ms=remaining)
+                if state != ERR_NONE or len(data) == 0:
+                    continue
+                rxStart = ticks_add(self.radio.getRxTimestamp(), -self.radio.getTimeOnAir(len(data)))
+                slot = (ticks_diff(rxStart, start) // 1000 - self.offset_ms) // self.slotLen_ms
+                if slot == 0 and len(data) == JOIN_LENGTH and data[0] == _JOIN_MAGIC:
+                    self.assign(data[1])
+                elif 0 <= slot < self.slots:
+                    handler(slot, data)
+            _wait(end)
+            self.seq = (self.seq + 1) & _SEQ_MASK
+            count += 1
+        return ERR_NONE
+
+
+class TDMANode:
+
+    def __init__(self, radio, address, slot=-1, resyncEvery=1):
+        # slot: fixed slot, or -1 to claim one from the coordinator with join()
+        self.radio = radio
+        self.address = address
+        self.slot = slot
+        self.resyncEvery = resyncEvery
+
+        self.coordinator = -1
+        self.slots = 0
+        self.slotLen_ms = 0
+        self.offset_ms = 0
+        self.superframe_us = 0
+
+        self._anchor = 0
+        self._anchorSeq = 0
+        self._lastBeacon = 0
+        self._lastBeaconSeq = 0
+        self._period_us = 0
+        self._sinceSync = 0
+        self.synced = False
+        self.beaconsMissed = 0
+        self._join = bytearray(JOIN_LENGTH)
+
+    def sync(self, timeout_ms=0):
+        # listens for a beacon and disciplines the local clock against it
+        start = ticks_ms()
+        while True:
+            data, state = self.radio.recv(timeout_en=timeout_ms != 0, timeout_ms=timeout_ms)
+            if state != ERR_NONE:
+                return state
+            if len(data) >= BEACON_LENGTH and data[0] == _BEACON_MAGIC:
+                break
+            # other traffic does not restart the wait, listen again for what is left of it
+            if timeout_ms != 0:
+                remaining = timeout_ms - abs(ticks_diff(ticks_ms(), start))
+                if remaining <= 0:
+                    return ERR_RX_TIMEOUT
+                timeout_ms = remaining
+                start = ticks_ms()
+
+        start = ticks_add(self.radio.getRxTimestamp(), -self.radio.getTimeOnAir(len(data)))
+        seq = (data[2] << 8) | data[3]
+
+        self.coordinator = data[1]
+        self.slots = (data[4] << 8) | data[5]
+        self.slotLen_ms = (data[6] << 8) | data[7]
+        self.offset_ms = (data[8] << 8) | data[9]
+        nominal = (self.offset_ms + self.slots * self.slotLen_ms) * 1000
+        if len(data) > BEACON_LENGTH:
+            pos = BEACON_LENGTH + 1
+            for _ in range(min(data[BEACON_LENGTH], (len(data) - pos) // 3)):
+                if data[pos] == self.address:
+                    self.slot = (data[pos + 1] << 8) | data[pos + 2]
+                pos += 3
+
+        # the measured beacon period absorbs the drift between the two crystals
+        if self.synced and self.superframe_us == nominal:
+            frames = (seq - self._lastBeaconSeq) & _SEQ_MASK
+            # ticks_us wraps, so only beacons close enough together give a usable measurement
+            if frames and frames * nominal < 0x8000000:
+                measured = ticks_diff(start, self._lastBeacon) // frames
+                self._period_us += (measured - self._period_us) // 4
+        else:
+            self._period_us = nominal
+        self.superframe_us = nominal
+
+        self._anchor = start
+        self._anchorSeq = seq
+        self._lastBeacon = start
+        self._lastBeaconSeq = seq
+        self._sinceSync = 0
+        self.synced = True
+        return ERR_NONE
+
+    def join(self, attempts=8):
+        # asks for a slot in the shared slot 0 and reads the answer from the next beacon;
+        # nodes that collide back off a random number of superframes
+        if not self.synced:
+            return ERR_UNKNOWN
+        self._join[0] = _JOIN_MAGIC
+        self._join[1] = self.address
+        for attempt in range(attempts):
+            for _ in range(randint(0, attempt)):
+                self._resync()
+            if self.slot > 0:
+                return ERR_NONE
+            slotStart = self.nextSlotStart(0)
+            _wait(ticks_add(slotStart, -_WAKE_EARLY_US))
+            self.radio.standby()
+            _wait(slotStart)
+            _, state = self.radio.send(self._join)
+            if state != ERR_NONE:
+                return state
+            self._resync()
+            if self.slot > 0:
+                return ERR_NONE
+        return ERR_ACK_NOT_RECEIVED
+
+    def nextSlotStart(self, slot=-1):
+        if slot < 0:
+            slot = self.slot
+        slotStart = ticks_add(self._anchor, (self.offset_ms + slot * self.slotLen_ms) * 1000)
+        while ticks_diff(slotStart, ticks_us()) < 0:
+            slotStart = ticks_add(slotStart, self._period_us)
+            self._anchor = ticks_add(self._anchor, self._period_us)
+            self._anchorSeq = (self._anchorSeq + 1) & _SEQ_MASK
+            self._sinceSync += 1
+        return slotStart
+
+    def send(self, data):
+        if not self.synced:
+            return 0, ERR_UNKNOWN
+        if self.slot < 0:
+            state = self.join()
+            if state != ERR_NONE:
+                return 0, state
+        if self.radio.getTimeOnAir(len(data)) > self.slotLen_ms * 1000:
+            return 0, ERR_PACKET_TOO_LONG
+
+        if self._sinceSync >= self.resyncEvery:
+            state = self._resync()
+            if state != ERR_NONE:
+                return 0, state
+
+        slotStart = self.nextSlotStart()
+        self.radio.sleep()
+        _wait(ticks_add(slotStart, -_WAKE_EARLY_US))
+        self.radio.standby()
+        _wait(slotStart)
+        n, state = self.radio.send(data)
+        self.radio.sleep()
+        return n, state
+
+    def _resync(self):
+        # wake up just before the expected beacon and listen for a little more than a slot
+        beaconStart = ticks_add(self._anchor, self._period_us)
+        while ticks_diff(beaconStart, ticks_us()) < 0:
+            beaconStart = ticks_add(beaconStart, self._period_us)
+        _wait(ticks_add(beaconStart, -_WAKE_EARLY_US))
+        self.radio.standby()
+        state = self.sync(self.offset_ms + _WAKE_EARLY_US // 1000)
+        if state != ERR_NONE:
+            self.beaconsMissed += 1
+            self._anchor = beaconStart
+            self._anchorSeq = (self._anchorSeq + 1) & _SEQ_MASK
+            self._sinceSync = 0
+            self.radio.sleep()
+        return ERR_NONE
@@ -0,0 +1,178 @@
+# Compact binary telemetry codec, shared by the CircuitPython nodes and the host tools.
+#
+# A packet is one header byte (schema id in the low nibble, keyframe flag in the top bit),
+# the sending node's id, one keyframe id byte, then every field of the schema as a varint. Signed values are
+# zigzag coded. Delta fields are sent in full in keyframes and relative to the last
+# keyframe otherwise. Losing a delta packet costs only that packet, but losing a keyframe
+# makes the delta packets after it undecodable (up to keyframeEvery - 1 of them) until the
+# next keyframe arrives; the decoder counts those in missingKeyframe. Keyframes are kept
+# per node and schema, so one decoder serves every node of a network.
+#
+# Values are given in their units and converted to fixed point with the schema scale, the
+# integer part exactly; CircuitPython floats carry about 22 bits, which is not enough for
+# lat * 100000 in one multiply. encode(values, scaled=True) takes values already in fixed
+# point, e.g. straight from a GPS parser that keeps integers.
+
+_KEYFRAME = 0x80
+_SCHEMA_MASK = 0x0F
+HEADER_LENGTH = 3
+
+# field: (name, scale, signed, delta)
+GPS_SCHEMA = (
+    ('seq', 1, False, True),
+    ('time', 1, False, True),
+    ('lat', 100000, True, True),
+    ('lon', 100000, True, True),
+    ('alt', 10, True, False),
+    ('sats', 1, False, False),
+)
+
+SENSOR_SCHEMA = (
+    ('seq', 1, False, True),
+    ('time', 1, False, True),
+    ('temp', 100, True, False),
+    ('humidity', 10, False, False),
+    ('battery', 1000, False, False),
+)
+
+SCHEMAS = {0: GPS_SCHEMA, 1: SENSOR_SCHEMA}
+
+
+def zigzag(n):
+    return -2 * n - 1 if n < 0 else 2 * n
+
+
+def unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def fixedPoint(value, scale):
+    # scale the integer part exactly and only the fraction in floating point
+    if scale == 1 or isinstance(value, int):
+        return int(value) * scale
+    whole = int(value)
+    return whole * scale + int(round((value - whole) * scale))
+
+
+def putVarint(buf, pos, n):
+    while n >= 0x80:
+        buf[pos] = (n & 0x7F) | 0x80
+        n >>= 7
+        pos += 1
+    buf[pos] = n
+    return pos + 1
+
+
+def getVarint(buf, pos):
+    n = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return n, pos
+        shift += 7
+
+
+class Encoder:
+
+    def __init__(self, schema, schemaId, keyframeEvery=16, node=0):
+        self.schema = schema
+        self.schemaId = schemaId
+        self.node = node & 0xFF
+        self.keyframeEvery = keyframeEvery
+        self._key = [0] * len(schema)
+        self._keyId = 0
+        self._count = 0
+        self._buf = bytearray(HEADER_LENGTH + 10 * len(schema))
+
+    def encode(self, values, scaled=False):
+        # returns a memoryview into an internal buffer, valid until the next encode()
+        n = self.encodeInto(values, self._buf, scaled)
+        return memoryview(self._buf)[:n]
+
+    def encodeInto(self, values, buf, scaled=False):
+        keyframe = self._count % self.keyframeEvery == 0
+        self._count += 1
+        if keyframe:
+            self._keyId = (self._keyId + 1) & 0xFF
+
+        buf[0] = self.schemaId | (_KEYFRAME if keyframe else 0)
+        buf[1] = self.node
+        buf[2] = self._keyId
+        pos = HEADER_LENGTH
+        for i in range(len(self.schema)):
+            _, scale, signed, delta = self.schema[i]
+            v = int(values[i]) if scaled else fixedPoint(values[i], scale)
+            if delta:
+                if keyframe:
+                    self._key[i] = v
+                else:
+                    v -= self._key[i]
+                    signed = True
+            pos = putVarint(buf, pos, zigzag(v) if signed else v)
+        return pos
+
+
+class Decoder:
+
+    def __init__(self, schemas=SCHEMAS):
+        self.schemas = schemas
+        self._keys = {}
+        self._keyIds = {}
+        self.missingKeyframe = 0
+        self.malformed = 0
+
+    def decode(self, data):
+        # returns (node, schema id, values), or None when the packet is truncated, of an
+        # unknown schema, or its keyframe was not received
+        if len(data) < HEADER_LENGTH:
+            self.malformed += 1
+            return None
+        schemaId = data[0] & _SCHEMA_MASK
+        schema = self.schemas.get(schemaId)
+        if schema is None:
+            self.malformed += 1
+            return None
+        # every field ends in a byte without the continuation bit
+        ends = 0
+        for i in range(HEADER_LENGTH, len(data)):
+            if not data[i] & 0x80:
+                ends += 1
+        if ends < len(schema):
+            self.malformed += 1
+            return None
+        keyframe = data[0] & _KEYFRAME
+        node = data[1]
+        keyId = data[2]
+        stream = (node, schemaId)
+
+        if keyframe:
+            key = [0] * len(schema)
+        else:
+            key = self._keys.get(stream)
+            if key is None or self._keyIds[stream] != keyId:
+                self.missingKeyframe += 1
+                return None
+
+        values = []
+        pos = HEADER_LENGTH
+        for i in range(len(schema)):
+            _, scale, signed, delta = schema[i]
+            v, pos = getVarint(data, pos)
+            if delta and not keyframe:
+                v = key[i] + unzigzag(v)
+            elif signed:
+                v = unzigzag(v)
+            if delta and keyframe:
+                key[i] = v
+            values.append(v / scale if scale != 1 else v)
+
+        if keyframe:
+            self._keys[stream] = key
+            self._keyIds[stream] = keyId
+        return node, schemaId, tuple(values)
+
+    def fields(self, schemaId):
+        return tuple(f[0] for f in self.schemas[schemaId])
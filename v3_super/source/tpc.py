@@ -0,0 +1,93 @@
+from _sx126x import *
+from adr import SNR_FLOOR
+from math import ceil
+
+_TPC_MAGIC = const(0x7C)
+# magic, src, dst, SNR of the last packet heard from dst in quarter dB
+TPC_REPORT_LENGTH = const(4)
+
+
+class TPC:
+
+    def __init__(self, radio, address, power=22, margin=6.0, minPower=-9, maxPower=22,
+                 stepDown=1, stepUp=3, lossLimit=2):
+        # per peer transmit power, walked down while the peer reports SNR above the demodulator
+        # floor plus margin, and back up on low reports or lost packets
+        self.radio = radio
+        self.address = address
+        self.initialPower = power
+        self.margin = margin
+        self.minPower = minPower
+        self.maxPower = maxPower
+        self.stepDown = stepDown
+        self.stepUp = stepUp
+        self.lossLimit = lossLimit
+
+        self._power = {}
+        self._losses = {}
+        self._report = bytearray(TPC_REPORT_LENGTH)
+
+        self.powerChanges = 0
+
+    def powerFor(self, dst):
+        return self._power.get(dst, self.initialPower)
+
+    def apply(self, dst):
+        # sets the radio up for a packet to dst; only a single SetTxParams when the power changes
+        power = self.powerFor(dst)
+        if power == self.radio._power and self.radio._paConfigured:
+            return ERR_NONE
+        state = self.radio.setOutputPower(power)
+        if state == ERR_NONE:
+            self.powerChanges += 1
+        return state
+
+    def send(self, data, dst):
+        state = self.apply(dst)
+        if state != ERR_NONE:
+            return 0, state
+        return self.radio.send(data)
+
+    def feedback(self, dst, snr):
+        # snr is what dst measured on our last packet
+        self._losses[dst] = 0
+        surplus = snr - SNR_FLOOR[self.radio._sf - 5] - self.margin
+        power = self.powerFor(dst)
+        if surplus >= self.stepDown:
+            # one step at a time, so the margin is still there after the change
+            power -= self.stepDown
+        elif surplus < 0:
+            power += int(ceil(-surplus))
+        self._power[dst] = min(max(power, self.minPower), self.maxPower)
+
+    def delivered(self, dst):
+        self._losses[dst] = 0
+
+    def lost(self, dst):
+        losses = self._losses.get(dst, 0) + 1
+        if losses >= self.lossLimit:
+            self._power[dst] = min(self.powerFor(dst) + self.stepUp, self.maxPower)
+            losses = 0
+        self._losses[dst] = losses
+
+    def report(self, dst, snr=None):
+        # tells dst how well its last packet was heard
+        if snr is None:
+            snr = self.radio.getSNR()
+        r = self._report
+        r[0] = _TPC_MAGIC
+        r[1] = self.address
+        r[2] = dst
+        r[3] = int(snr * 4) & 0xFF
+        _, state = self.radio.send(r)
+        return state
+
+    def handle(self, frame):
+        # returns True if frame was an SNR report, which is then fed back
+        if len(frame) != TPC_REPORT_LENGTH or frame[0] != _TPC_MAGIC or frame[2] != self.address:
+            return False
+        q = frame[3]
+        if q & 0x80:
+            q -= 0x100
+        self.feedback(frame[1], q / 4.0)
+        return True
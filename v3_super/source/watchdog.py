@@ -0,0 +1,154 @@
+from _sx126x import *
+from sx126x import ticks_ms, ticks_diff, sleep_ms
+
+# device errors that mean the chip is not working, as opposed to a calibration warning
+FATAL_ERRORS = SX126X_PA_RAMP_ERR | SX126X_PLL_LOCK_ERR | SX126X_XOSC_START_ERR
+
+CAUSE_BUSY = 'busy'
+CAUSE_STATUS = 'status'
+CAUSE_DEVICE_ERRORS = 'device errors'
+CAUSE_SPI_TIMEOUTS = 'spi timeouts'
+
+
+class Watchdog:
+
+    def __init__(self, radio, interval_ms=10000, busyTimeout_ms=50, timeoutLimit=2, fatalErrors=FATAL_ERRORS):
+        # poll() from the main loop; a failed check resets the chip and replays the last
+        # begin() with what the driver has been changed to since: the LoRa or GFSK modulation
+        # and packet settings, power and frequency. Register settings the driver keeps no copy
+        # of (sync word, CRC polynomial, node address) come back as given to begin()
+        self.radio = radio
+        self.interval_ms = interval_ms
+        self.busyTimeout_ms = busyTimeout_ms
+        self.timeoutLimit = timeoutLimit
+        self.fatalErrors = fatalErrors
+
+        self._errors = bytearray(2)
+        self._errors_mv = memoryview(self._errors)
+        self._lastCheck = ticks_ms()
+        self._spiTimeouts = radio.spiTimeouts
+
+        self.checks = 0
+        self.recoveries = 0
+        self.failedRecoveries = 0
+        self.lastCause = None
+        self.lastErrors = 0
+        self.lastRecovery_ms = 0
+        self.totalRecovery_ms = 0
+
+    def poll(self):
+        # returns the cause of a recovery, None when the radio was healthy or not due a check
+        if abs(ticks_diff(ticks_ms(), self._lastCheck)) < self.interval_ms:
+            return None
+        cause = self.check()
+        if cause is not None:
+            self.recover(cause)
+        self._lastCheck = ticks_ms()
+        return cause
+
+    def _busy(self):
+        if implementation.name == 'micropython':
+            return self.radio.gpio.value()
+        return self.radio.gpio.value
+
+    def check(self):
+        self.checks += 1
+
+        # BUSY is sampled directly first, a stuck line would make every command below time out
+        start = ticks_ms()
+        while self._busy():
+            if abs(ticks_diff(ticks_ms(), start)) >= self.busyTimeout_ms:
+                return CAUSE_BUSY
+            sleep_ms(1)
+
+        timeouts = self.radio.spiTimeouts - self._spiTimeouts
+        self._spiTimeouts = self.radio.spiTimeouts
+        if timeouts >= self.timeoutLimit:
+            return CAUSE_SPI_TIMEOUTS
+
+        # one read gives both the status byte, checked by SPItransfer, and the device errors
+        state = self.radio.SPIreadCommand([SX126X_CMD_GET_DEVICE_ERRORS], 1, self._errors_mv, 2)
+        if state == ERR_SPI_CMD_TIMEOUT:
+            return CAUSE_BUSY
+        if state != ERR_NONE:
+            return CAUSE_STATUS
+
+        errors = (self._errors[0] << 8) | self._errors[1]
+        if errors:
+            self.lastErrors = errors
+            self.radio.clearDeviceErrors()
+            if errors & self.fatalErrors:
+                return CAUSE_DEVICE_ERRORS
+        return None
+
+    def recover(self, cause=None):
+        radio = self.radio
+        start = ticks_ms()
+        self.lastCause = cause
+        try:
+            state = self._replay()
+        except AssertionError as e:
+            state = errorCode(e)
+        self.lastRecovery_ms = abs(ticks_diff(ticks_ms(), start))
+        self.totalRecovery_ms += self.lastRecovery_ms
+        self._spiTimeouts = radio.spiTimeouts
+        if state == ERR_NONE:
+            self.recoveries += 1
+        else:
+            self.failedRecoveries += 1
+        return state
+
+    def _replay(self):
+        radio = self.radio
+        if radio._beginArgs is None:
+            return radio.reset()
+
+        # shadow state, read before begin() overwrites it
+        method, args = radio._beginArgs
+        args = dict(args)
+        frf = radio._frf
+        blocking = radio.blocking
+        callback = radio._callbackFunction
+        args['power'] = radio._power
+        args['blocking'] = True
+        if method == 'begin':
+            args['bw'] = radio._bwKhz
+            args['sf'] = radio._sf
+            args['cr'] = radio._cr + 4
+            args['preambleLength'] = radio._preambleLength
+            args['implicit'] = radio._headerType == SX126X_LORA_HEADER_IMPLICIT
+            args['implicitLen'] = radio._implicitLen
+            args['crcOn'] = radio._crcType == SX126X_LORA_CRC_ON
+        else:
+            # GFSK modulation settings are only kept raw, so they are written back after
+            # beginFSK() instead of going through its arguments
+            args['preambleLength'] = radio._preambleLengthFSK
+            modulation = (radio._br, radio._pulseShape, radio._rxBw, radio._freqDev)
+            rxBwKhz = radio._rxBwKhz
+            packet = (radio._preambleLengthFSK, radio._crcTypeFSK, radio._syncWordLength, radio._addrComp,
+                      radio._whitening, radio._packetType, radio._packetLength, radio._preambleDetectorLength)
+
+        state = radio.reset()
+        if state != ERR_NONE:
+            return state
+        state = getattr(radio, method)(**args)
+        ASSERT(state)
+
+        if method == 'beginFSK':
+            radio._br, radio._pulseShape, radio._rxBw, radio._freqDev = modulation
+            radio._rxBwKhz = rxBwKhz
+            state = radio.setModulationParamsFSK(*modulation)
+            ASSERT(state)
+            (radio._preambleLengthFSK, radio._crcTypeFSK, radio._syncWordLength, radio._addrComp,
+             radio._whitening, radio._packetType, radio._packetLength, radio._preambleDetectorLength) = packet
+            state = radio.setPacketParamsFSK(*packet)
+            ASSERT(state)
+
+        # back on the channel last tuned to, e.g. by a hop, without another image calibration
+        if frf != radio._frf:
+            state = radio.setRfFrequency(frf)
+            ASSERT(state)
+
+        if not blocking:
+            state = radio.setBlockingCallback(False, None if callback == radio._dummyFunction else callback)
+        return state
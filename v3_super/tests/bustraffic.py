@@ -0,0 +1,76 @@
+# SPI traffic accounting for the bus regression tests. An operation is measured as the
+# transfers it makes on the FakeChip: how many, how many bytes, and the time they would take
+# on a board. Baselines are checked in as baselines/bus_traffic.json; an operation that
+# needs more transactions or bytes than its baseline fails, anything less is an improvement
+# to record with pytest --update-baselines.
+import json
+import os
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'bus_traffic.json')
+
+# modeled wall time: the bytes at the SPI clock the boards run (2 MHz), plus a fixed cost
+# per transaction for chip select, the BUSY wait and the CircuitPython call overhead
+BAUDRATE = 2000000
+TRANSACTION_US = 40
+
+
+def modeledUs(transactions, nbytes):
+    return transactions * TRANSACTION_US + nbytes * 8 * 1000000 // BAUDRATE
+
+
+def loadBaseline(path=BASELINE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def saveBaseline(results, path=BASELINE):
+    # merged, so updating from a -k selection keeps the other operations
+    baseline = loadBaseline(path)
+    baseline.update(results)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=1, sort_keys=True)
+        f.write('\n')
+
+
+class BusRecorder:
+
+    def __init__(self, baseline, update=False):
+        self.baseline = baseline
+        self.update = update
+        self.results = {}
+
+    def measure(self, name, fn, *chips):
+        # runs fn() and accounts the transfers of every chip given, e.g. both ends of a link
+        start = [len(chip.log) for chip in chips]
+        result = fn()
+        transactions = 0
+        nbytes = 0
+        for chip, n in zip(chips, start):
+            transactions += len(chip.log) - n
+            nbytes += sum(len(tx) for tx in chip.log[n:])
+        traffic = {'transactions': transactions, 'bytes': nbytes, 'us': modeledUs(transactions, nbytes)}
+        self.results[name] = traffic
+        if not self.update:
+            self.check(name, traffic)
+        return result
+
+    def check(self, name, traffic):
+        base = self.baseline.get(name)
+        assert base is not None, '%s has no baseline, run pytest --update-baselines' % name
+        assert traffic['transactions'] <= base['transactions'] and traffic['bytes'] <= base['bytes'], \
+            '%s: %d transactions / %d bytes on the bus, baseline %d / %d' % (
+                name, traffic['transactions'], traffic['bytes'], base['transactions'], base['bytes'])
+
+    def report(self, write):
+        if not self.results:
+            return
+        write('%-28s %6s %6s %8s %8s' % ('operation', 'tx', 'bytes', 'us', 'change'))
+        for name in sorted(self.results):
+            r = self.results[name]
+            base = self.baseline.get(name)
+            change = '-' if base is None else '%+d' % (r['bytes'] - base['bytes'])
+            write('%-28s %6d %6d %8d %8s' % (name, r['transactions'], r['bytes'], r['us'], change))
@@ -0,0 +1,30 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from bustraffic import BusRecorder, loadBaseline, saveBaseline
+
+
+def pytest_addoption(parser):
+    parser.addoption('--update-baselines', action='store_true',
+                     help='record the measured SPI traffic as the new bus_traffic.json baselines')
+
+
+@pytest.fixture(scope='session')
+def bus(request):
+    recorder = BusRecorder(loadBaseline(), request.config.getoption('--update-baselines'))
+    request.config._busRecorder = recorder
+    yield recorder
+    if recorder.update:
+        saveBaseline(recorder.results)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    recorder = getattr(config, '_busRecorder', None)
+    if recorder is not None and recorder.results:
+        terminalreporter.section('SPI bus traffic')
+        recorder.report(terminalreporter.write_line)
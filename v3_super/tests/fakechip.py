@@ -0,0 +1,264 @@
+# A register-level SX1262 stand-in for host tests. It speaks the SPI command set the driver
+# uses, keeps the registers, data buffer and IRQ state, and passes transmitted packets to
+# the other chips on the same Air. Every transfer is logged, so tests can check SPI traffic.
+
+SX126X_CMD_SET_SLEEP = 0x84
+SX126X_CMD_SET_STANDBY = 0x80
+SX126X_CMD_SET_TX = 0x83
+SX126X_CMD_SET_RX = 0x82
+SX126X_CMD_SET_RX_DUTY_CYCLE = 0x94
+SX126X_CMD_WRITE_REGISTER = 0x0D
+SX126X_CMD_READ_REGISTER = 0x1D
+SX126X_CMD_WRITE_BUFFER = 0x0E
+SX126X_CMD_READ_BUFFER = 0x1E
+SX126X_CMD_SET_DIO_IRQ_PARAMS = 0x08
+SX126X_CMD_GET_IRQ_STATUS = 0x12
+SX126X_CMD_CLEAR_IRQ_STATUS = 0x02
+SX126X_CMD_SET_RF_FREQUENCY = 0x86
+SX126X_CMD_SET_PACKET_TYPE = 0x8A
+SX126X_CMD_GET_PACKET_TYPE = 0x11
+SX126X_CMD_SET_PACKET_PARAMS = 0x8C
+SX126X_CMD_SET_MODULATION_PARAMS = 0x8B
+SX126X_CMD_SET_BUFFER_BASE_ADDRESS = 0x8F
+SX126X_CMD_GET_STATUS = 0xC0
+SX126X_CMD_GET_RSSI_INST = 0x15
+SX126X_CMD_GET_RX_BUFFER_STATUS = 0x13
+SX126X_CMD_GET_PACKET_STATUS = 0x14
+SX126X_CMD_GET_DEVICE_ERRORS = 0x17
+SX126X_CMD_CLEAR_DEVICE_ERRORS = 0x07
+SX126X_CMD_GET_STATS = 0x10
+
+IRQ_TX_DONE = 0x0001
+IRQ_RX_DONE = 0x0002
+
+PACKET_TYPE_GFSK = 0x00
+PACKET_TYPE_LORA = 0x01
+
+# opcode: parameter bytes before the status byte, for the commands that read data back
+_READS = {
+    SX126X_CMD_READ_REGISTER: 2,
+    SX126X_CMD_READ_BUFFER: 1,
+    SX126X_CMD_GET_IRQ_STATUS: 0,
+    SX126X_CMD_GET_PACKET_TYPE: 0,
+    SX126X_CMD_GET_STATUS: 0,
+    SX126X_CMD_GET_RSSI_INST: 0,
+    SX126X_CMD_GET_RX_BUFFER_STATUS: 0,
+    SX126X_CMD_GET_PACKET_STATUS: 0,
+    SX126X_CMD_GET_DEVICE_ERRORS: 0,
+    SX126X_CMD_GET_STATS: 0,
+}
+
+# chip mode STBY_RC, command status "data available"
+_STATUS = 0x24
+
+
+class FakePin:
+
+    def __init__(self, value=False):
+        self.value = value
+
+    def switch_to_input(self):
+        pass
+
+    def switch_to_output(self, value=False):
+        self.value = value
+
+
+class FakeIrqPin:
+
+    IRQ_RISING = 1
+
+    def __init__(self, chip):
+        self.chip = chip
+        self.handler = None
+
+    @property
+    def value(self):
+        return bool(self.chip.irq & self.chip.dio1Mask)
+
+    def switch_to_input(self):
+        self.handler = None
+
+    def irq(self, trigger=IRQ_RISING, handler=None):
+        self.handler = handler
+
+
+class Air:
+
+    def __init__(self):
+        self.chips = []
+
+    def attach(self, chip):
+        self.chips.append(chip)
+
+    def transmit(self, sender, packet):
+        for chip in self.chips:
+            if chip is not sender and chip.frf == sender.frf:
+                chip.inbox.append(packet)
+                chip._deliver()
+
+
+class FakeChip:
+
+    def __init__(self, air=None, rssi=-60.0, snr=10.0):
+        self.regs = bytearray(0x10000)
+        self.buffer = bytearray(256)
+        self.irq = 0
+        self.irqMask = 0
+        self.dio1Mask = 0
+        self.packetType = PACKET_TYPE_GFSK
+        self.packetParams = b''
+        self.txBase = 0
+        self.rxBase = 0
+        self.rxLength = 0
+        self.frf = 0
+        self.mode = 'STBY'
+        self.inbox = []
+        self.sent = []
+        self.rssi = rssi
+        self.snr = snr
+        self.errors = 0
+
+        self.log = []
+        self.locked = False
+        self._edge = False
+
+        self.busy = FakePin(False)
+        self.rst = FakePin(True)
+        self.irqPin = FakeIrqPin(self)
+        if air is not None:
+            air.attach(self)
+        self.air = air
+
+    # busio.SPI / SpiDev interface
+
+    def try_lock(self):
+        if self.locked:
+            return False
+        self.locked = True
+        return True
+
+    def unlock(self):
+        self.locked = False
+        self._fire()
+
+    def configure(self, baudrate=2000000, polarity=0, phase=0, bits=8):
+        pass
+
+    def transfer(self, tx):
+        tx = bytes(tx)
+        self.log.append(tx)
+        if self.mode == 'SLEEP':
+            # the NSS edge only wakes the chip, the command itself is lost
+            self.mode = 'STBY'
+            self.busy.value = False
+            return bytes(len(tx))
+        op = tx[0]
+        rx = bytearray([_STATUS] * len(tx))
+        if op in _READS:
+            start = 1 + _READS[op] + 1
+            data = self._read(op, tx, len(tx) - start)
+            rx[start:start + len(data)] = data
+        else:
+            self._write(op, tx[1:])
+        return bytes(rx)
+
+    def _read(self, op, tx, n):
+        if op == SX126X_CMD_READ_REGISTER:
+            addr = (tx[1] << 8) | tx[2]
+            return self.regs[addr:addr + n]
+        if op == SX126X_CMD_READ_BUFFER:
+            offset = tx[1]
+            return bytes(self.buffer[(offset + i) & 0xFF] for i in range(n))
+        if op == SX126X_CMD_GET_IRQ_STATUS:
+            return bytes([(self.irq >> 8) & 0xFF, self.irq & 0xFF])
+        if op == SX126X_CMD_GET_PACKET_TYPE:
+            return bytes([self.packetType])
+        if op == SX126X_CMD_GET_RX_BUFFER_STATUS:
+            return bytes([self.rxLength, self.rxBase])
+        if op == SX126X_CMD_GET_PACKET_STATUS:
+            rssi = int(-self.rssi * 2) & 0xFF
+            return bytes([rssi, int(self.snr * 4) & 0xFF, rssi])
+        if op == SX126X_CMD_GET_RSSI_INST:
+            return bytes([int(-self.rssi * 2) & 0xFF])
+        if op == SX126X_CMD_GET_DEVICE_ERRORS:
+            return bytes([(self.errors >> 8) & 0xFF, self.errors & 0xFF])
+        return bytes(n)
+
+    def _write(self, op, data):
+        if op == SX126X_CMD_WRITE_REGISTER:
+            addr = (data[0] << 8) | data[1]
+            self.regs[addr:addr + len(data) - 2] = data[2:]
+        elif op == SX126X_CMD_WRITE_BUFFER:
+            for i in range(1, len(data)):
+                self.buffer[(data[0] + i - 1) & 0xFF] = data[i]
+        elif op == SX126X_CMD_SET_PACKET_TYPE:
+            self.packetType = data[0]
+        elif op == SX126X_CMD_SET_PACKET_PARAMS:
+            self.packetParams = bytes(data)
+        elif op == SX126X_CMD_SET_BUFFER_BASE_ADDRESS:
+            self.txBase, self.rxBase = data[0], data[1]
+        elif op == SX126X_CMD_SET_RF_FREQUENCY:
+            self.frf = (data[0] << 24) | (data[1] << 16) | (data[2] << 8) | data[3]
+        elif op == SX126X_CMD_SET_DIO_IRQ_PARAMS:
+            self.irqMask = (data[0] << 8) | data[1]
+            self.dio1Mask = (data[2] << 8) | data[3]
+        elif op == SX126X_CMD_CLEAR_IRQ_STATUS:
+            self.irq &= ~((data[0] << 8) | data[1])
+        elif op == SX126X_CMD_CLEAR_DEVICE_ERRORS:
+            self.errors = 0
+        elif op == SX126X_CMD_SET_STANDBY:
+            self.mode = 'STBY'
+        elif op == SX126X_CMD_SET_SLEEP:
+            # BUSY stays high until the next NSS falling edge
+            self.mode = 'SLEEP'
+            self.busy.value = True
+        elif op == SX126X_CMD_SET_TX:
+            self._transmit()
+        elif op == SX126X_CMD_SET_RX or op == SX126X_CMD_SET_RX_DUTY_CYCLE:
+            self.mode = 'RX'
+            self._deliver()
+
+    def _payloadLength(self):
+        if self.packetType == PACKET_TYPE_LORA:
+            return self.packetParams[3]
+        return self.packetParams[6]
+
+    def _transmit(self):
+        n = self._payloadLength()
+        packet = bytes(self.buffer[(self.txBase + i) & 0xFF] for i in range(n))
+        self.sent.append(packet)
+        self.mode = 'STBY'
+        self._raise(IRQ_TX_DONE)
+        if self.air is not None:
+            self.air.transmit(self, packet)
+
+    def _deliver(self):
+        if self.mode != 'RX' or not self.inbox:
+            return
+        packet = self.inbox.pop(0)
+        for i in range(len(packet)):
+            self.buffer[(self.rxBase + i) & 0xFF] = packet[i]
+        self.rxLength = len(packet)
+        self.mode = 'STBY'
+        self._raise(IRQ_RX_DONE)
+
+    def _raise(self, flags):
+        before = self.irqPin.value
+        self.irq |= flags & self.irqMask
+        if self.irqPin.value and not before:
+            self._edge = True
+            if not self.locked:
+                self._fire()
+
+    def _fire(self):
+        # like a real DIO1 interrupt, the handler only runs once the bus is free again
+        if self._edge and self.irqPin.handler is not None:
+            self._edge = False
+            self.irqPin.handler(self.irqPin)
+        self._edge = False
+
+    def radio(self, cls, **kwargs):
+        # a driver instance wired to this chip
+        return cls(spi_bus=None, clk=None, mosi=None, miso=None, cs=None,
+                   irq=self.irqPin, rst=self.rst, gpio=self.busy, spi=self, **kwargs)
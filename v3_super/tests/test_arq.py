@@ -0,0 +1,86 @@
+from _sx126x import ERR_NONE, ERR_ACK_NOT_RECEIVED
+from sx1262 import SX1262
+from arq import ARQ
+from fakechip import Air, FakeChip
+
+
+def _link():
+    # the receiver answers from its DIO1 callback, so one thread runs both ends
+    air = Air()
+    a = FakeChip(air)
+    b = FakeChip(air)
+    ra = a.radio(SX1262)
+    rb = b.radio(SX1262)
+    for r in (ra, rb):
+        assert r.begin(freq=915.0, bw=500.0, sf=7, power=0) == ERR_NONE
+    receiver = ARQ(rb, 2)
+    delivered = []
+
+    def onIrq(events):
+        if events & SX1262.RX_DONE:
+            msg, state = receiver.recv()
+            while msg is not None:
+                delivered.append(msg)
+                msg, state = receiver.recv()
+
+    rb.setBlockingCallback(False, onIrq)
+    return a, ra, receiver, delivered
+
+
+def test_delivers_in_order():
+    a, ra, receiver, delivered = _link()
+    sender = ARQ(ra, 1, window=4)
+    data = bytes(range(256)) * 4
+    assert sender.send(2, data) == ERR_NONE
+    assert b''.join(payload for _, payload in delivered) == data
+    assert sender.retransmissions == 0
+
+
+def test_rebooted_sender_is_not_acknowledged_from_old_state():
+    a, ra, receiver, delivered = _link()
+    first = ARQ(ra, 1, window=4)
+    assert first.send(2, bytes(600)) == ERR_NONE
+    n = len(delivered)
+    # the sender reboots; whatever seq it picks, the receiver must deliver the new message
+    for _ in range(20):
+        rebooted = ARQ(ra, 1, window=4)
+        assert rebooted.send(2, b'after reboot') == ERR_NONE
+        assert delivered[-1] == (1, b'after reboot')
+        n += 1
+        assert len(delivered) == n
+
+
+def test_stale_ack_does_not_complete_a_send():
+    a, ra, receiver, delivered = _link()
+    sender = ARQ(ra, 1, window=4, maxRetries=1)
+    assert sender.send(2, b'one') == ERR_NONE
+    # the receiver loses its state and the sender keeps its session: frames are dropped
+    receiver._rxPeers.clear()
+    assert sender.send(2, b'two') == ERR_ACK_NOT_RECEIVED
+    # the next send opens a new session
+    assert sender.send(2, b'three') == ERR_NONE
+    assert [payload for _, payload in delivered] == [b'one', b'three']
+
+
+def test_retransmissions_are_no_rtt_samples():
+    a, ra, receiver, delivered = _link()
+    sender = ARQ(ra, 1, window=4)
+    samples = []
+    sender._updateRtt = samples.append
+    # the receiver's first ACK is lost
+    radio = receiver.radio
+    send = radio.sendWait
+    lost = []
+
+    def dropFirst(frame):
+        if lost:
+            return send(frame)
+        lost.append(bytes(frame))
+        return len(frame), ERR_NONE
+
+    radio.sendWait = dropFirst
+    assert sender.send(2, b'retried') == ERR_NONE
+    assert len(lost) == 1 and sender.retransmissions == 1
+    assert samples == []
+    assert sender.send(2, b'clean') == ERR_NONE
+    assert len(samples) == 1
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from batch import BatchEncoder, BatchDecoder
+
+HOST = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'host')
+SCALES = (1, 100, 10)
+
+
+def _readings(n):
+    return [(i, 21.5 + (i % 7) * 0.13 - (i % 3) * 0.4, 55.0 - i * 0.1) for i in range(n)]
+
+
+def _encode(readings, **kwargs):
+    encoder = BatchEncoder(3, SCALES, **kwargs)
+    packets = []
+    for r in readings:
+        payload = encoder.add(r)
+        if payload is not None:
+            packets.append(bytes(payload))
+    packets.append(bytes(encoder.flush()))
+    return packets
+
+
+def _close(a, b):
+    return all(abs(x - y) < 1e-9 for x, y in zip(a, b))
+
+
+def test_round_trip():
+    readings = _readings(100)
+    packets = _encode(readings, maxLength=32)
+    assert len(packets) > 1
+    assert all(len(p) <= 32 for p in packets)
+    decoder = BatchDecoder(SCALES)
+    decoded = [r for p in packets for r in decoder.decode(p)]
+    assert len(decoded) == len(readings)
+    assert all(_close(a, b) for a, b in zip(decoded, readings))
+    assert (decoder.batches, decoder.lost) == (len(packets), 0)
+
+
+def test_reading_larger_than_max_length():
+    encoder = BatchEncoder(3, maxLength=16)
+    with pytest.raises(ValueError):
+        encoder.add((1e9, 2e9, 3e9))
+    assert encoder.flush() is None
+    # a pending batch survives a reading that cannot start the next one
+    encoder = BatchEncoder(3, maxLength=16)
+    assert encoder.add((1, 2, 3)) is None
+    assert encoder.add((2, 3, 4)) is None
+    with pytest.raises(ValueError):
+        encoder.add((1e9, 2e9, 3e9))
+    assert list(BatchDecoder().decode(bytes(encoder.flush()))) == [(1, 2, 3), (2, 3, 4)]
+
+
+def test_host_decoder():
+    readings = _readings(40)
+    packets = _encode(readings, maxLength=24)
+    out = subprocess.run(
+        [sys.executable, os.path.join(HOST, 'decode_batch.py'), '--scales', '1,100,10'],
+        input=''.join('rx ' + p.hex() + '\n' for p in packets),
+        capture_output=True, text=True, check=True)
+    rows = [tuple(float(v) for v in line.split(',')) for line in out.stdout.splitlines()]
+    assert len(rows) == len(readings)
+    assert all(_close(a, b) for a, b in zip(rows, readings))
+    assert out.stderr.strip() == f'{len(packets)} batches, 0 lost'
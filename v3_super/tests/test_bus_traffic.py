@@ -0,0 +1,90 @@
+import pytest
+
+from _sx126x import ERR_NONE
+from sx1262 import SX1262
+from hopping import HopScheduler
+from fakechip import Air, FakeChip
+
+# same settings for every link test, so the numbers only move when the driver does
+LORA = {'freq': 915.0, 'bw': 500.0, 'sf': 7, 'power': 0}
+BANDWIDTHS = (7.8, 10.4, 15.6, 20.8, 31.25, 41.7, 62.5, 125.0, 250.0, 500.0)
+CHANNELS = [902.3 + 0.2 * i for i in range(8)]
+
+
+def _pair():
+    air = Air()
+    a = FakeChip(air)
+    b = FakeChip(air)
+    ra = a.radio(SX1262)
+    rb = b.radio(SX1262)
+    for r in (ra, rb):
+        assert r.begin(**LORA) == ERR_NONE
+    return a, b, ra, rb
+
+
+def _ok(states):
+    assert all(state == ERR_NONE for state in states)
+
+
+def test_begin(bus):
+    chip = FakeChip()
+    radio = chip.radio(SX1262)
+    assert bus.measure('begin', lambda: radio.begin(**LORA), chip) == ERR_NONE
+    assert bus.measure('begin_warm', lambda: radio.begin(**LORA), chip) == ERR_NONE
+
+
+def test_begin_fsk(bus):
+    chip = FakeChip()
+    radio = chip.radio(SX1262)
+    assert bus.measure('beginFSK', lambda: radio.beginFSK(freq=915.0, power=0), chip) == ERR_NONE
+
+
+@pytest.mark.parametrize('size', [16, 64, 255])
+def test_send(bus, size):
+    a, b, ra, rb = _pair()
+    n, state = bus.measure('send/%d' % size, lambda: ra.send(bytes(size)), a)
+    assert (n, state) == (size, ERR_NONE)
+
+
+@pytest.mark.parametrize('size', [16, 64, 255])
+def test_recv(bus, size):
+    a, b, ra, rb = _pair()
+    ra.send(bytes(size))
+    data, state = bus.measure('recv/%d' % size, lambda: rb.recv(timeout_en=True, timeout_ms=100), b)
+    assert (data, state) == (bytes(size), ERR_NONE)
+
+
+def test_packet_round_trip(bus):
+    # both chips, TX done to payload read out at the other end
+    a, b, ra, rb = _pair()
+    payload = b'per packet budget'
+
+    def roundTrip():
+        ra.send(payload)
+        return rb.recv(timeout_en=True, timeout_ms=100)
+
+    assert bus.measure('packet', roundTrip, a, b) == (payload, ERR_NONE)
+
+
+def test_hop(bus):
+    chip = FakeChip()
+    radio = chip.radio(SX1262)
+    assert radio.begin(**LORA) == ERR_NONE
+    hs = HopScheduler(radio, CHANNELS, seed=0x1234)
+    assert hs.begin(master=True) == ERR_NONE
+    # forget the channel so the hop always retunes
+    hs._channel = -1
+    assert bus.measure('hop', hs.hop, chip)[2] == ERR_NONE
+    assert bus.measure('hop_same_channel', hs.hop, chip)[2] == ERR_NONE
+
+
+def test_config_sweeps(bus):
+    chip = FakeChip()
+    radio = chip.radio(SX1262)
+    assert radio.begin(**LORA) == ERR_NONE
+    _ok(bus.measure('sweep/spreadingFactor', lambda: [radio.setSpreadingFactor(sf) for sf in range(5, 13)], chip))
+    _ok(bus.measure('sweep/bandwidth', lambda: [radio.setBandwidth(bw) for bw in BANDWIDTHS], chip))
+    _ok(bus.measure('sweep/codingRate', lambda: [radio.setCodingRate(cr) for cr in range(5, 9)], chip))
+    _ok(bus.measure('sweep/outputPower', lambda: [radio.setOutputPower(p) for p in range(-9, 23)], chip))
+    _ok(bus.measure('sweep/frequency', lambda: [radio.setFrequency(f) for f in CHANNELS], chip))
+    _ok(bus.measure('sweep/frequencyNoCal', lambda: [radio.setFrequency(f, calibrate=False) for f in CHANNELS], chip))
@@ -0,0 +1,40 @@
+from _sx126x import ERR_NONE, ERR_TX_TIMEOUT, ERR_DUTY_CYCLE_EXCEEDED, ERR_QUEUE_FULL
+from sx1262 import SX1262
+from dutycycle import DutyCycle
+from fakechip import FakeChip
+
+
+def _limiter(**kwargs):
+    chip = FakeChip()
+    radio = chip.radio(SX1262)
+    assert radio.begin(freq=868.1, bw=125.0, sf=7, power=0) == ERR_NONE
+    # 1 % of a 20 s window: 200 ms, enough for one 64 byte packet (157 ms)
+    return chip, radio, DutyCycle(radio, 868.1, window_ms=20000, **kwargs)
+
+
+def test_over_budget_has_its_own_code():
+    chip, radio, dc = _limiter()
+    assert dc.send(bytes(64)) == (64, ERR_NONE)
+    assert dc.send(bytes(64)) == (0, ERR_DUTY_CYCLE_EXCEEDED)
+    assert dc.time_until_can_send(64) > 0
+    assert len(chip.sent) == 1
+
+
+def test_full_queue_has_its_own_code():
+    chip, radio, dc = _limiter(queueLength=1)
+    assert dc.send(bytes(64)) == (64, ERR_NONE)
+    assert dc.send(bytes(64), queue=True) == (64, ERR_NONE)
+    assert dc.send(bytes(64), queue=True) == (0, ERR_QUEUE_FULL)
+    assert dc.pending() == 1
+
+
+def test_failed_flush_keeps_the_packet():
+    chip, radio, dc = _limiter()
+    dc._queue.append(b'queued')
+    send = radio.send
+    radio.send = lambda data: (0, ERR_TX_TIMEOUT)
+    assert dc.flush() == 0
+    assert dc.pending() == 1
+    radio.send = send
+    assert dc.flush() == 1
+    assert chip.sent == [b'queued']
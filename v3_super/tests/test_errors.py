@@ -0,0 +1,18 @@
+from _sx126x import ASSERT, ERR_NONE, ERR_UNKNOWN, errorCode, errorName
+from _sx126x_errors import ERROR
+
+
+def test_error_code_round_trip():
+    for code in ERROR:
+        if code == ERR_NONE:
+            continue
+        try:
+            ASSERT(code)
+        except AssertionError as e:
+            assert errorCode(e) == code
+            assert str(e) == errorName(code)
+
+
+def test_foreign_assertion_error():
+    assert errorCode(AssertionError()) == ERR_UNKNOWN
+    assert errorCode(AssertionError('not a driver error')) == ERR_UNKNOWN
@@ -0,0 +1,58 @@
+from _sx126x import ERR_NONE
+from sx1262 import SX1262
+from fec import FECEncoder, FECDecoder
+from fakechip import FakeChip
+
+
+def _radio():
+    chip = FakeChip()
+    radio = chip.radio(SX1262)
+    assert radio.begin(freq=915.0, bw=500.0, sf=7, power=0) == ERR_NONE
+    return chip, radio
+
+
+def _message(n, seed):
+    return bytes((i * seed + seed) & 0xFF for i in range(n))
+
+
+def test_lost_shards_are_repaired():
+    a, ra = _radio()
+    msg = _message(500, 3)
+    assert FECEncoder(ra, 1, k=4, n=6).send(msg) == ERR_NONE
+    assert len(a.sent) == 6
+    decoder = FECDecoder()
+    # two data shards lost
+    assert decoder.push(a.sent[0]) is None
+    assert decoder.push(a.sent[3]) is None
+    assert decoder.push(a.sent[4]) is None
+    assert bytes(decoder.push(a.sent[5])) == msg
+    assert decoder.messagesRepaired == 1
+
+
+def test_senders_with_the_same_message_id_stay_apart():
+    a, ra = _radio()
+    c, rc = _radio()
+    one, two = _message(300, 5), _message(300, 7)
+    assert FECEncoder(ra, 1, k=3, n=4).send(one) == ERR_NONE
+    assert FECEncoder(rc, 2, k=3, n=4).send(two) == ERR_NONE
+    assert a.sent[0][1] == c.sent[0][1]
+
+    decoder = FECDecoder()
+    done = []
+    for fa, fc in zip(a.sent, c.sent):
+        for frame in (fa, fc):
+            msg = decoder.push(frame)
+            if msg is not None:
+                done.append(bytes(msg))
+    assert done == [one, two]
+    assert decoder.messagesRepaired == 0
+
+
+def test_non_blocking_radio_waits_for_each_shard():
+    a, ra = _radio()
+    events = []
+    ra.setBlockingCallback(False, events.append)
+    assert FECEncoder(ra, 1, k=2, n=3).send(_message(200, 3)) == ERR_NONE
+    assert len(a.sent) == 3
+    assert not ra.blocking and a.mode == 'RX'
+    assert ra._callbackFunction == events.append
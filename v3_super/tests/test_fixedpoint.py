@@ -0,0 +1,167 @@
+# The integer frequency, rate and timing math checked against exact rational arithmetic,
+# over every value the parameters can take.
+import struct
+from fractions import Fraction
+
+import pytest
+
+from _sx126x import ERR_NONE, ERR_INVALID_SLEEP_PERIOD
+from sx126x import frfFromMhz, loraTimeOnAir
+from sx1262 import SX1262
+from fakechip import FakeChip
+
+SF = range(5, 13)
+BW = ('7.8', '10.4', '15.6', '20.8', '31.25', '41.7', '62.5', '125', '250', '500')
+XTAL = 32000000
+
+
+def _floor(x):
+    return x.numerator // x.denominator
+
+
+def _circuitpython(x):
+    # a CircuitPython float: single precision, the two low mantissa bits dropped
+    bits = struct.unpack('<I', struct.pack('<f', x))[0] & ~3
+    return struct.unpack('<f', struct.pack('<I', bits))[0]
+
+
+def _last(chip, op):
+    for tx in reversed(chip.log):
+        if tx[0] == op:
+            return tx[1:]
+    raise AssertionError('no command 0x%02X' % op)
+
+
+def _u24(data, i=0):
+    return (data[i] << 16) | (data[i + 1] << 8) | data[i + 2]
+
+
+def _symbol(sf, bw):
+    return Fraction(1000 << sf) / Fraction(bw)
+
+
+def _toa(len_, sf, bw, cr, preambleLength, explicit=True, crc=True):
+    symbol = _floor(_symbol(sf, bw))
+    coeff1, coeff2 = (25, 0) if sf in (5, 6) else (17, 8)
+    divisor = 4 * (sf - 2) if symbol >= 16000 else 4 * sf
+    bits = max(0, 8 * len_ + 16 * crc - 4 * sf + coeff2 + (20 if explicit else 0))
+    symbols_x4 = (preambleLength + 8) * 4 + coeff1 + -(-bits // divisor) * cr * 4
+    return _floor(Fraction(symbol * symbols_x4, 4))
+
+
+@pytest.fixture
+def lora():
+    chip = FakeChip()
+    radio = chip.radio(SX1262)
+    assert radio.begin(freq=915.0, bw=125.0, sf=9) == ERR_NONE
+    return chip, radio
+
+
+@pytest.fixture
+def fsk():
+    chip = FakeChip()
+    radio = chip.radio(SX1262)
+    assert radio.beginFSK(freq=915.0) == ERR_NONE
+    return chip, radio
+
+
+def test_frf_whole_band():
+    for khz in range(150000, 960001):
+        expected = khz * 1000 * (1 << 25) // XTAL
+        assert frfFromMhz(khz / 1000) == expected, khz
+        assert frfFromMhz(_circuitpython(khz / 1000)) == expected, khz
+
+
+def test_set_frequency(lora):
+    chip, radio = lora
+    for freq in ('433.175', '868.1', '869.525', '915', '923.3'):
+        assert radio.setFrequency(float(freq)) == ERR_NONE
+        assert chip.frf == _floor(Fraction(freq) * 10**6 * (1 << 25) / XTAL)
+
+
+def test_bit_rate(fsk):
+    chip, radio = fsk
+    for centi in range(6, 3001):
+        br = Fraction(centi, 10)
+        assert radio.setBitRate(float(br)) == ERR_NONE
+        assert _u24(_last(chip, 0x8B)) == _floor(Fraction(32 * XTAL) / (br * 1000)), br
+
+
+def test_frequency_deviation(fsk):
+    chip, radio = fsk
+    for hz in range(0, 200001, 50):
+        dev = Fraction(hz, 1000)
+        assert radio.setFrequencyDeviation(float(dev)) == ERR_NONE
+        assert _u24(_last(chip, 0x8B), 5) == _floor(dev * 1000 * (1 << 25) / XTAL), dev
+
+
+def test_lora_time_on_air(lora):
+    chip, radio = lora
+    for sf in SF:
+        assert radio.setSpreadingFactor(sf) == ERR_NONE
+        for bw in BW:
+            assert radio.setBandwidth(float(bw)) == ERR_NONE
+            ldro = 1 if _symbol(sf, bw) >= 16000 else 0
+            assert _last(chip, 0x8B)[3] == ldro, (sf, bw)
+            for len_ in range(0, 256, 17):
+                for cr in (5, 8):
+                    for explicit in (True, False):
+                        assert loraTimeOnAir(len_, sf, float(bw), cr, 8, explicit) == _toa(len_, sf, bw, cr, 8, explicit)
+            assert radio.getTimeOnAir(64) == _toa(64, sf, bw, radio._cr + 4, radio._preambleLength)
+
+
+def test_lora_rx_timeout(lora):
+    chip, radio = lora
+    data = bytearray(255)
+    for sf in SF:
+        radio.setSpreadingFactor(sf)
+        for bw in BW:
+            radio.setBandwidth(float(bw))
+            chip.log.clear()
+            # a packet waiting in the air, so receive() returns straight away
+            chip.inbox.append(b'x')
+            radio.receive(data, 0, True, 0)
+            timeout_us = _floor(_symbol(sf, bw) * 100)
+            assert _u24(chip.log[[tx[0] for tx in chip.log].index(0x82)][1:]) == timeout_us * 64 // 1000
+
+
+def test_fsk_rx_timeout(fsk):
+    chip, radio = fsk
+    data = bytearray(255)
+    for centi in (6, 12, 48, 96, 500, 1000, 3000):
+        br = Fraction(centi, 10)
+        radio.setBitRate(float(br))
+        for len_ in (0, 16, 255):
+            chip.log.clear()
+            chip.inbox.append(b'x')
+            radio.receive(data, len_, True, 0)
+            bits = (len_ or 255) * 8
+            timeout_us = _floor(Fraction(bits * 5 * 10**6) / (Fraction(32 * XTAL) / _floor(Fraction(32 * XTAL) / (br * 1000))))
+            assert _u24(chip.log[[tx[0] for tx in chip.log].index(0x82)][1:]) == timeout_us * 64 // 1000
+
+
+def test_duty_cycle_windows(lora):
+    chip, radio = lora
+    for sf in SF:
+        radio.setSpreadingFactor(sf)
+        for bw in BW:
+            radio.setBandwidth(float(bw))
+            for preamble in (32, 128, 1000):
+                symbol = _floor(_symbol(sf, bw))
+                sleep = symbol * (preamble - 16)
+                wake = max((symbol * (preamble + 1) - (sleep - 1000)) // 2, symbol * 9)
+                if sleep < radio._tcxoDelay + 1016:
+                    # too short to be worth sleeping, it listens continuously
+                    assert radio.getDutyCycleWindows(preamble) == (0, 0)
+                    continue
+                assert radio.getDutyCycleWindows(preamble) == (wake, sleep)
+                rxRaw = wake * 8 // 125
+                sleepRaw = (sleep - radio._tcxoDelay - 1000) * 8 // 125
+                chip.log.clear()
+                state = radio.startReceiveDutyCycleAuto(preamble)
+                if sleepRaw >= 1 << 24:
+                    assert state == ERR_INVALID_SLEEP_PERIOD
+                    continue
+                assert state == ERR_NONE
+                cmd = _last(chip, 0x94)
+                assert (_u24(cmd), _u24(cmd, 3)) == (rxRaw, sleepRaw)
@@ -0,0 +1,55 @@
+from _sx126x import ERR_NONE
+from sx1262 import SX1262
+from fragment import Fragmenter, Reassembler
+from fakechip import Air, FakeChip
+
+
+def _radio(air=None):
+    chip = FakeChip(air)
+    radio = chip.radio(SX1262)
+    assert radio.begin(freq=915.0, bw=500.0, sf=7, power=0) == ERR_NONE
+    return chip, radio
+
+
+def _message(n, seed):
+    return bytes((i * seed + seed) & 0xFF for i in range(n))
+
+
+def test_round_trip():
+    air = Air()
+    a, ra = _radio(air)
+    b, rb = _radio(air)
+    msg = _message(700, 3)
+    assert Fragmenter(ra, 1).send(msg) == ERR_NONE
+    assert len(a.sent) == 3
+    data, state = Reassembler().recv(rb, timeout_en=True, timeout_ms=100)
+    assert (bytes(data), state) == (msg, ERR_NONE)
+
+
+def test_senders_with_the_same_message_id_stay_apart():
+    a, ra = _radio()
+    c, rc = _radio()
+    one, two = _message(600, 5), _message(600, 7)
+    assert Fragmenter(ra, 1).send(one) == ERR_NONE
+    assert Fragmenter(rc, 2).send(two) == ERR_NONE
+    assert a.sent[0][1] == c.sent[0][1]
+
+    reassembler = Reassembler()
+    done = []
+    for fa, fc in zip(a.sent, c.sent):
+        for frame in (fa, fc):
+            msg = reassembler.push(frame)
+            if msg is not None:
+                done.append(bytes(msg))
+    assert done == [one, two]
+
+
+def test_non_blocking_radio_waits_for_each_fragment():
+    a, ra = _radio()
+    events = []
+    ra.setBlockingCallback(False, events.append)
+    assert Fragmenter(ra, 1).send(_message(600, 3)) == ERR_NONE
+    assert len(a.sent) == 3
+    # back in receive with the callback attached again
+    assert not ra.blocking and a.mode == 'RX'
+    assert ra._callbackFunction == events.append
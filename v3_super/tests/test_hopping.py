@@ -0,0 +1,32 @@
+from _sx126x import ERR_NONE, ERR_DWELL_EXCEEDED, ERR_BUDGET_EXCEEDED, errorName
+from sx1262 import SX1262
+from hopping import HopScheduler
+from fakechip import FakeChip
+
+CHANNELS = [902.3 + 0.2 * i for i in range(8)]
+
+
+def _scheduler(**kwargs):
+    chip = FakeChip()
+    radio = chip.radio(SX1262)
+    assert radio.begin(freq=915.0, bw=125.0, sf=9, power=0) == ERR_NONE
+    hs = HopScheduler(radio, CHANNELS, seed=0x1234, **kwargs)
+    assert hs.begin(master=True) == ERR_NONE
+    return chip, hs
+
+
+def test_send():
+    chip, hs = _scheduler()
+    assert hs.send(b'hop') == (3, ERR_NONE)
+    assert chip.sent[0][4:] == b'hop'
+
+
+def test_rejections_have_their_own_codes():
+    # 100 bytes at SF9 take about 770 ms
+    chip, hs = _scheduler(dwell_ms=400)
+    assert hs.send(bytes(100)) == (0, ERR_DWELL_EXCEEDED)
+    chip, hs = _scheduler(dwell_ms=2000, budget_ms=400)
+    assert hs.send(bytes(100)) == (0, ERR_BUDGET_EXCEEDED)
+    assert hs.rejected == 1
+    assert chip.sent == []
+    assert errorName(ERR_BUDGET_EXCEEDED) == 'ERR_BUDGET_EXCEEDED'
@@ -0,0 +1,132 @@
+import ctypes
+import struct
+
+import pytest
+
+import sx126x_linux
+from _sx126x import ERR_NONE, ERR_RX_TIMEOUT, SX126X_CMD_GET_STATUS, SX126X_CMD_SET_RF_FREQUENCY, \
+    SX126X_CMD_WRITE_BUFFER, const
+from sx1262 import SX1262
+from fakechip import Air, FakeChip
+
+
+def _pair(**kwargs):
+    air = Air()
+    a = FakeChip(air)
+    b = FakeChip(air)
+    ra = a.radio(SX1262)
+    rb = b.radio(SX1262)
+    for r in (ra, rb):
+        assert r.begin(freq=915.0, bw=500.0, sf=7, power=0, **kwargs) == ERR_NONE
+    return a, b, ra, rb
+
+
+def test_const_fallback():
+    assert const(0x12) == 0x12
+
+
+def test_begin_sets_frequency():
+    chip = FakeChip()
+    radio = chip.radio(SX1262)
+    assert radio.begin(freq=915.0, bw=500.0, sf=7) == ERR_NONE
+    assert chip.frf == int(915.0 * (1 << 25) / 32.0)
+
+
+def test_one_transfer_per_command():
+    chip = FakeChip()
+    radio = chip.radio(SX1262)
+    radio.begin(freq=915.0, bw=500.0, sf=7)
+    chip.log.clear()
+    radio.setFrequency(868.0)
+    frequency = [tx for tx in chip.log if tx[0] == SX126X_CMD_SET_RF_FREQUENCY]
+    assert len(frequency) == 1
+    assert len(frequency[0]) == 5
+
+    chip.log.clear()
+    radio.send(bytes(200))
+    writes = [tx for tx in chip.log if tx[0] == SX126X_CMD_WRITE_BUFFER]
+    assert len(writes) == 1
+    assert len(writes[0]) == 2 + 200
+
+
+def test_wakes_from_sleep_without_cs_pin():
+    a, b, ra, rb = _pair()
+    assert ra.sleep() == ERR_NONE
+    assert a.busy.value
+    a.log.clear()
+    assert ra.standby() == ERR_NONE
+    assert a.log[0] == bytes([SX126X_CMD_GET_STATUS, 0x00])
+    assert a.mode == 'STBY' and not a.busy.value
+    assert ra.spiTimeouts == 0
+    assert ra.send(b'awake') == (5, ERR_NONE)
+    assert rb.recv(timeout_en=True, timeout_ms=100) == (b'awake', ERR_NONE)
+
+
+def test_send_recv():
+    a, b, ra, rb = _pair()
+    n, state = ra.send(b'hello gateway')
+    assert (n, state) == (13, ERR_NONE)
+    assert a.sent == [b'hello gateway']
+    data, state = rb.recv(timeout_en=True, timeout_ms=100)
+    assert (data, state) == (b'hello gateway', ERR_NONE)
+    assert rb.getRSSI() == -60.0
+    assert rb.getSNR() == 10.0
+
+
+def test_recv_timeout():
+    _, _, _, rb = _pair()
+    data, state = rb.recv(timeout_en=True, timeout_ms=20)
+    assert (data, state) == (b'', ERR_RX_TIMEOUT)
+
+
+def test_callback_on_dio1_edge():
+    a, b, ra, rb = _pair()
+    events = []
+    rb.setBlockingCallback(False, events.append)
+    ra.send(b'ping')
+    assert events and events[0] & SX1262.RX_DONE
+    assert rb.recv() == (b'ping', ERR_NONE)
+
+
+def test_rx_filter_skips_payload_readout():
+    a, b, ra, rb = _pair()
+    rb.setRxFilter(lambda header, length: header[0] == 0x42, 1)
+    ra.send(b'\x41 not for us')
+    ra.send(b'\x42 for us')
+    data, state = rb.recv(timeout_en=True, timeout_ms=100)
+    assert (data, state) == (b'\x42 for us', ERR_NONE)
+    assert rb.packetsFiltered == 1
+
+
+def test_spidev_single_ioctl_message(monkeypatch):
+    calls = []
+
+    def fake_ioctl(fd, request, arg):
+        calls.append(request)
+        if request == sx126x_linux._SPI_IOC_MESSAGE_1:
+            tx, rx, n, speed, _, bits, _, _, _, _, _ = struct.unpack(sx126x_linux._SPI_TRANSFER, arg)
+            out = ctypes.string_at(tx, n)
+            # loop MOSI back to MISO, inverted so the two are told apart
+            ctypes.memmove(rx, bytes(x ^ 0xFF for x in out), n)
+            assert (speed, bits) == (8000000, 8)
+        return 0
+
+    monkeypatch.setattr(sx126x_linux.os, 'open', lambda path, flags: 3)
+    monkeypatch.setattr(sx126x_linux, 'ioctl', fake_ioctl)
+    spi = sx126x_linux.SpiDev((0, 1), 8000000)
+    assert spi.device == '/dev/spidev0.1'
+    calls.clear()
+
+    assert spi.transfer(b'\x1e\x00\x00\x01\x02') == b'\xe1\xff\xff\xfe\xfd'
+    assert calls == [sx126x_linux._SPI_IOC_MESSAGE_1]
+
+    # reconfiguring with unchanged settings does not touch the device
+    calls.clear()
+    spi.configure(baudrate=8000000, phase=0, polarity=0, bits=8)
+    assert calls == []
+
+
+def test_line_passes_pin_objects_through():
+    chip = FakeChip()
+    assert sx126x_linux.line(chip.busy) is chip.busy
+    assert sx126x_linux.line(None) is None
@@ -0,0 +1,124 @@
+from _sx126x import ERR_NONE
+from sx1262 import SX1262
+from lowpower import EnergyModel, LowPowerListener, LowPowerSender, TX_TABLE, minPreamble, txCurrent
+from fakechip import (Air, FakeChip, FakeIrqPin, SX126X_CMD_SET_STANDBY, SX126X_CMD_SET_SLEEP,
+                      SX126X_CMD_SET_RX, SX126X_CMD_SET_RX_DUTY_CYCLE, SX126X_CMD_SET_TX)
+
+
+def _radio(air=None):
+    chip = FakeChip(air)
+    radio = chip.radio(SX1262)
+    assert radio.begin(freq=915.0, bw=125.0, sf=7, power=14) == ERR_NONE
+    preambles = []
+    transmit = chip._transmit
+
+    def recordPreamble():
+        preambles.append((chip.packetParams[0] << 8) | chip.packetParams[1])
+        transmit()
+
+    chip._transmit = recordPreamble
+    return chip, radio, preambles
+
+
+def test_advertise_handle_send():
+    air = Air()
+    a, ra, aPreambles = _radio(air)
+    b, rb, bPreambles = _radio(air)
+    model = EnergyModel(rb)
+    listener = LowPowerListener(ra, 1, preambleLength=128, model=EnergyModel(ra))
+    sender = LowPowerSender(rb, model)
+
+    # the advertisement itself goes out with the long preamble, then the default is back
+    assert listener.advertise() == (9, ERR_NONE)
+    assert aPreambles == [128]
+    assert ra._preambleLength == 8
+    frame, state = rb.recv(timeout_en=True, timeout_ms=100)
+    assert state == ERR_NONE and sender.handle(frame)
+    assert not sender.handle(b'not an advert')
+
+    preamble = sender.preambleFor(1)
+    assert preamble == 128
+    assert sender.preambleFor() == 128
+    assert sender.send(b'wake up', dst=1) == (7, ERR_NONE)
+    assert bPreambles[-1] == 128
+    assert rb._preambleLength == 8
+    assert model.charge['tx'] == model.txCharge(7, 128)
+
+    data, state = listener.recv(timeout_ms=100)
+    assert (data, state) == (b'wake up', ERR_NONE)
+    assert listener.model.charge['rx'] > 0
+
+
+class _SlowChip(FakeChip):
+    # SetTx only starts the packet, it is on air until the driver polls DIO1 or changes the
+    # mode; the preamble recorded is the one configured when it ends
+
+    def __init__(self):
+        super().__init__()
+        self.irqPin = _SlowIrqPin(self)
+        self.preambles = []
+        self._pending = False
+
+    def transfer(self, tx):
+        if tx[0] in (SX126X_CMD_SET_STANDBY, SX126X_CMD_SET_SLEEP, SX126X_CMD_SET_RX,
+                     SX126X_CMD_SET_RX_DUTY_CYCLE, SX126X_CMD_SET_TX):
+            self.finish()
+        return super().transfer(tx)
+
+    def _transmit(self):
+        self._pending = True
+
+    def finish(self):
+        if self._pending:
+            self._pending = False
+            self.preambles.append((self.packetParams[0] << 8) | self.packetParams[1])
+            super()._transmit()
+
+
+class _SlowIrqPin(FakeIrqPin):
+
+    @property
+    def value(self):
+        self.chip.finish()
+        return bool(self.chip.irq & self.chip.dio1Mask)
+
+
+def test_non_blocking_radio_keeps_preamble_until_tx_done():
+    a = _SlowChip()
+    ra = a.radio(SX1262)
+    assert ra.begin(freq=915.0, bw=125.0, sf=7, power=14) == ERR_NONE
+    preambles = a.preambles
+    events = []
+    ra.setBlockingCallback(False, events.append)
+    assert LowPowerSender.sendWith(ra, b'ping', 64) == (4, ERR_NONE)
+    assert preambles == [64]
+    assert ra._preambleLength == 8
+    assert not ra.blocking and a.mode == 'RX'
+    assert ra._callbackFunction == events.append
+
+
+def test_energy_model():
+    _, radio, _ = _radio()
+    model = EnergyModel(radio, power=14)
+    airtime = radio.getTimeOnAir(32)
+    assert model.txCharge(32) == airtime * TX_TABLE[0][1]
+    # every extra preamble symbol is one symbol length (1024 us at SF7/BW125) more airtime
+    assert model.txCharge(32, 10) - model.txCharge(32) == 2 * 1024 * TX_TABLE[0][1]
+    assert txCurrent(18) == 95.0 + (102.0 - 95.0) / 3
+    assert model.listenCurrent(0, 0) == model.rxCurrent
+    assert model.listenCurrent(10000, 90000) < model.rxCurrent / 5
+    sleeping = model.mAhPerDay()
+    assert 0.02 < sleeping < 0.03
+    assert model.mAhPerDay(txPerDay=100) > sleeping
+
+
+def test_min_preamble_inverts_duty_cycle_windows():
+    _, radio, _ = _radio()
+    for sf, bw in ((7, 125.0), (9, 62.5), (10, 41.67), (12, 500.0), (8, 10.42)):
+        assert radio.setSpreadingFactor(sf) == ERR_NONE
+        assert radio.setBandwidth(bw) == ERR_NONE
+        for preamble in (40, 128, 333, 1000):
+            rx, sl = radio.getDutyCycleWindows(preamble, 8)
+            if sl == 0:
+                continue
+            assert minPreamble(sf, bw, rx, sl, 8) == preamble
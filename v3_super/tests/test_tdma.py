@@ -0,0 +1,66 @@
+import time
+
+from _sx126x import ERR_NONE, ERR_RX_TIMEOUT
+from sx1262 import SX1262
+from tdma import TDMACoordinator, TDMANode, BEACON_LENGTH
+from fakechip import Air, FakeChip
+
+
+def _radio(air=None):
+    chip = FakeChip(air)
+    radio = chip.radio(SX1262)
+    assert radio.begin(freq=915.0, bw=500.0, sf=7, power=0) == ERR_NONE
+    return chip, radio
+
+
+def test_assign():
+    _, radio = _radio()
+    coordinator = TDMACoordinator(radio, 1, slots=4)
+    assert coordinator.assign(10) == 1
+    assert coordinator.assign(11) == 2
+    # asking again keeps the slot
+    assert coordinator.assign(10) == 1
+    assert coordinator.assign(12, slot=2) == -1
+    assert coordinator.assign(12) == 3
+    assert coordinator.assign(13) == -1
+    coordinator.release(11)
+    assert coordinator.assign(13) == 2
+
+
+def test_beacon_carries_assignments():
+    air = Air()
+    a, ra = _radio(air)
+    _, rb = _radio(air)
+    coordinator = TDMACoordinator(ra, 1, slots=300)
+    node = TDMANode(rb, 7)
+    for address in range(2, 8):
+        coordinator.assign(address)
+
+    # four assignments fit a beacon, the rest go out with the next one
+    _, state = coordinator.beacon()
+    assert state == ERR_NONE and len(a.sent[0]) == BEACON_LENGTH + 1 + 4 * 3
+    assert node.sync(100) == ERR_NONE
+    assert node.slot == -1
+    coordinator.beacon()
+    assert node.sync(100) == ERR_NONE
+    assert node.slot == 6
+    coordinator.beacon()
+    assert len(a.sent[2]) == BEACON_LENGTH
+
+
+def test_sync_timeout_covers_other_traffic():
+    _, radio = _radio()
+    node = TDMANode(radio, 7)
+    calls = []
+
+    def chatter(timeout_en=False, timeout_ms=0):
+        calls.append(timeout_ms)
+        if len(calls) > 20:
+            return b'', ERR_RX_TIMEOUT
+        time.sleep(0.02)
+        return b'\x01\x02\x03', ERR_NONE
+
+    radio.recv = chatter
+    assert node.sync(100) == ERR_RX_TIMEOUT
+    assert len(calls) <= 6
+    assert calls[-1] < 100
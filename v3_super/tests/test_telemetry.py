@@ -0,0 +1,49 @@
+from telemetry import Decoder, Encoder, GPS_SCHEMA, fixedPoint
+
+FIX = (1, 1000, -47.123456, 8.54321, 412.3, 7)
+
+
+def test_fixed_point_scales_integer_part_exactly():
+    assert fixedPoint(-47.123456, 100000) == -4712346
+    assert fixedPoint(179.99999, 100000) == 17999999
+    assert fixedPoint(47, 100000) == 4700000
+    assert fixedPoint(12, 1) == 12
+
+
+def test_prescaled_values():
+    encoder = Encoder(GPS_SCHEMA, 0)
+    packet = bytes(encoder.encode((1, 1000, -4712346, 854321, 4123, 7), scaled=True))
+    assert Decoder().decode(packet) == (0, 0, (1, 1000, -47.12346, 8.54321, 412.3, 7))
+
+
+def test_truncated_packet_is_rejected():
+    decoder = Decoder()
+    packet = bytes(Encoder(GPS_SCHEMA, 0).encode(FIX))
+    for n in range(len(packet)):
+        assert decoder.decode(packet[:n]) is None
+    assert decoder.malformed == len(packet)
+    assert decoder.decode(packet) is not None
+
+
+def test_lost_keyframe_drops_deltas_until_next_keyframe():
+    encoder = Encoder(GPS_SCHEMA, 0, keyframeEvery=4)
+    packets = [bytes(encoder.encode((seq,) + FIX[1:])) for seq in range(8)]
+    decoder = Decoder()
+    decoded = [decoder.decode(p) for p in packets[1:]]
+    assert decoded[:3] == [None, None, None]
+    assert decoder.missingKeyframe == 3
+    assert [d[2][0] for d in decoded[3:]] == [4, 5, 6, 7]
+
+
+def test_nodes_keep_their_own_keyframes():
+    a = Encoder(GPS_SCHEMA, 0, keyframeEvery=4, node=1)
+    b = Encoder(GPS_SCHEMA, 0, keyframeEvery=4, node=2)
+    decoder = Decoder()
+    # both nodes start with keyframe id 1, interleaved on the same schema
+    assert decoder.decode(bytes(a.encode((0, 1000, 47.0, 8.0, 400.0, 7))))[0] == 1
+    assert decoder.decode(bytes(b.encode((0, 5000, -33.0, 151.0, 20.0, 9))))[0] == 2
+    node, _, values = decoder.decode(bytes(a.encode((1, 1001, 47.00001, 8.0, 400.0, 7))))
+    assert (node, values[:3]) == (1, (1, 1001, 47.00001))
+    node, _, values = decoder.decode(bytes(b.encode((1, 5001, -33.0, 151.00001, 20.0, 9))))
+    assert (node, values[:4]) == (2, (1, 5001, -33.0, 151.00001))
+    assert decoder.missingKeyframe == 0
@@ -0,0 +1,90 @@
+from _sx126x import ERR_NONE, ERR_SPI_CMD_TIMEOUT, SX126X_PLL_LOCK_ERR, SX126X_IMG_CALIB_ERR
+from sx1262 import SX1262
+from watchdog import Watchdog, CAUSE_BUSY, CAUSE_DEVICE_ERRORS, CAUSE_SPI_TIMEOUTS
+from fakechip import FakeChip, SX126X_CMD_SET_MODULATION_PARAMS
+
+
+def _radio(**kwargs):
+    chip = FakeChip()
+    radio = chip.radio(SX1262)
+    assert radio.begin(freq=868.0, bw=250.0, sf=8, power=10, **kwargs) == ERR_NONE
+    return chip, radio
+
+
+def test_device_errors_combine_both_bytes():
+    chip, radio = _radio()
+    chip.errors = SX126X_PLL_LOCK_ERR | 0x100
+    assert radio.getDeviceErrors() == SX126X_PLL_LOCK_ERR | 0x100
+
+
+def test_healthy_radio_is_left_alone():
+    chip, radio = _radio()
+    chip.errors = SX126X_IMG_CALIB_ERR
+    dog = Watchdog(radio)
+    assert dog.check() is None
+    assert dog.lastErrors == SX126X_IMG_CALIB_ERR
+    assert chip.errors == 0
+
+
+def test_replays_shadow_state():
+    chip, radio = _radio()
+    radio.setSpreadingFactor(10)
+    radio.setOutputPower(-3)
+    radio.setRfFrequency(0x36500000)
+    chip.errors = SX126X_PLL_LOCK_ERR
+    dog = Watchdog(radio)
+    assert dog.check() == CAUSE_DEVICE_ERRORS
+
+    chip.frf = 0
+    chip.packetParams = b''
+    assert dog.recover(CAUSE_DEVICE_ERRORS) == ERR_NONE
+    assert dog.recoveries == 1
+    assert radio._sf == 10 and radio._power == -3
+    assert chip.frf == 0x36500000
+    assert chip.packetParams
+
+
+def test_stuck_busy_fails_fast_and_recovers():
+    chip, radio = _radio()
+    dog = Watchdog(radio, busyTimeout_ms=5)
+    chip.busy.value = True
+    assert dog.check() == CAUSE_BUSY
+
+    assert radio.standby() == ERR_SPI_CMD_TIMEOUT
+    assert radio._busyStuck
+    assert radio.standby() == ERR_SPI_CMD_TIMEOUT
+    assert radio.spiTimeouts == 2
+
+    chip.busy.value = False
+    assert dog.check() == CAUSE_SPI_TIMEOUTS
+    assert dog.recover(CAUSE_SPI_TIMEOUTS) == ERR_NONE
+    assert not radio._busyStuck
+    assert dog.check() is None
+
+
+def test_command_timeout_status_is_not_a_stuck_busy(monkeypatch):
+    import fakechip
+    chip, radio = _radio()
+    # STBY_RC with command status "timeout", BUSY itself is fine
+    monkeypatch.setattr(fakechip, '_STATUS', 0x26)
+    assert radio.standby() == ERR_SPI_CMD_TIMEOUT
+    assert not radio._busyStuck
+    assert radio.spiTimeouts == 0
+
+
+def test_replays_fsk_settings():
+    chip = FakeChip()
+    radio = chip.radio(SX1262)
+    assert radio.beginFSK(freq=868.0, br=48.0, freqDev=50.0, rxBw=156.2, power=10) == ERR_NONE
+    assert radio.setBitRate(100.0) == ERR_NONE
+    assert radio.setFrequencyDeviation(25.0) == ERR_NONE
+    assert radio.setRxBandwidth(234.3) == ERR_NONE
+    assert radio.setPreambleLength(32) == ERR_NONE
+    before = (radio._br, radio._freqDev, radio._rxBw, radio._rxBwKhz, radio._preambleLengthFSK)
+    modulation = [tx for tx in chip.log if tx[0] == SX126X_CMD_SET_MODULATION_PARAMS][-1]
+
+    chip.log.clear()
+    assert Watchdog(radio).recover() == ERR_NONE
+    assert (radio._br, radio._freqDev, radio._rxBw, radio._rxBwKhz, radio._preambleLengthFSK) == before
+    assert [tx for tx in chip.log if tx[0] == SX126X_CMD_SET_MODULATION_PARAMS][-1] == modulation
+    assert chip.packetParams[:2] == bytes([0, 32])